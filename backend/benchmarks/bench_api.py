@@ -0,0 +1,42 @@
+"""End to end: /stock/predict through FastAPI's TestClient."""
+import json
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def client(offline, warm_series):
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as client:
+        # First request pays for TensorFlow graph tracing
+        assert client.get("/stock/predict/SYNA").status_code == 200
+        yield client
+
+
+def test_predict_endpoint(benchmark, client):
+    response = benchmark(client.get, "/stock/predict/SYNA")
+    assert response.status_code == 200
+    assert len(response.json()["hybrid_prediction"]) == 5
+
+
+def test_metrics_endpoint(benchmark, client):
+    assert benchmark(client.get, "/metrics").status_code == 200
+
+
+def test_predict_batch_endpoint(benchmark, client, offline):
+    body = {"symbols": list(offline["symbols"]), "horizon": 5}
+    response = benchmark(client.post, "/stock/predict/batch", json=body)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["symbol"] for line in lines] == list(offline["symbols"])
+    assert all(len(line["hybrid_prediction"]) == 5 for line in lines)
+
+
+def test_predict_endpoint_from_snapshot(benchmark, client, offline, monkeypatch):
+    import routes.stock
+    from services.forecast_snapshot import ForecastSnapshot
+    snapshot = ForecastSnapshot(root=str(offline["root"] / "bench-snapshot"), symbols=list(offline["symbols"]))
+    snapshot.refresh()
+    monkeypatch.setattr(routes.stock, "forecast_snapshot", snapshot)
+    response = benchmark(client.get, "/stock/predict/SYNA")
+    assert response.status_code == 200 and snapshot.misses == 0
@@ -0,0 +1,45 @@
+"""Data path: price loading, close extraction and LSTM windowing."""
+import os
+
+import numpy as np
+
+
+def test_get_stock_data_cold(benchmark, offline):
+    # Empty price store: every call parses the CSV "download" and writes the .npy
+    from services.data_fetch import get_stock_data
+    from services.price_store import price_store
+
+    def setup():
+        for path in price_store._paths("SYNA"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    series = benchmark.pedantic(get_stock_data, args=("SYNA", "2000-01-01", "2025-01-01"), setup=setup, rounds=20)
+    assert len(series) > 1000
+
+
+def test_get_stock_data_warm(benchmark, warm_series):
+    from services.data_fetch import get_stock_data
+    series = benchmark(get_stock_data, "SYNB", "2000-01-01", "2025-01-01")
+    assert len(series) == len(warm_series["SYNB"])
+
+
+def test_extract_close_series(benchmark, warm_series):
+    from services.model_predict import _extract_close_series
+    closes = benchmark(_extract_close_series, warm_series["SYNA"])
+    assert closes.dtype == np.float64
+
+
+def test_extract_close_series_legacy_records(benchmark, warm_series):
+    from services.model_predict import _extract_close_series
+    series = warm_series["SYNA"]
+    records = [{"Date": str(d), "Close": float(c)} for d, c in zip(series.dates, series.close)]
+    closes = benchmark(_extract_close_series, records)
+    assert len(closes) == len(series)
+
+
+def test_prepare_data(benchmark, warm_series):
+    from services.windowing import prepare_data
+    values = warm_series["SYNA"].close[:, None]
+    X, y = benchmark(prepare_data, values, 10)
+    assert X.shape == (len(values) - 10, 10, 1)
@@ -0,0 +1,53 @@
+"""Each predictor on a synthetic series, with the generic models loaded."""
+import pytest
+
+
+@pytest.fixture(scope="module")
+def series(warm_series):
+    from services.model_registry import model_registry
+    # Load the artifacts outside the timed region
+    model_registry.get("SYNA", "arima")
+    model_registry.get("SYNA", "lstm")
+    return warm_series["SYNA"]
+
+
+def test_predict_arima(benchmark, series):
+    from services.model_predict import predict_stock_price_arima
+    assert len(benchmark(predict_stock_price_arima, series)) == 5
+
+
+def test_predict_arima_batch(benchmark, warm_series, series):
+    from services.model_predict import predict_stock_price_arima_batch
+    result = benchmark(predict_stock_price_arima_batch, warm_series)
+    assert set(result) == set(warm_series)
+
+
+def test_predict_lstm(benchmark, series):
+    from services.model_predict import predict_stock_price_lstm
+    assert len(benchmark(predict_stock_price_lstm, series)) == 5
+
+
+def test_predict_lstm_batch(benchmark, warm_series, series):
+    from services.model_predict import predict_stock_price_lstm_batch
+    result = benchmark(predict_stock_price_lstm_batch, warm_series)
+    assert set(result) == set(warm_series)
+
+
+def test_predict_hybrid(benchmark, series):
+    from services.model_predict import predict_stock_price_arima, predict_stock_price_hybrid, predict_stock_price_lstm
+    arima, lstm = predict_stock_price_arima(series), predict_stock_price_lstm(series)
+    # Combination only, as the pipeline calls it
+    assert len(benchmark(predict_stock_price_hybrid, series, arima, lstm)) == 5
+
+
+def test_pipeline_all_models(benchmark, series):
+    from services.prediction_pipeline import default_pipeline
+    forecasts = benchmark(default_pipeline.run, series)
+    assert {"arima", "lstm", "hybrid"} <= set(forecasts)
+
+
+def test_news_sentiment_memoized(benchmark, offline):
+    from services.sentiment_analysis import get_news_with_sentiment
+    get_news_with_sentiment("stocks")
+    articles = benchmark(get_news_with_sentiment, "stocks")
+    assert len(articles) == 100
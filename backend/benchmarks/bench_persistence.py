@@ -0,0 +1,45 @@
+"""Prediction persistence: bulk inserts through the write-behind writer."""
+import pytest
+
+
+@pytest.fixture(scope="module")
+def writer(offline):
+    from database import Base, SessionLocal, engine
+    from services.prediction_writer import PredictionWriter
+    import models.prediction  # noqa: F401
+    Base.metadata.create_all(bind=engine)
+    # Flushed explicitly by the benchmarks, never by the background thread
+    writer = PredictionWriter(session_factory=SessionLocal, flush_rows=100_000, flush_interval=3600)
+    yield writer
+    writer.close()
+
+
+FORECASTS = {"arima": [1.0] * 5, "lstm": [2.0] * 5, "hybrid": [1.5] * 5}
+
+
+@pytest.mark.parametrize("requests", [1, 100])
+def test_enqueue_and_flush(benchmark, writer, requests):
+    # One request persists 15 rows; 100 requests model a busy flush interval
+    def persist():
+        for i in range(requests):
+            writer.enqueue(f"SYN{i % 4}", FORECASTS)
+        return writer.flush()
+
+    assert benchmark(persist) == 15 * requests
+
+
+def test_recent_predictions_query(benchmark, writer):
+    from database import ReadSessionLocal
+    from models.prediction import Prediction
+    for i in range(200):
+        writer.enqueue(f"SYN{i % 4}", FORECASTS)
+    writer.flush()
+
+    def recent():
+        db = ReadSessionLocal()
+        try:
+            return db.query(Prediction).order_by(Prediction.created_at.desc(), Prediction.id.desc()).limit(30).all()
+        finally:
+            db.close()
+
+    assert len(benchmark(recent)) == 30
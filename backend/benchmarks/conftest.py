@@ -0,0 +1,103 @@
+"""
+Fixtures for the offline benchmark suite (bench_*.py, run with
+pytest-benchmark; see benchmarks/pytest.ini).
+
+Nothing touches the network: prices come from synthetic CSVs through
+FileDownloader instead of yfinance, the news API is replaced by a fixed
+article list, and the database, price store, sentiment store and models
+live in a scratch directory. The generic ARIMA is fit on the synthetic
+series; the repo's generic LSTM is used as is.
+
+Modules are imported inside the session fixture, after the environment
+points every store at the scratch directory, so collecting this
+directory from the normal test run has no side effects.
+"""
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SYMBOLS = ("SYNA", "SYNB", "SYNC", "SYND")
+BARS = 1500
+
+
+def synthetic_closes(seed: int, n: int = BARS) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n)))
+
+
+class StubNewsClient:
+    """Returns the same articles for every query, like a cached news API."""
+
+    def __init__(self, articles):
+        self.articles = articles
+        self.upstream_calls = 0
+
+    def fetch(self, q="stocks", **params):
+        self.upstream_calls += 1
+        return self.articles
+
+    def stats(self):
+        return {"upstream_calls": self.upstream_calls}
+
+
+@pytest.fixture(scope="session")
+def offline(tmp_path_factory):
+    """Point the app at scratch stores and stub data sources; returns the modules used."""
+    import pandas as pd
+
+    root = tmp_path_factory.mktemp("bench")
+    csv_dir = root / "csv"
+    csv_dir.mkdir()
+    dates = pd.bdate_range(end="2024-12-31", periods=BARS)
+    for i, symbol in enumerate(SYMBOLS):
+        close = synthetic_closes(i)
+        pd.DataFrame({"Date": dates, "Open": close, "High": close * 1.01, "Low": close * 0.99,
+                      "Close": close, "Volume": 1e6}).to_csv(csv_dir / f"{symbol}.csv", index=False)
+
+    model_dir = root / "models"
+    model_dir.mkdir()
+    shutil.copy(os.path.join(BACKEND_DIR, "models", "lstm_model.h5"), model_dir / "lstm_model.h5")
+    from statsmodels.tsa.arima.model import ARIMA
+    from services.arima_numpy import ArimaState
+    ArimaState.from_statsmodels(ARIMA(synthetic_closes(0), order=(5, 1, 0)).fit()).save(str(model_dir / "arima_model.npz"))
+
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{root / 'bench.db'}",
+        MODEL_DIR=str(model_dir),
+        PRICE_STORE_DIR=str(root / "prices"),
+        SENTIMENT_STORE_DIR=str(root / "sentiment"),
+        BACKTEST_CACHE_DIR=str(root / "backtests"),
+        SNAPSHOT_DIR=str(root / "snapshots"),
+        UPLOAD_DIR=str(root / "uploads"),
+        JOB_WORKERS="0",
+        MODEL_UPDATES="0",
+        PREDICTION_COMPACT_INTERVAL="0",
+        # Every request recomputes, so the end-to-end numbers cover the models
+        PREDICTION_CACHE_TTL="0",
+        LOG_LEVEL="WARNING",
+    )
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+    from services import price_store as price_store_module
+    from services import sentiment_analysis
+    from services.price_store import FileDownloader
+
+    downloader = FileDownloader(str(csv_dir))
+    price_store_module.price_store.downloader = downloader
+    sentiment_analysis.news_client = StubNewsClient(
+        [{"title": f"Company {i} shares {'rally' if i % 2 else 'slump'} after earnings",
+          "url": f"https://news.example/{i}", "publishedAt": "2024-12-30T12:00:00Z"} for i in range(100)]
+    )
+    return {"root": root, "downloader": downloader, "symbols": SYMBOLS, "csv_dir": csv_dir}
+
+
+@pytest.fixture(scope="session")
+def warm_series(offline):
+    """PriceSeries for every synthetic symbol, with the price store already filled."""
+    from services.data_fetch import get_stock_data
+    return {symbol: get_stock_data(symbol, "2000-01-01", "2025-01-01") for symbol in offline["symbols"]}
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Mixed read/write load against the running API: writer clients call
+/stock/predict/{symbol} (each computation persists 15 prediction rows)
+while reader clients page /db/predictions/recent. Prices come from
+synthetic CSVs and the models are stubbed, so the numbers isolate the
+database path. Each journal mode / pool size runs in a fresh interpreter
+with its own uvicorn server and SQLite file.
+
+Run from the backend directory:  python benchmarks/db_concurrency.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CASE = """
+import json, os, socket, sys, threading, time
+import numpy as np, pandas as pd, requests, uvicorn
+
+writers, readers, seconds, workdir = int(sys.argv[1]), int(sys.argv[2]), float(sys.argv[3]), sys.argv[4]
+dates = pd.bdate_range("2024-01-01", "2024-12-31")
+symbols = [f"S{i}" for i in range(writers * 50)]
+for symbol in symbols:
+    pd.DataFrame({"Date": dates, "Close": np.linspace(100, 120, len(dates))}).to_csv(os.path.join(workdir, f"{symbol}.csv"), index=False)
+
+import main
+from database import database_stats
+from services.prediction_pipeline import PredictionPipeline
+from services.prediction_service import prediction_service
+from services.price_store import FileDownloader, price_store
+price_store.root, price_store.downloader = os.path.join(workdir, "prices"), FileDownloader(workdir)
+stub = lambda data: [float(data.last or 0.0)] * 5
+prediction_service.pipeline = PredictionPipeline(base_models={"arima": stub, "lstm": stub})
+
+sock = socket.socket(); sock.bind(("127.0.0.1", 0)); port = sock.getsockname()[1]; sock.close()
+server = uvicorn.Server(uvicorn.Config(main.app, port=port, log_level="warning", access_log=False))
+threading.Thread(target=server.run, daemon=True).start()
+from services.warmup import readiness
+# Let the startup warm-up (TensorFlow import, model loading) finish first
+while not server.started or readiness.status in ("starting", "warming"):
+    time.sleep(0.05)
+base = f"http://127.0.0.1:{port}"
+
+results = {"write": [], "read": []}
+errors = {"write": 0, "read": 0}
+stop = time.perf_counter() + seconds
+lock = threading.Lock()
+
+def client(kind, index):
+    session, latencies, failed, n = requests.Session(), [], 0, 0
+    while time.perf_counter() < stop:
+        if kind == "write":
+            # A new symbol per call, so every request computes and persists
+            url = f"{base}/stock/predict/{symbols[(index + n * writers) % len(symbols)]}"
+        else:
+            url = f"{base}/db/predictions/recent?limit=30"
+        n += 1
+        t0 = time.perf_counter()
+        ok = session.get(url).status_code == 200
+        latencies.append(time.perf_counter() - t0)
+        failed += not ok
+    with lock:
+        results[kind] += latencies
+        errors[kind] += failed
+
+threads = [threading.Thread(target=client, args=("write", i)) for i in range(writers)]
+threads += [threading.Thread(target=client, args=("read", i)) for i in range(readers)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+from services.prediction_writer import prediction_writer
+prediction_writer.flush()
+out = {}
+for kind, latencies in results.items():
+    ms = np.array(latencies) * 1000
+    out[kind] = {"rps": len(ms) / seconds, "p50": float(np.percentile(ms, 50)) if len(ms) else 0.0,
+                 "p95": float(np.percentile(ms, 95)) if len(ms) else 0.0, "errors": errors[kind]}
+stats = database_stats()
+out["max_checkout_ms"] = max(s["checkout_seconds"]["max"] for s in stats.values()) * 1000
+out["written_rows"] = prediction_writer.written_rows
+server.should_exit = True
+print(json.dumps(out))
+"""
+
+
+def run_case(journal_mode, pool_size, writers, readers, seconds):
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            SQLITE_JOURNAL_MODE=journal_mode,
+            DB_POOL_SIZE=str(pool_size),
+            JOB_WORKERS="0",
+            MODEL_UPDATES="0",
+            PREDICTION_COMPACT_INTERVAL="0",
+            # One INSERT transaction per computed prediction, the worst case for writers
+            PREDICTION_FLUSH_ROWS="15",
+            PREDICTION_FLUSH_INTERVAL="0.01",
+            SENTIMENT_STORE_DIR=os.path.join(workdir, "sentiment"),
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", CASE, str(writers), str(readers), str(seconds), workdir],
+            cwd=BACKEND_DIR, capture_output=True, text=True, env=env,
+        )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent prediction writes and history reads.")
+    parser.add_argument("--journal-modes", nargs="+", default=["DELETE", "WAL"])
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[10])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{'journal':>8} | {'pool':>4} | {'write rps':>9} | {'w p50 ms':>8} | {'w p95 ms':>8} | "
+          f"{'read rps':>8} | {'r p50 ms':>8} | {'r p95 ms':>8} | {'errors':>6} | {'max checkout ms':>15}")
+    for journal_mode in args.journal_modes:
+        for pool_size in args.pool_sizes:
+            stats = run_case(journal_mode, pool_size, args.writers, args.readers, args.seconds)
+            if stats is None:
+                print(f"{journal_mode:>8} | {pool_size:>4} | {'failed':>9} |")
+                continue
+            w, r = stats["write"], stats["read"]
+            print(f"{journal_mode:>8} | {pool_size:>4} | {w['rps']:>9.1f} | {w['p50']:>8.1f} | {w['p95']:>8.1f} | "
+                  f"{r['rps']:>8.1f} | {r['p50']:>8.1f} | {r['p95']:>8.1f} | {w['errors'] + r['errors']:>6} | "
+                  f"{stats['max_checkout_ms']:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
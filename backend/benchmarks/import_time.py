@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Measure backend startup cost: how long importing the app takes, which
+modules dominate it, and how long the background model warm-up needs
+before /health/ready turns green.
+
+Run from the backend directory:  python benchmarks/import_time.py
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+TIMED_IMPORT = """
+import time
+t0 = time.perf_counter()
+import {module}
+print(time.perf_counter() - t0)
+"""
+
+WARMUP = """
+import time
+t0 = time.perf_counter()
+import main
+from services.warmup import warm_up
+imported = time.perf_counter() - t0
+snapshot = warm_up()
+print(imported, time.perf_counter() - t0, snapshot["status"])
+"""
+
+
+def _run(code, *flags):
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return result
+
+
+def time_import(module, repeat):
+    samples = [float(_run(TIMED_IMPORT.format(module=module)).stdout.strip().splitlines()[-1]) for _ in range(repeat)]
+    return statistics.median(samples), min(samples)
+
+
+def top_imports(module, count):
+    # -X importtime writes "import time: self | cumulative | name" to stderr
+    rows = []
+    for line in _run(f"import {module}", "-X", "importtime").stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    # Nesting is shown by indentation: keep the module and its direct imports
+    direct = [(us, name) for us, name in rows if len(name) - len(name.lstrip()) <= 3]
+    return sorted(direct, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend import and warm-up time.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list")
+    args = parser.parse_args()
+
+    for module in ("main", "routes.stock", "services.model_predict"):
+        median, best = time_import(module, args.repeat)
+        print(f"import {module:<24} median {median * 1000:8.1f} ms   best {best * 1000:8.1f} ms")
+
+    print(f"\nSlowest top-level imports of main (cumulative):")
+    for us, name in top_imports("main", args.top):
+        print(f"  {us / 1000:8.1f} ms  {name.strip()}")
+
+    imported, ready, status = _run(WARMUP).stdout.strip().splitlines()[-1].split()
+    print(f"\nimport main: {float(imported) * 1000:.1f} ms, warm-up finished ({status}) after {float(ready):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
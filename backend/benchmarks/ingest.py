@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Measure streaming upload ingestion: rows/s and peak RSS while parsing a
+synthetic multi-symbol CSV into a scratch price store. Each file size runs
+in a fresh interpreter, so peak RSS shows whether memory stays flat as the
+file grows.
+
+Run from the backend directory:  python benchmarks/ingest.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CASE = """
+import json, os, resource, sys, tempfile
+import numpy as np, pandas as pd
+from services.ingest import ingest_file
+from services.price_store import FileDownloader, PriceStore
+
+symbols, chunk_rows, workdir = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+path = os.path.join(workdir, f"prices-{symbols}.csv")
+days = pd.bdate_range("2000-01-01", "2024-12-31")
+rng = np.random.default_rng(0)
+with open(path, "w") as f:
+    f.write("Date,Symbol,Open,High,Low,Close,Volume\\n")
+    for i in range(symbols):
+        close = np.abs(100 + np.cumsum(rng.normal(size=len(days)))) + 1
+        pd.DataFrame({"Date": days.strftime("%Y-%m-%d"), "Symbol": f"S{i}", "Open": close,
+                      "High": close + 1, "Low": close - 0.5, "Close": close, "Volume": 1000}).to_csv(f, header=False, index=False)
+base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+store = PriceStore(root=os.path.join(workdir, f"store-{symbols}"), downloader=FileDownloader(workdir))
+report = ingest_file(path, store=store, chunk_rows=chunk_rows)
+peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"mb": report["bytes"] / 1e6, "rows": report["rows"], "seconds": report["seconds"],
+                  "rows_per_second": report["rows_per_second"], "peak_rss_mb": peak_rss / 1024,
+                  "delta_rss_mb": (peak_rss - base_rss) / 1024}))
+"""
+
+
+def run_case(symbols, chunk_rows, workdir):
+    result = subprocess.run(
+        [sys.executable, "-c", CASE, str(symbols), str(chunk_rows), workdir],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming CSV ingestion into the price store.")
+    parser.add_argument("--symbols", type=int, nargs="+", default=[50, 200, 800],
+                        help="File sizes, as symbols x 25 years of daily bars (~0.37 MB each)")
+    parser.add_argument("--chunk-rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'symbols':>8} | {'MB':>7} | {'rows':>10} | {'seconds':>8} | {'rows/s':>10} | {'peak RSS MB':>11} | {'added RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for symbols in args.symbols:
+            stats = run_case(symbols, args.chunk_rows, workdir)
+            if stats is None:
+                print(f"{symbols:>8} | {'failed':>7} |")
+                continue
+            print(f"{symbols:>8} | {stats['mb']:>7.1f} | {stats['rows']:>10} | {stats['seconds']:>8.2f} | "
+                  f"{stats['rows_per_second']:>10.0f} | {stats['peak_rss_mb']:>11.1f} | {stats['delta_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Load test for LSTM micro-batching: N concurrent clients each request a
+5-step forecast (a (5, timesteps, 1) tensor) in a loop, once calling the
+model directly per request and once through the micro-batcher. Prints
+throughput and latency percentiles for both.
+
+Run from the backend directory:  python benchmarks/lstm_microbatch.py
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.lstm_batcher import LSTMBatcher  # noqa: E402
+from services.model_registry import model_registry  # noqa: E402
+
+
+def run_load(predict, clients, requests_per_client, x):
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        local = []
+        for _ in range(requests_per_client):
+            t0 = time.perf_counter()
+            predict(x)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - t0
+    latencies = np.array(latencies) * 1000
+    return len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-request LSTM calls with micro-batching.")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--requests", type=int, default=50, help="Requests per client")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    model = model_registry.get("*", "lstm")
+    if model is None:
+        print("No LSTM model available (models/lstm_model.h5)")
+        return
+    _, timesteps, features = model.input_shape
+    x = np.random.default_rng(0).random((5, timesteps, features), dtype=np.float32)
+    model.predict_on_batch(x)  # trace once outside the measurements
+
+    direct_lock = threading.Lock()
+
+    def direct(batch):
+        # Keras models aren't safe to call concurrently from many threads
+        with direct_lock:
+            return model.predict_on_batch(batch)
+
+    batcher = LSTMBatcher(max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+
+    print(f"{'clients':>7} | {'mode':<8} | {'req/s':>9} | {'p50 ms':>8} | {'p99 ms':>8}")
+    for clients in args.clients:
+        for name, predict in (("direct", direct), ("batched", lambda batch: batcher.predict(model, batch))):
+            rps, p50, p99 = run_load(predict, clients, args.requests, x)
+            print(f"{clients:>7} | {name:<8} | {rps:>9.1f} | {p50:>8.2f} | {p99:>8.2f}")
+    stats = batcher.stats()
+    print(f"\nbatcher: {stats['flushes']} flushes, mean batch {stats['batch_size']['mean']:.1f} windows, "
+          f"mean wait {stats['wait_seconds']['mean'] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare ways of building LSTM training windows: the old Python loop with
+np.array copies, zero-copy sliding_window_view, and streaming batches from
+WindowDataset (every window visited once, one batch in memory at a time).
+Each case runs in a fresh interpreter so peak RSS is measured in isolation.
+
+Run from the backend directory:  python benchmarks/windowing.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CASE = """
+import json, resource, sys, time
+import numpy as np
+from services.windowing import WindowDataset, prepare_data
+
+method, bars, time_steps, symbols = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4])
+rng = np.random.default_rng(0)
+series = [100 + np.cumsum(rng.normal(size=(bars // symbols, 1))) for _ in range(symbols)]
+base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+t0 = time.perf_counter()
+if method == "loop":
+    for values in series:
+        X, y = [], []
+        for i in range(len(values) - time_steps):
+            X.append(values[i:i + time_steps])
+            y.append(values[i + time_steps])
+        X, y = np.array(X), np.array(y)
+        checksum = float(X[-1].sum())
+elif method == "view":
+    for values in series:
+        X, y = prepare_data(values, time_steps)
+        checksum = float(X[-1].sum())
+else:
+    dataset = WindowDataset(series, time_steps)
+    checksum = 0.0
+    for X, y in dataset.iter_batches(1024):
+        checksum += float(y[-1, 0])
+elapsed = time.perf_counter() - t0
+peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "peak_rss_mb": peak_rss / 1024, "delta_rss_mb": (peak_rss - base_rss) / 1024}))
+"""
+
+
+def run_case(method, bars, time_steps, symbols):
+    result = subprocess.run(
+        [sys.executable, "-c", CASE, method, str(bars), str(time_steps), str(symbols)],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark training window construction.")
+    parser.add_argument("--bars", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--time-steps", type=int, default=10)
+    parser.add_argument("--symbols", type=int, default=10, help="Split the bars across this many series")
+    parser.add_argument("--loop-max", type=int, default=1_000_000,
+                        help="Skip the old loop above this many bars (it needs several GB at 10M)")
+    args = parser.parse_args()
+
+    print(f"{'bars':>11} | {'method':<7} | {'seconds':>8} | {'peak RSS MB':>11} | {'added RSS MB':>12}")
+    for bars in args.bars:
+        for method in ("loop", "view", "stream"):
+            if method == "loop" and bars > args.loop_max:
+                print(f"{bars:>11} | {method:<7} | {'skipped':>8} |")
+                continue
+            stats = run_case(method, bars, args.time_steps, args.symbols)
+            if stats is None:
+                print(f"{bars:>11} | {method:<7} | {'failed':>8} |")
+                continue
+            print(f"{bars:>11} | {method:<7} | {stats['seconds']:>8.3f} | "
+                  f"{stats['peak_rss_mb']:>11.1f} | {stats['delta_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
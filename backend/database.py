@@ -1,17 +1,130 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import QueuePool
 import os
+import threading
+import time
+
+from services.instrumentation import Histogram
 
 # Use SQLite by default; can be overridden with DATABASE_URL env var
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+# Optional replica for read-only query endpoints; defaults to DATABASE_URL
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", DATABASE_URL)
+
+# Connection pool (SQLite files and server databases alike)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Seconds before a server connection is replaced (under typical idle timeouts)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Milliseconds a SQLite writer waits for the lock before "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# WAL lets readers proceed while a write is in progress; set to DELETE for
+# filesystems without shared memory support (e.g. some network mounts)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+
+CHECKOUT_SECONDS_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolMetrics:
+    """Checkout latency and pool usage for one engine."""
+
+    def __init__(self):
+        self.checkout_seconds = Histogram(CHECKOUT_SECONDS_BUCKETS)
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidated = 0
+        self._lock = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.count("timeouts")
+            raise
+        finally:
+            self.metrics.checkout_seconds.observe(time.perf_counter() - t0)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return _is_sqlite(url) and (url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url)
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+
+def make_engine(url: str, read_only: bool = False):
+    """Create an engine with pooling and, for SQLite, WAL and pragmas applied."""
+    kwargs = {}
+    metrics = PoolMetrics()
+    if _is_sqlite(url):
+        kwargs["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    else:
+        # Drop connections the server closed instead of failing the request
+        kwargs["pool_pre_ping"] = True
+        kwargs["pool_recycle"] = DB_POOL_RECYCLE
+        if read_only and url.startswith("postgresql"):
+            kwargs["execution_options"] = {"postgresql_readonly": True}
+    if not _is_memory_sqlite(url):
+        kwargs.update(poolclass=TimedQueuePool, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                      pool_timeout=DB_POOL_TIMEOUT)
+    db_engine = create_engine(url, **kwargs)
+    if isinstance(db_engine.pool, TimedQueuePool):
+        db_engine.pool.metrics = metrics
+    db_engine.pool_metrics = metrics
+
+    @event.listens_for(db_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.count("connects")
+        if not _is_sqlite(url):
+            return
+        cursor = dbapi_connection.cursor()
+        if not _is_memory_sqlite(url):
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        # Durable at checkpoints; in WAL mode this skips an fsync per commit
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-16000")  # 16 MB per connection
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(db_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.count("invalidated")
+
+    return db_engine
+
+
+engine = make_engine(DATABASE_URL)
+# In-memory SQLite databases are per connection, so reads must share the writer
+read_engine = engine if _is_memory_sqlite(DATABASE_READ_URL) else make_engine(DATABASE_READ_URL, read_only=True)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
@@ -22,3 +135,35 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency for endpoints that only query; writes fail on these sessions
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def pool_stats(db_engine) -> dict:
+    pool = db_engine.pool
+    metrics = db_engine.pool_metrics
+    stats = {
+        "url": db_engine.url.render_as_string(hide_password=True),
+        "pool": type(pool).__name__,
+        "connects": metrics.connects,
+        "invalidated": metrics.invalidated,
+        "timeouts": metrics.timeouts,
+        "checkout_seconds": metrics.checkout_seconds.snapshot(),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow(),
+                     idle=pool.checkedin())
+    return stats
+
+
+def database_stats() -> dict:
+    stats = {"write": pool_stats(engine)}
+    if read_engine is not engine:
+        stats["read"] = pool_stats(read_engine)
+    return stats
@@ -1,13 +1,60 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from routes.stock import router as stock_router
 from routes.news import router as news_router
 from routes.db import router as db_router
-from database import Base, engine
+from database import Base, engine, read_engine
+from auth import require_admin
+from services.warmup import readiness, start_background_warmup, warm_up
+from services.prediction_writer import prediction_writer
+from services.training import training_orchestrator
+from services.job_queue import job_queue
+from services.model_updates import MODEL_UPDATES, model_updater
+from services.sentiment_analysis import sentiment_memo
+from services.prediction_history import ensure_schema, prediction_history
+from services.forecast_snapshot import forecast_snapshot
+from services.instrumentation import configure_logging, histogram_lines, http_latency, http_requests, metrics
+from services.lstm_batcher import lstm_batcher
 import models.user  # noqa: F401
 import models.prediction  # noqa: F401
+import models.job  # noqa: F401
+
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background services start in dependency order and stop in reverse.
+    # TensorFlow and the models load in the background so startup (and every
+    # worker fork) isn't blocked; /health/ready reports when it's done
+    start_background_warmup()
+    # Buffered prediction rows are bulk-inserted by the writer thread
+    prediction_writer.start()
+    # Retraining jobs run in separate worker processes
+    job_queue.start_workers()
+    # New bars fine-tune per-symbol models; full refits run on a cadence
+    if MODEL_UPDATES:
+        model_updater.start()
+    # Old prediction rows are compacted into daily rollups periodically
+    prediction_history.start()
+    # Forecasts for SNAPSHOT_SYMBOLS are precomputed after each market close
+    forecast_snapshot.start()
+    try:
+        yield
+    finally:
+        forecast_snapshot.stop()
+        prediction_history.stop()
+        model_updater.stop()
+        training_orchestrator.shutdown()
+        job_queue.stop_workers()
+        # Flush buffered prediction rows before the process exits
+        prediction_writer.close()
+        sentiment_memo.close()
 
-app = FastAPI(title="Stock Prediction API")
+app = FastAPI(title="Stock Prediction API", lifespan=lifespan)
 
 # Enable CORS for frontend requests - with more permissive settings for development
 app.add_middleware(
@@ -18,21 +65,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts, error rates and latency per route template (not raw path,
+# so per-symbol URLs don't each become a series)
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route_templates.get(id(route), getattr(route, "path", "unmatched"))
+        http_requests.inc(route=path, method=request.method, status=str(status))
+        http_latency.observe(time.perf_counter() - t0, route=path)
+
+# Histograms the services keep themselves, exported at scrape time
+metrics.add_collector(lambda: histogram_lines(
+    "prediction_persist_flush_seconds", "Bulk insert time per prediction flush.",
+    [({}, prediction_writer.flush_seconds)]))
+metrics.add_collector(lambda: histogram_lines(
+    "lstm_batch_wait_seconds", "Time LSTM requests wait for their micro-batch.",
+    [({}, lstm_batcher.wait_times)]))
+metrics.add_collector(lambda: histogram_lines(
+    "db_pool_checkout_seconds", "Time waiting for a database connection.",
+    [({"engine": "write"}, engine.pool_metrics.checkout_seconds)]
+    + ([({"engine": "read"}, read_engine.pool_metrics.checkout_seconds)] if read_engine is not engine else [])))
+
 # Create tables at startup
 Base.metadata.create_all(bind=engine)
+ensure_schema(engine)
 
 # Include API routes
-app.include_router(stock_router, prefix="/stock")
-app.include_router(news_router, prefix="/news")
-app.include_router(db_router, prefix="/db")
+ROUTERS = (("/stock", stock_router), ("/news", news_router), ("/db", db_router))
+for prefix, router in ROUTERS:
+    app.include_router(router, prefix=prefix)
+# Full path templates for metric labels; matched routes only carry their
+# path relative to the router's prefix
+route_templates = {id(route): prefix + route.path for prefix, router in ROUTERS for route in router.routes}
 
 @app.get("/")
 def root():
     return {"message": "Stock Prediction API is running!"}
 
+@app.get("/metrics")
+def prometheus_metrics():
+    # Prometheus text exposition; replaces the old static /stock/stats/
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "cors_enabled": True}
+    return {"status": "healthy", "cors_enabled": True, **readiness.snapshot()}
+
+@app.get("/health/live")
+def liveness_check():
+    return {"live": True}
+
+@app.get("/health/ready")
+def readiness_check():
+    snapshot = readiness.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+@app.post("/health/warmup")
+def run_warmup(symbols: str = "", _: bool = Depends(require_admin)):
+    # Synchronously warm models for a comma-separated list of symbols
+    return warm_up([s.strip() for s in symbols.split(",") if s.strip()])
 
 @app.get("/db/health")
 def db_health():
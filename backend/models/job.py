@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text
+from sqlalchemy.sql import func
+from database import Base
+
+class Job(Base):
+	__tablename__ = 'jobs'
+	id = Column(String, primary_key=True)  # uuid hex
+	kind = Column(String, nullable=False)  # 'retrain'
+	status = Column(String, index=True, nullable=False)  # queued | running | succeeded | failed | cancelled
+	dataset_path = Column(String, nullable=True)
+	dataset_hash = Column(String, index=True, nullable=True)  # sha256 of the uploaded file
+	params = Column(Text, nullable=False, default="{}")  # JSON
+	progress = Column(Float, nullable=False, default=0.0)  # 0..1
+	message = Column(String, nullable=True)
+	result = Column(Text, nullable=True)  # JSON
+	error = Column(Text, nullable=True)
+	cancel_requested = Column(Boolean, nullable=False, default=False)
+	worker_pid = Column(Integer, nullable=True)
+	created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+	started_at = Column(DateTime(timezone=True), nullable=True)
+	heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+	finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, Index
 from sqlalchemy.sql import func
 from database import Base
 
@@ -9,4 +9,28 @@ class Prediction(Base):
 	model = Column(String, index=True, nullable=False)  # 'arima' | 'lstm' | 'hybrid'
 	step = Column(Integer, nullable=False)  # prediction horizon step (e.g., 1..5)
 	value = Column(Float, nullable=False)
+	origin_date = Column(Date, nullable=True)  # last bar the forecast was made from
 	created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+	__table_args__ = (
+		# History pages per symbol/model and the "latest per symbol" lookup
+		Index("ix_predictions_symbol_model_created", "symbol", "model", "created_at", "id"),
+		# Unfiltered newest-first pages and the retention cutoff
+		Index("ix_predictions_created_id", "created_at", "id"),
+	)
+
+class PredictionRollup(Base):
+	"""Daily summary of compacted prediction rows, one per (symbol, model, step, day)."""
+	__tablename__ = 'prediction_rollups'
+	id = Column(Integer, primary_key=True)
+	symbol = Column(String, nullable=False)
+	model = Column(String, nullable=False)
+	step = Column(Integer, nullable=False)
+	day = Column(Date, nullable=False)  # day the predictions were made
+	origin_date = Column(Date, nullable=True)  # latest origin among them
+	count = Column(Integer, nullable=False)
+	mean_value = Column(Float, nullable=False)
+	min_value = Column(Float, nullable=False)
+	max_value = Column(Float, nullable=False)
+	__table_args__ = (
+		Index("ux_prediction_rollups_key", "symbol", "model", "step", "day", unique=True),
+	)
@@ -1,10 +1,14 @@
+from datetime import date
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from database import get_db
+from database import database_stats, get_db, get_read_db
 from models.prediction import Prediction
 from models.user import User
 from auth import require_admin
 from pydantic import BaseModel
+from services.prediction_history import prediction_history
 
 class CreateUserRequest(BaseModel):
     email: str
@@ -13,10 +17,10 @@ class CreateUserRequest(BaseModel):
 router = APIRouter()
 
 @router.get("/predictions/recent")
-def list_recent_predictions(limit: int = 30, db: Session = Depends(get_db)):
+def list_recent_predictions(limit: int = 30, db: Session = Depends(get_read_db)):
 	rows = (
 		db.query(Prediction)
-		.order_by(Prediction.created_at.desc())
+		.order_by(Prediction.created_at.desc(), Prediction.id.desc())
 		.limit(limit)
 		.all()
 	)
@@ -32,8 +36,34 @@ def list_recent_predictions(limit: int = 30, db: Session = Depends(get_db)):
 		for r in rows
 	]
 
+@router.get("/predictions/")
+def list_predictions(symbol: Optional[str] = None, model: Optional[str] = None, limit: int = 50,
+                     cursor: Optional[str] = None):
+	# Newest first; pass next_cursor back as cursor for the following page
+	try:
+		return prediction_history.page(symbol, model, limit, cursor)
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/predictions/latest")
+def latest_predictions(symbol: Optional[str] = None):
+	return prediction_history.latest(symbol)
+
+@router.get("/predictions/errors/{symbol}")
+def prediction_errors(symbol: str, start: Optional[date] = None, end: Optional[date] = None):
+	return prediction_history.errors(symbol, start, end)
+
+@router.post("/predictions/compact")
+def compact_predictions(_: bool = Depends(require_admin)):
+	return {**prediction_history.compact(), "stats": prediction_history.stats()}
+
+@router.get("/stats")
+def db_stats():
+	# Pool usage and checkout latency of the write and read engines
+	return database_stats()
+
 @router.get("/users")
-def list_users(db: Session = Depends(get_db), _: bool = Depends(require_admin)):
+def list_users(db: Session = Depends(get_read_db), _: bool = Depends(require_admin)):
 	users = db.query(User).all()
 	return [
 		{
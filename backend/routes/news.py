@@ -1,8 +1,43 @@
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException
-from services.sentiment_analysis import get_news_with_sentiment
+from services.sentiment_analysis import NewsUnavailable, get_news_with_sentiment, news_client, sentiment_memo
+from services.sentiment_store import sentiment_store
+from services.symbols import valid_symbol
 
 router = APIRouter()
 
+def _check_symbol(symbol):
+    # The symbol names the files of its sentiment aggregates
+    symbol = symbol.strip().upper()
+    if not valid_symbol(symbol):
+        raise HTTPException(status_code=400, detail=f"Invalid symbol: {symbol!r}")
+    return symbol
+
 @router.get("/")
-def get_news():
-    return get_news_with_sentiment()
+def get_news(q: str = "stocks", symbol: Optional[str] = None):
+    # With a symbol (and no explicit query) news about that symbol is fetched
+    # and recorded in its daily sentiment aggregates
+    if symbol:
+        symbol = _check_symbol(symbol)
+    if symbol and q == "stocks":
+        q = symbol
+    try:
+        return get_news_with_sentiment(q, symbol)
+    except NewsUnavailable as e:
+        raise HTTPException(status_code=502, detail=f"News unavailable: {e}")
+
+
+@router.get("/sentiment/{symbol}")
+def get_sentiment(symbol: str, start: str = "1970-01-01", end: str = "2100-01-01"):
+    symbol = _check_symbol(symbol)
+    try:
+        days = sentiment_store.range(symbol, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
+    return {"symbol": symbol, "days": days}
+
+
+@router.get("/stats/")
+def news_stats():
+    return {"client": news_client.stats(), "sentiment": sentiment_memo.stats(), "store": sentiment_store.stats()}
@@ -1,98 +1,288 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from services.data_fetch import get_stock_data
-from services.model_predict import predict_stock_price_arima, predict_stock_price_lstm, predict_stock_price_hybrid
-import os
-import shutil
-import subprocess
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from services.prediction_service import DEFAULT_END, DEFAULT_START, prediction_service
+from services.forecast_snapshot import forecast_snapshot
+from services.model_registry import model_registry
+from services.lstm_batcher import lstm_batcher
+from services.prediction_writer import prediction_writer
+from services.training import training_orchestrator, MODEL_TYPES
+from services.job_queue import job_queue, save_upload
+from services.backtest import backtest_engine
+from services.model_updates import model_updater, read_fit_state
+from services.instrumentation import predict_requests, timed_stage
+from services.symbols import valid_symbol
+from datetime import date
+from typing import List, Optional
+import json
 import logging
-from sqlalchemy.orm import Session
-from database import get_db
 from auth import require_admin
-from models.prediction import Prediction
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Levels and sampling are configured in main (LOG_LEVEL, LOG_SAMPLE_RATE)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Most symbols accepted by one batch prediction request
+PREDICT_BATCH_MAX = 1000
+# Most symbols backtested by one metrics request
+METRICS_SYMBOLS_MAX = 50
+# Bounds for the forecast horizon and the bars of history fed to the models
+PREDICT_HORIZON_MAX = 60
+PREDICT_LOOKBACK_MAX = 5000
+
+class BatchPredictRequest(BaseModel):
+    symbols: List[str]
+    horizon: int = 5
+    lookback: Optional[int] = None
+    start: str = DEFAULT_START
+    end: str = DEFAULT_END
+
+def _check_symbol(symbol):
+    # Symbols name files in the price, sentiment and model stores
+    symbol = symbol.strip().upper()
+    if not valid_symbol(symbol):
+        raise HTTPException(status_code=400, detail=f"Invalid symbol: {symbol!r}")
+    return symbol
+
+def _check_symbols(symbols, limit):
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    if not 1 <= len(symbols) <= limit:
+        raise HTTPException(status_code=400, detail=f"Provide 1-{limit} symbols")
+    invalid = [s for s in symbols if not valid_symbol(s)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid symbols: {invalid[:10]}")
+    return symbols
+
+def _check_window(horizon, lookback, start, end):
+    if not 1 <= horizon <= PREDICT_HORIZON_MAX:
+        raise HTTPException(status_code=400, detail=f"horizon must be 1-{PREDICT_HORIZON_MAX}")
+    if lookback is not None and not 2 <= lookback <= PREDICT_LOOKBACK_MAX:
+        raise HTTPException(status_code=400, detail=f"lookback must be 2-{PREDICT_LOOKBACK_MAX} bars")
+    try:
+        if date.fromisoformat(start) >= date.fromisoformat(end):
+            raise HTTPException(status_code=400, detail="start must be before end")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be YYYY-MM-DD dates")
+
+def _prediction_response(symbol, actual_prices, forecasts, sentiment):
+    dates = [f"Historical {i+1}" for i in range(len(actual_prices))]
+    response_data = {
+        "symbol": symbol,
+        "actual_prices": actual_prices,
+        "actual_dates": dates,
+        "arima_prediction": forecasts["arima"],
+        "lstm_prediction": forecasts["lstm"],
+        "hybrid_prediction": forecasts["hybrid"],
+        # Decayed news sentiment as of the latest bar (0 without news)
+        "sentiment": sentiment,
+    }
+    # Expose any additional configured ensembles alongside the defaults
+    for model_name, forecast in forecasts.items():
+        response_data.setdefault(f"{model_name}_prediction", forecast)
+    return response_data
+
+def _series_response(symbol, stock_data, forecasts):
+    # Get the last 30 days of actual prices for comparison with the chart
+    sentiment = float(stock_data.sentiment[-1]) if stock_data.sentiment is not None and len(stock_data) else None
+    return _prediction_response(symbol, stock_data.tail(30).close.tolist(), forecasts, sentiment)
+
+def _snapshot_response(symbol, snapshot):
+    return _prediction_response(symbol, snapshot["actual_prices"], snapshot["forecasts"], snapshot["sentiment"])
+
+def _origin(stock_data):
+    return stock_data.dates[-1].item() if len(stock_data) else None
+
+@router.post("/predict/batch")
+async def predict_stock_batch(request: BatchPredictRequest):
+    # Prices for every symbol come from one bulk download (or the store),
+    # ARIMA and LSTM run vectorized over chunks of symbols, and each result
+    # is streamed as one NDJSON line as soon as its chunk finishes
+    symbols = _check_symbols(request.symbols, PREDICT_BATCH_MAX)
+    _check_window(request.horizon, request.lookback, request.start, request.end)
+
+    async def stream():
+        computed_items = []
+        live = []
+        try:
+            # Precomputed symbols are answered straight from the snapshot
+            for symbol in symbols:
+                snapshot = forecast_snapshot.get(symbol, request.horizon, request.start, request.end, request.lookback)
+                if snapshot is None:
+                    live.append(symbol)
+                    continue
+                predict_requests.inc(outcome="snapshot")
+                yield json.dumps({**_snapshot_response(symbol, snapshot), "cached": True}) + "\n"
+            if not live:
+                return
+            async for symbol, stock_data, forecasts, computed in prediction_service.predict_many(
+                    live, request.start, request.end, steps=request.horizon, lookback=request.lookback):
+                if forecasts is None:
+                    predict_requests.inc(outcome="error")
+                    yield json.dumps({"symbol": symbol, "error": "No price data"}) + "\n"
+                    continue
+                if computed:
+                    computed_items.append((symbol, forecasts, _origin(stock_data)))
+                predict_requests.inc(outcome="computed" if computed else "cached")
+                yield json.dumps({**_series_response(symbol, stock_data, forecasts), "cached": not computed}) + "\n"
+        except Exception as e:
+            logger.error("Error in predict_stock_batch: %s", e)
+            yield json.dumps({"error": f"Prediction failed: {e}"}) + "\n"
+        finally:
+            # Every computed forecast of the request enters the writer's buffer at once
+            if computed_items:
+                with timed_stage("persist"):
+                    prediction_writer.enqueue_many(computed_items)
+            logger.info("Batch predicted %d symbols (%d computed)", len(symbols), len(computed_items))
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @router.get("/predict/{symbol}")
-def predict_stock(symbol: str, db: Session = Depends(get_db)):
+async def predict_stock(symbol: str, horizon: int = 5, lookback: Optional[int] = None,
+                        start: str = DEFAULT_START, end: str = DEFAULT_END):
+    # Forecast `horizon` bars from the last `lookback` bars (default: all)
+    # of [start, end)
+    symbol = _check_symbol(symbol)
+    _check_window(horizon, lookback, start, end)
+    # Forecasts precomputed after the close are a single row read; anything
+    # not in the snapshot is computed live below
+    snapshot = forecast_snapshot.get(symbol, horizon, start, end, lookback)
+    if snapshot is not None:
+        predict_requests.inc(outcome="snapshot")
+        return _snapshot_response(symbol, snapshot)
     try:
-        logger.info(f"Received prediction request for symbol: {symbol}")
-        
-        stock_data = get_stock_data(symbol, "2024-01-01", "2025-01-01")
-        logger.info(f"Retrieved stock data: {len(stock_data) if stock_data else 0} records")
-        
-        # Extract actual historical prices for the chart
-        actual_prices = []
-        dates = []
-        if stock_data:
-            # Get the last 30 days of actual prices for comparison
-            for i, record in enumerate(stock_data[-30:]):
-                if 'Close' in record and record['Close'] is not None:
-                    actual_prices.append(float(record['Close']))
-                    dates.append(f"Historical {i+1}")
-        
-        logger.info(f"Extracted {len(actual_prices)} actual prices")
-        
-        # Get predictions from all models
-        arima_prediction = predict_stock_price_arima(stock_data)
-        lstm_prediction = predict_stock_price_lstm(stock_data)
-        hybrid_prediction = predict_stock_price_hybrid(stock_data)
-        
-        logger.info(f"Generated predictions - ARIMA: {len(arima_prediction)}, LSTM: {len(lstm_prediction)}, Hybrid: {len(hybrid_prediction)}")
+        # Data is fetched off the event loop and models run on the inference
+        # executor; concurrent requests for the same symbol share one
+        # computation and recent results are served from a short-TTL cache,
+        # shorter horizons from the prefix of a longer cached one
+        stock_data, forecasts, computed = await prediction_service.predict(symbol, start, end, steps=horizon,
+                                                                           lookback=lookback)
         
-        # Persist predictions
-        try:
-            for idx, value in enumerate(arima_prediction, start=1):
-                db.add(Prediction(symbol=symbol.upper(), model='arima', step=idx, value=float(value)))
-            for idx, value in enumerate(lstm_prediction, start=1):
-                db.add(Prediction(symbol=symbol.upper(), model='lstm', step=idx, value=float(value)))
-            for idx, value in enumerate(hybrid_prediction, start=1):
-                db.add(Prediction(symbol=symbol.upper(), model='hybrid', step=idx, value=float(value)))
-            db.commit()
-        except Exception as persist_err:
-            db.rollback()
-            logger.error(f"Failed to persist predictions for {symbol}: {persist_err}")
-
-        response_data = {
-            "symbol": symbol,
-            "actual_prices": actual_prices,
-            "actual_dates": dates,
-            "arima_prediction": arima_prediction,
-            "lstm_prediction": lstm_prediction,
-            "hybrid_prediction": hybrid_prediction,
-        }
+        # Persist predictions once per computation, not per coalesced/cached hit.
+        # Rows are buffered and bulk-inserted in the background.
+        if computed:
+            with timed_stage("persist"):
+                prediction_writer.enqueue(symbol, forecasts, _origin(stock_data))
+        predict_requests.inc(outcome="computed" if computed else "cached")
+
+        response_data = _series_response(symbol, stock_data, forecasts)
         
-        logger.info(f"Returning response with {len(actual_prices)} actual prices and predictions")
+        logger.info("Predicted %s from %d bars (computed=%s)", symbol, len(stock_data), computed)
         return response_data
         
     except Exception as e:
-        logger.error(f"Error in predict_stock for {symbol}: {str(e)}")
+        predict_requests.inc(outcome="error")
+        logger.error("Error in predict_stock for %s: %s", symbol, e)
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 @router.post("/upload/")
-def upload_dataset(file: UploadFile = File(...), _: bool = Depends(require_admin)):
-    # Save uploaded file
-    os.makedirs("uploaded_data", exist_ok=True)
-    file_path = os.path.join("uploaded_data", file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    # Optionally, trigger retraining (example: call train_all.py)
+def upload_dataset(file: UploadFile = File(...), symbol: str = "AAPL", models: str = ",".join(MODEL_TYPES),
+                   _: bool = Depends(require_admin)):
+    # Save the upload (hashing it on the way) and queue a job that streams it
+    # into the price store and retrains on it (models="" only ingests);
+    # returns at once - poll /stock/jobs/{job_id} for progress
+    model_list = [m.strip() for m in models.split(",") if m.strip()]
+    unknown = [m for m in model_list if m not in MODEL_TYPES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown model types: {unknown}")
+    file_path, dataset_hash = save_upload(file.file, file.filename)
+    job, created = job_queue.enqueue("retrain", file_path, dataset_hash, {"symbol": symbol.upper(), "models": model_list})
+    message = "File uploaded and retraining started." if created else "Dataset already uploaded; returning the existing retraining job."
+    return {"message": message, "job_id": job["id"], "deduplicated": not created, "job": job}
+
+@router.get("/jobs/")
+def list_jobs(limit: int = 50, status: Optional[str] = None):
+    return {"jobs": job_queue.list(limit=limit, status=status), **job_queue.stats()}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str, _: bool = Depends(require_admin)):
+    # Queued jobs are cancelled at once, running ones at their next checkpoint
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+@router.post("/training/")
+def start_training(symbols: List[str], models: str = ",".join(MODEL_TYPES), _: bool = Depends(require_admin)):
+    # Train many symbols in parallel; returns immediately with a run id
     try:
-        subprocess.run(["python", "train_all.py"], check=True)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Retraining failed: {str(e)}")
-    return {"message": "File uploaded and retraining started."}
+        run = training_orchestrator.start(symbols, [m.strip() for m in models.split(",") if m.strip()])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return run.snapshot()
+
+@router.get("/training/{run_id}")
+def get_training_status(run_id: str):
+    status = training_orchestrator.status(run_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown training run: {run_id}")
+    return status
+
+@router.delete("/training/{run_id}")
+def cancel_training(run_id: str, _: bool = Depends(require_admin)):
+    # Cancels jobs that haven't started yet; running fits finish
+    run = training_orchestrator.runs.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Unknown training run: {run_id}")
+    return {"cancelled": run.cancel(), **run.snapshot()}
 
 @router.get("/metrics/")
-def get_model_metrics():
-    # Example static metrics, replace with real metrics if available
+def get_model_metrics(symbols: str = "AAPL", start: str = "2024-01-01", end: str = "2025-01-01",
+                      steps: int = 5, stride: int = 1):
+    # Walk-forward backtest of every model; forecasts are cached per origin,
+    # so repeat requests only score new days or retrained models
+    if not 1 <= steps <= 60 or stride < 1:
+        raise HTTPException(status_code=400, detail="steps must be 1-60 and stride at least 1")
+    _check_window(steps, None, start, end)
+    symbol_list = _check_symbols(symbols.split(","), METRICS_SYMBOLS_MAX)
+    return backtest_engine.run(symbol_list, start, end, steps=steps, stride=stride)
+
+@router.get("/models/")
+def get_model_cache_stats():
+    # Loaded per-symbol models, memory use and LRU hit/eviction counters
+    return {**model_registry.stats(), "updates": model_updater.stats()}
+
+@router.get("/models/{symbol}")
+def get_symbol_models(symbol: str):
+    # Last full fit, bars absorbed since and available versions per model
+    symbol = _check_symbol(symbol)
+    return {
+        "symbol": symbol,
+        "fit_state": read_fit_state(symbol),
+        "versions": {m: model_registry.versions(symbol, m) for m in MODEL_TYPES},
+    }
+
+@router.post("/models/{symbol}/update")
+def update_symbol_models(symbol: str, _: bool = Depends(require_admin)):
+    # Absorb new cached bars into the symbol's models now instead of waiting
+    return {"symbol": symbol.upper(), "updated": model_updater.update_symbol(symbol)}
+
+@router.get("/snapshot/")
+def get_snapshot_stats():
+    # Precomputed forecast snapshot: universe, age, next run and hit rate
+    return forecast_snapshot.stats()
+
+@router.post("/snapshot/refresh")
+def refresh_snapshot(_: bool = Depends(require_admin)):
+    # Recompute the whole universe now instead of waiting for the close
+    if not forecast_snapshot.symbols:
+        raise HTTPException(status_code=400, detail="No snapshot universe configured (SNAPSHOT_SYMBOLS)")
+    return forecast_snapshot.refresh()
+
+@router.get("/inference/")
+def get_inference_stats():
+    # LSTM micro-batching queue depth, batch sizes and wait times
     return {
-        "rmse": 0.32,
-        "mae": 0.28,
-        "r2": 0.92
+        "lstm_batcher": lstm_batcher.stats(),
+        "prediction_service": prediction_service.stats(),
+        "prediction_writer": prediction_writer.stats(),
     }
 
 @router.get("/users/")
@@ -103,12 +293,3 @@ def get_users():
         {"id": 2, "username": "user2", "lastActive": "2024-03-19"},
         {"id": 3, "username": "user3", "lastActive": "2024-03-18"},
     ]
-
-@router.get("/stats/")
-def get_api_stats():
-    # Example static stats, replace with real tracking if needed
-    return {
-        "api_requests": 2547,
-        "active_users": 3,
-        "model_accuracy": 92
-    }
@@ -0,0 +1,193 @@
+import os
+from typing import Any, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Bars of recent history used to rebuild the residuals when conditioning on
+# new data; MA effects of older shocks have decayed by then.
+CONDITION_WINDOW = int(os.getenv("ARIMA_CONDITION_WINDOW", "60"))
+
+
+def _residuals(z: np.ndarray, ar: np.ndarray, ma: np.ndarray) -> np.ndarray:
+	"""Conditional-sum-of-squares residuals for a batch of (n, T) series.
+
+	The first p residuals are taken as zero. The AR part is one batched
+	matmul; the MA part is recursive in time but vectorized across series.
+	"""
+	n, length = z.shape
+	p, q = len(ar), len(ma)
+	e = z.copy()
+	if p:
+		if length <= p:
+			return np.zeros_like(z)
+		# windows[:, t] holds z[t .. t+p-1]; reversed it lines up with ar.L1..ar.Lp
+		windows = sliding_window_view(z, p, axis=1)[:, :-1]
+		e[:, p:] -= windows[..., ::-1] @ ar
+		e[:, :p] = 0.0
+	if q:
+		for t in range(p, length):
+			lags = min(q, t)
+			if lags:
+				e[:, t] -= e[:, t - lags:t][:, ::-1] @ ma[:lags]
+	return e
+
+
+class ArimaState:
+	"""Compact ARIMA(p, d, q) model: coefficients plus the filter state.
+
+	Holds only what forecasting needs - AR/MA coefficients, the mean of the
+	differenced series, the last p + d observations and the last q
+	residuals - instead of a pickled statsmodels results object. Saved as a
+	small .npz file.
+	"""
+
+	__slots__ = ("order", "ar", "ma", "mean", "sigma2", "history", "resid")
+
+	def __init__(
+		self,
+		order: Tuple[int, int, int],
+		ar: Sequence[float] = (),
+		ma: Sequence[float] = (),
+		mean: float = 0.0,
+		sigma2: float = 0.0,
+		history: Sequence[float] = (),
+		resid: Sequence[float] = (),
+	):
+		self.order = tuple(int(x) for x in order)
+		p, _, q = self.order
+		self.ar = np.asarray(ar, dtype=np.float64).reshape(p)
+		self.ma = np.asarray(ma, dtype=np.float64).reshape(q)
+		self.mean = float(mean)
+		self.sigma2 = float(sigma2)
+		self.history = np.asarray(history, dtype=np.float64)
+		self.resid = np.asarray(resid, dtype=np.float64)
+
+	def __repr__(self) -> str:
+		return f"ArimaState(order={self.order}, mean={self.mean:.4g}, sigma2={self.sigma2:.4g})"
+
+	@classmethod
+	def from_statsmodels(cls, result: Any) -> "ArimaState":
+		"""Extract the compact state from a fitted statsmodels ARIMAResults."""
+		params = dict(zip(result.param_names, np.asarray(result.params, dtype=np.float64)))
+		state = cls(
+			order=result.model.order,
+			ar=result.arparams,
+			ma=result.maparams,
+			mean=params.get("const", 0.0),
+			sigma2=params.get("sigma2", 0.0),
+		)
+		endog = np.asarray(result.model.endog, dtype=np.float64).reshape(-1)
+		return state.condition(endog)
+
+	@classmethod
+	def load(cls, path: str) -> "ArimaState":
+		with np.load(path) as f:
+			return cls(
+				order=tuple(f["order"]),
+				ar=f["ar"],
+				ma=f["ma"],
+				mean=float(f["mean"]),
+				sigma2=float(f["sigma2"]),
+				history=f["history"],
+				resid=f["resid"],
+			)
+
+	def save(self, path: str):
+		np.savez(
+			path,
+			order=np.asarray(self.order),
+			ar=self.ar,
+			ma=self.ma,
+			mean=self.mean,
+			sigma2=self.sigma2,
+			history=self.history,
+			resid=self.resid,
+		)
+
+	def _filter(self, closes: np.ndarray):
+		"""Difference and filter a (n, T) batch of closes.
+
+		Returns (z, e, levels): the demeaned differenced series, its
+		residuals, and the last value of each differencing level (outermost
+		first) needed to integrate forecasts back to prices.
+		"""
+		p, d, q = self.order
+		w = closes
+		levels = []
+		for _ in range(d):
+			levels.append(w[:, -1])
+			w = np.diff(w, axis=1)
+		z = w - self.mean
+		if z.shape[1] < p:
+			z = np.pad(z, ((0, 0), (p - z.shape[1], 0)))
+		return z, _residuals(z, self.ar, self.ma), levels
+
+	def _forecast(self, z: np.ndarray, e: np.ndarray, levels, steps: int) -> np.ndarray:
+		p, _, q = self.order
+		n = z.shape[0]
+		z_buf = z[:, z.shape[1] - p:] if p else np.zeros((n, 0))
+		e_buf = np.zeros((n, q))
+		if q:
+			tail = e[:, max(0, e.shape[1] - q):]
+			e_buf[:, q - tail.shape[1]:] = tail
+		preds = np.empty((n, steps))
+		for h in range(steps):
+			z_next = z_buf[:, ::-1] @ self.ar + e_buf[:, ::-1] @ self.ma
+			preds[:, h] = z_next
+			if p:
+				z_buf = np.concatenate([z_buf[:, 1:], z_next[:, None]], axis=1)
+			if q:
+				# Future shocks have zero expectation
+				e_buf = np.concatenate([e_buf[:, 1:], np.zeros((n, 1))], axis=1)
+		forecast = preds + self.mean
+		for level in reversed(levels):
+			forecast = level[:, None] + np.cumsum(forecast, axis=1)
+		return forecast
+
+	def condition(self, closes: Sequence[float]) -> "ArimaState":
+		"""Return a copy whose filter state is rebuilt from ``closes``."""
+		p, d, q = self.order
+		closes = np.asarray(closes, dtype=np.float64)[-max(CONDITION_WINDOW, p + d + 1):]
+		z, e, _ = self._filter(closes[None, :])
+		return ArimaState(
+			self.order, self.ar, self.ma, self.mean, self.sigma2,
+			history=closes[len(closes) - (p + d):],
+			resid=e[0, e.shape[1] - q:] if q else (),
+		)
+
+	def forecast(self, steps: int = 5) -> np.ndarray:
+		"""Forecast from the stored state (the series the model was fit on)."""
+		p, d, q = self.order
+		if len(self.history) < p + d or len(self.history) == 0:
+			raise ValueError("ArimaState has no history to forecast from")
+		z, _, levels = self._filter(self.history[None, :])
+		e = self.resid[None, :] if q else np.zeros((1, 0))
+		return self._forecast(z, e, levels, steps)[0]
+
+	def forecast_batch(self, closes: np.ndarray, steps: int = 5) -> np.ndarray:
+		"""Forecast ``steps`` ahead for a (n, T) batch of recent closes.
+
+		Each row is filtered with this model's coefficients, so forecasts
+		condition on that series' actual recent prices. Returns (n, steps).
+		"""
+		closes = np.asarray(closes, dtype=np.float64)
+		if closes.ndim == 1:
+			closes = closes[None, :]
+		z, e, levels = self._filter(closes)
+		return self._forecast(z, e, levels, steps)
+
+
+def stack_recent(series: Sequence[np.ndarray], window: Optional[int] = None) -> np.ndarray:
+	"""Stack the last ``window`` closes of each series into one (n, window) array.
+
+	Shorter series are left-padded with their first value, which adds no
+	spurious changes to the differenced series.
+	"""
+	window = window or CONDITION_WINDOW
+	out = np.empty((len(series), window))
+	for i, values in enumerate(series):
+		tail = np.asarray(values, dtype=np.float64)[-window:]
+		out[i, window - len(tail):] = tail
+		out[i, :window - len(tail)] = tail[0]
+	return out
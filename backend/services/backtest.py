@@ -0,0 +1,386 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from services.arima_numpy import CONDITION_WINDOW
+from services.model_predict import _lstm_input_dims, forecast_lstm, sentiment_effect
+from services.model_registry import ModelRegistry, model_registry
+from services.prediction_pipeline import PredictionPipeline, default_pipeline
+from services.price_series import PriceSeries
+from services.price_store import PriceStore, price_store
+from services.sentiment_store import SentimentStore, sentiment_store
+
+logger = logging.getLogger(__name__)
+
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BACKTEST_CACHE_DIR = os.getenv("BACKTEST_CACHE_DIR", os.path.join(base_dir, "data", "backtests"))
+# Symbols are evaluated concurrently; NumPy and Keras release the GIL, and
+# concurrent LSTM batches are merged by the micro-batcher
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", "4"))
+# Bars of history behind each forecast, like the one-year window /stock/predict fetches
+BACKTEST_LOOKBACK = int(os.getenv("BACKTEST_LOOKBACK", "252"))
+LSTM_CHUNK_ROWS = 4096
+# Part of every cache key; bump when a model's forecasting method changes so
+# forecasts cached by the old method are recomputed
+FORECAST_METHOD_VERSION = 2
+
+BASE_MODEL_TYPES = ("arima", "lstm")
+NAIVE_VERSION = "naive"
+
+
+def _arima_fingerprint(state: Any) -> str:
+	"""Hash of the coefficients; all that walk-forward ARIMA forecasts depend on."""
+	digest = hashlib.sha1(repr(state.order).encode())
+	for values in (state.ar, state.ma, [state.mean]):
+		digest.update(np.asarray(values, dtype=np.float64).tobytes())
+	return digest.hexdigest()[:16]
+
+
+def _model_version(registry: ModelRegistry, symbol: str, model_type: str) -> str:
+	"""Identify the model that serves a symbol; changes when it is retrained.
+
+	ARIMA is identified by its coefficients, so a new artifact with the same
+	fit keeps the cached walk-forward forecasts.
+	"""
+	resolved = registry.resolve(symbol, model_type)
+	if resolved is None:
+		return NAIVE_VERSION
+	(owner, _, version), path = resolved
+	if model_type == "arima":
+		state = registry.get(symbol, model_type)
+		if state is not None:
+			return f"{owner}-{_arima_fingerprint(state)}"
+	try:
+		mtime = int(os.path.getmtime(path))
+	except OSError:
+		mtime = 0
+	return f"{owner}-{version}-{mtime}"
+
+
+def walk_forward_arima(state: Any, close: np.ndarray, origins: np.ndarray, steps: int) -> np.ndarray:
+	"""ARIMA forecasts made at every origin, as one vectorized (n, steps) call.
+
+	Each origin conditions on its own trailing CONDITION_WINDOW closes, as
+	a live request does.
+	"""
+	if state is None:
+		return np.repeat(close[origins, None], steps, axis=1)
+	window = min(CONDITION_WINDOW, int(origins.min()) + 1)
+	recent = sliding_window_view(close, window)[origins - window + 1]
+	return state.forecast_batch(recent, steps)
+
+
+def walk_forward_lstm(model: Any, close: np.ndarray, origins: np.ndarray, steps: int, lookback: int) -> np.ndarray:
+	"""LSTM forecasts made at every origin, in a few large forward passes per step.
+
+	Mirrors ``predict_stock_price_lstm_batch``: the window ending at each
+	origin, min-max scaled by the ``lookback`` bars a live request would
+	have fetched, is forecast recursively with ``forecast_lstm``.
+	"""
+	if model is None:
+		return np.repeat(close[origins, None], steps, axis=1)
+	timesteps, features = _lstm_input_dims(model, lookback)
+	history = sliding_window_view(close, lookback)[origins - lookback + 1]
+	lo, hi = history.min(axis=1), history.max(axis=1)
+	# Flat histories are fed unscaled, like the live predictor does
+	flat = hi <= lo
+	shift = np.where(flat, 0.0, lo).astype(np.float32)
+	scale = np.where(flat, 1.0, hi - lo).astype(np.float32)
+
+	windows = sliding_window_view(close.astype(np.float32), timesteps)[origins - timesteps + 1]
+	x = (windows - shift[:, None]) / scale[:, None]
+	raw = forecast_lstm(model, x, steps, features, chunk_rows=LSTM_CHUNK_ROWS)
+	return raw * scale[:, None] + shift[:, None]
+
+
+class ForecastCache:
+	"""Walk-forward forecasts per (model type, model version, symbol, steps, lookback).
+
+	Keeps, for every origin date already evaluated, the forecast and the
+	close it was made from. A later request only computes origins that are
+	missing, or whose close has since changed (e.g. a re-uploaded history).
+	Entries are kept in memory and as .npz files so restarts stay warm.
+	"""
+
+	def __init__(self, directory: Optional[str] = None):
+		self.directory = directory or BACKTEST_CACHE_DIR
+		self._entries: Dict[Tuple, Dict[str, np.ndarray]] = {}
+		self._lock = threading.Lock()
+		self._write_lock = threading.Lock()
+
+	def _path(self, key: Tuple) -> str:
+		name = "-".join(re.sub(r"[^A-Za-z0-9_.]", "_", str(part)) for part in key)
+		return os.path.join(self.directory, name + ".npz")
+
+	def get(self, key: Tuple) -> Optional[Dict[str, np.ndarray]]:
+		with self._lock:
+			entry = self._entries.get(key)
+		if entry is not None:
+			return entry
+		try:
+			with np.load(self._path(key)) as f:
+				entry = {name: f[name] for name in ("dates", "origin_close", "forecasts")}
+		except (OSError, KeyError, ValueError):
+			return None
+		with self._lock:
+			self._entries[key] = entry
+		return entry
+
+	def put(self, key: Tuple, dates: np.ndarray, origin_close: np.ndarray, forecasts: np.ndarray):
+		with self._write_lock:
+			self._put(key, dates, origin_close, forecasts)
+
+	def _put(self, key: Tuple, dates: np.ndarray, origin_close: np.ndarray, forecasts: np.ndarray):
+		old = self.get(key)
+		if old is not None:
+			# New rows win over cached ones for the same date
+			dates = np.concatenate([dates, old["dates"]])
+			origin_close = np.concatenate([origin_close, old["origin_close"]])
+			forecasts = np.concatenate([forecasts, old["forecasts"]])
+		dates, idx = np.unique(dates, return_index=True)
+		entry = {"dates": dates, "origin_close": origin_close[idx], "forecasts": forecasts[idx]}
+		with self._lock:
+			self._entries[key] = entry
+		try:
+			os.makedirs(self.directory, exist_ok=True)
+			path = self._path(key)
+			np.savez(path + ".tmp.npz", **entry)
+			os.replace(path + ".tmp.npz", path)
+		except OSError as e:
+			logger.warning("Backtest cache: could not persist %s: %s", key, e)
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+
+
+def _error_sums(pred: np.ndarray, actual: np.ndarray, origin_close: np.ndarray) -> Dict[str, Any]:
+	err = pred - actual
+	rel = err / origin_close[:, None]
+	return {
+		"n": int(err.size),
+		"sse": float(np.sum(err ** 2)),
+		"sae": float(np.sum(np.abs(err))),
+		"sum_y": float(np.sum(actual)),
+		"sum_y2": float(np.sum(actual ** 2)),
+		"rel_sse": float(np.sum(rel ** 2)),
+		"rel_sae": float(np.sum(np.abs(rel))),
+		"step_sse": np.sum(err ** 2, axis=0).tolist(),
+		"origins": int(err.shape[0]),
+	}
+
+
+def _metrics(sums: Dict[str, Any]) -> Dict[str, Any]:
+	n = sums["n"]
+	if not n:
+		return {"rmse": None, "mae": None, "r2": None, "count": 0}
+	sst = sums["sum_y2"] - sums["sum_y"] ** 2 / n
+	origins = max(sums["origins"], 1)
+	return {
+		"rmse": round(float(np.sqrt(sums["sse"] / n)), 4),
+		"mae": round(sums["sae"] / n, 4),
+		"r2": round(1.0 - sums["sse"] / sst, 4) if sst > 0 else None,
+		# Errors as a fraction of the price the forecast was made from
+		"relative_rmse": round(float(np.sqrt(sums["rel_sse"] / n)), 5),
+		"relative_mae": round(sums["rel_sae"] / n, 5),
+		"rmse_by_step": [round(float(np.sqrt(sse / origins)), 4) for sse in sums["step_sse"]],
+		"count": n,
+	}
+
+
+class BacktestEngine:
+	"""Walk-forward evaluation of the prediction models over price history.
+
+	For every origin (trading day) in ``[start, end)`` each model forecasts
+	``steps`` closes from the history up to that day, and the forecasts are
+	scored against the closes that followed. Per symbol, all origins go to
+	the model in one batched call; symbols run in parallel. Base-model
+	forecasts are cached per origin, so repeated requests are served from
+	the cache and only new days or retrained models are recomputed.
+	Ensembles are recombined from the cached base forecasts.
+	"""
+
+	def __init__(
+		self,
+		store: Optional[PriceStore] = None,
+		registry: Optional[ModelRegistry] = None,
+		pipeline: Optional[PredictionPipeline] = None,
+		cache: Optional[ForecastCache] = None,
+		workers: int = BACKTEST_WORKERS,
+		lookback: int = BACKTEST_LOOKBACK,
+		sentiment: Optional[SentimentStore] = None,
+	):
+		self.store = store or price_store
+		self.sentiment = sentiment or sentiment_store
+		self.registry = registry or model_registry
+		self.pipeline = pipeline or default_pipeline
+		self.cache = cache or ForecastCache()
+		self.lookback = lookback
+		self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backtest")
+		self.computed_origins = 0
+		self.cached_origins = 0
+		self._counter_lock = threading.Lock()
+
+	def _history(self, symbol: str, start: str, end: str, lookback: int) -> PriceSeries:
+		# Enough calendar days before ``start`` to cover the lookback in trading days
+		fetch_start = str(np.datetime64(start, "D") - np.timedelta64(int(lookback * 1.5) + 10, "D"))
+		series = PriceSeries.from_bars(self.store.get_bars(symbol, fetch_start, end), symbol)
+		series.sentiment = self.sentiment.feature(symbol, series.dates)
+		return series
+
+	def _base_forecasts(self, model_type: str, symbol: str, series: PriceSeries, origins: np.ndarray,
+						steps: int, lookback: int) -> Tuple[np.ndarray, str]:
+		version = _model_version(self.registry, symbol, model_type)
+		key = (model_type, version, symbol, steps, lookback, FORECAST_METHOD_VERSION)
+		dates = series.dates[origins]
+		origin_close = series.close[origins]
+		out = np.empty((len(origins), steps))
+		todo = np.ones(len(origins), dtype=bool)
+
+		entry = self.cache.get(key)
+		if entry is not None and len(entry["dates"]):
+			pos = np.searchsorted(entry["dates"], dates).clip(max=len(entry["dates"]) - 1)
+			hit = (entry["dates"][pos] == dates) & (entry["origin_close"][pos] == origin_close)
+			out[hit] = entry["forecasts"][pos[hit]]
+			todo = ~hit
+		with self._counter_lock:
+			self.cached_origins += int((~todo).sum())
+
+		if todo.any():
+			missing = origins[todo]
+			model = None if version == NAIVE_VERSION else self.registry.get(symbol, model_type)
+			if model_type == "arima":
+				computed = walk_forward_arima(model, series.close, missing, steps)
+			else:
+				computed = walk_forward_lstm(model, series.close, missing, steps, lookback)
+			out[todo] = computed
+			self.cache.put(key, dates[todo], origin_close[todo], computed)
+			with self._counter_lock:
+				self.computed_origins += len(missing)
+		return out, version
+
+	def _sentiment_effects(self, series: PriceSeries, origins: np.ndarray, steps: int,
+						   lookback: int) -> Optional[np.ndarray]:
+		"""Per origin, the sentiment effect a live request at that bar would apply."""
+		if series.sentiment is None or not np.any(series.sentiment[:origins[-1] + 1]):
+			return None
+		return np.stack([
+			sentiment_effect(PriceSeries(series.close[o - lookback + 1:o + 1],
+										 sentiment=series.sentiment[o - lookback + 1:o + 1]), steps)
+			for o in origins
+		])
+
+	def _ensemble(self, name: str, forecasts: Dict[str, np.ndarray], effects: Optional[np.ndarray] = None) -> np.ndarray:
+		if name not in forecasts:
+			weights = self.pipeline.ensembles[name]
+			total = sum(w * self._ensemble(component, forecasts, effects) for component, w in weights.items())
+			# Same rounding as combine_forecasts, then the sentiment input as in the pipeline
+			total = np.round(total, 2)
+			if effects is not None and name in self.pipeline.sentiment_ensembles:
+				total = np.round(total * effects, 2)
+			forecasts[name] = total
+		return forecasts[name]
+
+	def run_symbol(self, symbol: str, start: str, end: str, steps: int = 5, stride: int = 1) -> Dict[str, Any]:
+		symbol = symbol.upper()
+		lookback = max(self.lookback, steps)
+		lstm_model = self.registry.get(symbol, "lstm")
+		if lstm_model is not None:
+			# The input window must fit inside the history
+			timesteps, _ = _lstm_input_dims(lstm_model, lookback)
+			lookback = max(lookback, timesteps)
+
+		series = self._history(symbol, start, end, lookback)
+		n = len(series)
+		in_range = (series.dates >= np.datetime64(start, "D")) & (series.dates < np.datetime64(end, "D"))
+		index = np.arange(n)
+		# An origin needs `lookback` bars behind it and `steps` realized bars after it
+		usable = in_range & (index >= lookback - 1) & (index + steps <= n - 1)
+		origins = index[usable][::max(stride, 1)]
+		result: Dict[str, Any] = {"symbol": symbol, "origins": int(len(origins)), "models": {}, "versions": {}}
+		if not len(origins):
+			return result
+
+		actual = sliding_window_view(series.close[1:], steps)[origins]
+		origin_close = series.close[origins]
+		forecasts: Dict[str, np.ndarray] = {}
+		for model_type in BASE_MODEL_TYPES:
+			forecasts[model_type], result["versions"][model_type] = self._base_forecasts(
+				model_type, symbol, series, origins, steps, lookback
+			)
+		effects = self._sentiment_effects(series, origins, steps, lookback)
+		for name in self.pipeline.ensembles:
+			self._ensemble(name, forecasts, effects)
+
+		result["sums"] = {name: _error_sums(pred, actual, origin_close) for name, pred in forecasts.items()}
+		# Persistence forecast: every step equals the origin close
+		result["sums"]["naive"] = _error_sums(np.repeat(origin_close[:, None], steps, axis=1), actual, origin_close)
+		result["models"] = {name: _metrics(sums) for name, sums in result["sums"].items()}
+		result["start"] = str(series.dates[origins[0]])
+		result["end"] = str(series.dates[origins[-1]])
+		return result
+
+	def run(self, symbols: Sequence[str], start: str, end: str, steps: int = 5, stride: int = 1,
+			headline: str = "hybrid") -> Dict[str, Any]:
+		"""Backtest many symbols in parallel and pool their errors per model.
+
+		Top-level ``rmse``/``mae`` are the headline model's errors relative to
+		price (so they compare across symbols) and ``r2`` is its
+		count-weighted per-symbol R² on prices; absolute figures per model
+		and per symbol are included.
+		"""
+		t0 = time.perf_counter()
+		computed, cached = self.computed_origins, self.cached_origins
+		symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+		futures = [self._executor.submit(self.run_symbol, s, start, end, steps, stride) for s in symbols]
+		per_symbol = [future.result() for future in futures]
+
+		pooled: Dict[str, Dict[str, Any]] = {}
+		r2_weighted: Dict[str, List[float]] = {}
+		for result in per_symbol:
+			for name, sums in result.pop("sums", {}).items():
+				total = pooled.setdefault(name, {k: 0 if k != "step_sse" else [0.0] * steps for k in sums})
+				for k, v in sums.items():
+					total[k] = [a + b for a, b in zip(total[k], v)] if k == "step_sse" else total[k] + v
+				r2 = result["models"][name]["r2"]
+				if r2 is not None:
+					acc = r2_weighted.setdefault(name, [0.0, 0.0])
+					acc[0] += r2 * sums["n"]
+					acc[1] += sums["n"]
+
+		models = {}
+		for name, sums in pooled.items():
+			metrics = _metrics(sums)
+			acc = r2_weighted.get(name)
+			metrics["r2"] = round(acc[0] / acc[1], 4) if acc and acc[1] else None
+			models[name] = metrics
+
+		if headline not in models:
+			headline = next(iter(models), headline)
+		top = models.get(headline, {})
+		return {
+			"rmse": top.get("relative_rmse"),
+			"mae": top.get("relative_mae"),
+			"r2": top.get("r2"),
+			"model": headline,
+			"start": start,
+			"end": end,
+			"steps": steps,
+			"models": models,
+			"symbols": per_symbol,
+			"computed_origins": self.computed_origins - computed,
+			"cached_origins": self.cached_origins - cached,
+			"seconds": round(time.perf_counter() - t0, 4),
+		}
+
+
+# Shared engine used by the metrics route
+backtest_engine = BacktestEngine()
@@ -1,42 +1,40 @@
-import yfinance as yf
-from typing import List, Dict, Any
-import math
+import logging
+from typing import Dict, List
 
+from services.price_store import price_store
+from services.price_series import PriceSeries
+from services.sentiment_store import sentiment_store
 
-def get_stock_data(symbol: str, start: str, end: str) -> List[Dict[str, Any]]:
+logger = logging.getLogger(__name__)
+
+
+def _to_series(symbol: str, bars) -> PriceSeries:
+	# Vectorized Close column selection; rows without a numeric Close are dropped
+	series = PriceSeries.from_bars(bars, symbol.upper())
+	try:
+		# Precomputed daily aggregates: one binary search over the stored days
+		series.sentiment = sentiment_store.feature(series.symbol, series.dates)
+	except Exception as e:
+		logger.warning("Sentiment feature unavailable for %s: %s", symbol, e)
+	return series
+
+
+def get_stock_data(symbol: str, start: str, end: str) -> PriceSeries:
+	try:
+		# Bars come from the local price store, which only downloads ranges
+		# it has not seen yet (and refreshes the latest bar after a TTL)
+		return _to_series(symbol, price_store.get_bars(symbol, start, end))
+	except Exception as e:
+		logger.error("Error in get_stock_data for %s: %s", symbol, e)
+		# On any error, return an empty series so callers can degrade gracefully
+		return PriceSeries.empty(symbol.upper())
+
+
+def get_stock_data_many(symbols: List[str], start: str, end: str) -> Dict[str, PriceSeries]:
+	"""``get_stock_data`` for many symbols; uncached ranges come from one bulk download."""
 	try:
-		stock = yf.download(symbol, start=start, end=end, progress=False)
-		if stock is None or stock.empty:
-			return []
-		
-		# Handle multi-level columns from yfinance
-		stock = stock.reset_index()
-		
-		# Convert to records and handle the multi-level column structure
-		records = stock.to_dict(orient="records")
-		
-		# Filter out rows without a numeric Close
-		cleaned: List[Dict[str, Any]] = []
-		for row in records:
-			# Try different possible Close column names
-			close = None
-			if 'Close' in row:
-				close = row['Close']
-			elif ('Close', symbol) in row:
-				close = row[('Close', symbol)]
-			elif ('Close', symbol.upper()) in row:
-				close = row[('Close', symbol.upper())]
-			
-			if isinstance(close, (int, float)) and not (isinstance(close, float) and math.isnan(close)):
-				# Create a clean record with just the essential data
-				clean_row = {
-					'Close': float(close),
-					'Date': str(row.get(('Date', ''), row.get('Date', 'Unknown')))
-				}
-				cleaned.append(clean_row)
-		
-		return cleaned
+		bars_by_symbol = price_store.get_bars_many(symbols, start, end)
 	except Exception as e:
-		print(f"Error in get_stock_data: {e}")
-		# On any error, return empty list so callers can degrade gracefully
-		return []
+		logger.error("Bulk price fetch failed, fetching symbols one by one: %s", e)
+		return {symbol.upper(): get_stock_data(symbol, start, end) for symbol in symbols}
+	return {symbol: _to_series(symbol, bars) for symbol, bars in bars_by_symbol.items()}
@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, time as day_time, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from services.data_fetch import get_stock_data_many
+from services.prediction_pipeline import PredictionPipeline, default_pipeline
+from services.prediction_service import DEFAULT_END, DEFAULT_START, PREDICTION_BATCH_CHUNK
+from services.prediction_writer import PredictionWriter, prediction_writer
+
+logger = logging.getLogger(__name__)
+
+# Forecasts for a symbol universe are precomputed once per trading day after
+# the close and published as one structured .npy file (memory-mapped on read)
+# plus a JSON sidecar naming it. A request matching the snapshot's range and
+# lookback, with a horizon up to SNAPSHOT_HORIZON, is one dict lookup and one
+# row read; anything else is computed live.
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(base_dir, "data", "snapshots"))
+# Symbols to precompute, e.g. "AAPL,MSFT"; empty disables the schedule
+SNAPSHOT_SYMBOLS = [s.strip().upper() for s in os.getenv("SNAPSHOT_SYMBOLS", "").split(",") if s.strip()]
+# Longest horizon stored; shorter requests are served from its prefix
+SNAPSHOT_HORIZON = int(os.getenv("SNAPSHOT_HORIZON", "20"))
+SNAPSHOT_LOOKBACK = int(os.getenv("SNAPSHOT_LOOKBACK", "0")) or None
+SNAPSHOT_START = os.getenv("SNAPSHOT_START", DEFAULT_START)
+SNAPSHOT_END = os.getenv("SNAPSHOT_END", DEFAULT_END)
+# Weekdays at this exchange-local time (after the 16:00 close and the bar's settlement)
+SNAPSHOT_RUN_AT = os.getenv("SNAPSHOT_RUN_AT", "16:30")
+SNAPSHOT_TIMEZONE = os.getenv("SNAPSHOT_TIMEZONE", "America/New_York")
+# Seconds a snapshot is served; covers a skipped run, not a whole weekend
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", str(36 * 3600)))
+# Bars of actual prices kept per symbol, as /stock/predict returns
+SNAPSHOT_ACTUAL_BARS = 30
+
+META_FILE = "snapshot.json"
+
+
+def next_run(now: datetime, at: str = SNAPSHOT_RUN_AT, tz: str = SNAPSHOT_TIMEZONE) -> datetime:
+	"""The first weekday ``at`` (HH:MM in ``tz``) strictly after ``now``."""
+	zone = ZoneInfo(tz)
+	local = now.astimezone(zone)
+	hour, minute = (int(part) for part in at.split(":"))
+	for days in range(8):
+		candidate = datetime.combine(local.date() + timedelta(days=days), day_time(hour, minute), tzinfo=zone)
+		if candidate > local and candidate.weekday() < 5:
+			return candidate
+	raise ValueError(f"No run time after {now}")
+
+
+def snapshot_dtype(models: int, horizon: int) -> np.dtype:
+	return np.dtype([
+		("symbol", "U16"),
+		("origin", "datetime64[D]"),
+		("sentiment", "f8"),
+		("actual_len", "i4"),
+		("actual", "f8", (SNAPSHOT_ACTUAL_BARS,)),
+		("forecast", "f8", (models, horizon)),
+	])
+
+
+class ForecastSnapshot:
+	"""Precomputed forecasts for a symbol universe, served in O(1).
+
+	``refresh`` fetches every symbol in one bulk call, runs the vectorized
+	pipeline in chunks and publishes a new snapshot file; readers pick it up
+	on their next lookup. ``get`` returns None on any miss (unknown symbol,
+	other range or lookback, longer horizon, stale snapshot) so the caller
+	falls back to live computation.
+	"""
+
+	def __init__(
+		self,
+		root: Optional[str] = None,
+		symbols: Optional[List[str]] = None,
+		horizon: int = SNAPSHOT_HORIZON,
+		lookback: Optional[int] = SNAPSHOT_LOOKBACK,
+		start: str = SNAPSHOT_START,
+		end: str = SNAPSHOT_END,
+		max_age: float = SNAPSHOT_MAX_AGE,
+		pipeline: Optional[PredictionPipeline] = None,
+		fetch: Optional[Callable[[List[str], str, str], Dict[str, Any]]] = None,
+		writer: Optional[PredictionWriter] = None,
+		clock: Callable[[], float] = time.time,
+	):
+		self.root = root or SNAPSHOT_DIR
+		self.symbols = SNAPSHOT_SYMBOLS if symbols is None else [s.upper() for s in symbols]
+		self.horizon = horizon
+		self.lookback = lookback
+		self.start_date = start
+		self.end_date = end
+		self.max_age = max_age
+		self.pipeline = pipeline or default_pipeline
+		self.fetch = fetch or get_stock_data_many
+		# Precomputed forecasts are persisted like live ones
+		self.writer = writer or prediction_writer
+		self.clock = clock
+		self._refresh_lock = threading.Lock()
+		self._load_lock = threading.Lock()
+		# (meta, rows, symbol -> row index), swapped as a whole on reload
+		self._current: Optional[Tuple[Dict[str, Any], np.ndarray, Dict[str, int]]] = None
+		self._loaded_mtime: Optional[int] = None
+		self._thread: Optional[threading.Thread] = None
+		self._stopped = threading.Event()
+		self.hits = 0
+		self.misses = 0
+		self.refreshes = 0
+		self.last_refresh: Dict[str, Any] = {}
+
+	def _meta_path(self) -> str:
+		return os.path.join(self.root, META_FILE)
+
+	def _reload(self) -> Optional[Tuple[Dict[str, Any], np.ndarray, Dict[str, int]]]:
+		"""Load the published snapshot if the sidecar changed; one stat otherwise."""
+		try:
+			mtime = os.stat(self._meta_path()).st_mtime_ns
+		except OSError:
+			return self._current
+		if mtime == self._loaded_mtime:
+			return self._current
+		with self._load_lock:
+			if mtime != self._loaded_mtime:
+				try:
+					with open(self._meta_path()) as f:
+						meta = json.load(f)
+					rows = np.load(os.path.join(self.root, meta["file"]), mmap_mode="r")
+				except (OSError, ValueError, KeyError) as e:
+					logger.warning("Forecast snapshot unreadable, serving live: %s", e)
+					return self._current
+				index = {str(symbol): i for i, symbol in enumerate(rows["symbol"])}
+				self._current = (meta, rows, index)
+				self._loaded_mtime = mtime
+		return self._current
+
+	def get(self, symbol: str, horizon: int, start: str, end: str,
+			lookback: Optional[int] = None) -> Optional[Dict[str, Any]]:
+		"""Stored forecasts of ``horizon`` bars for ``symbol``, or None to compute live."""
+		current = self._reload()
+		if current is not None:
+			meta, rows, index = current
+			i = index.get(symbol.upper())
+			same_input = (start, end, lookback) == (meta["start"], meta["end"], meta["lookback"])
+			fresh = self.clock() - meta["created_at"] <= self.max_age
+			if i is not None and same_input and fresh and horizon <= meta["horizon"]:
+				row = rows[i]
+				self.hits += 1
+				sentiment = float(row["sentiment"])
+				return {
+					"actual_prices": row["actual"][:row["actual_len"]].tolist(),
+					"forecasts": {name: row["forecast"][k, :horizon].tolist() for k, name in enumerate(meta["models"])},
+					"sentiment": None if np.isnan(sentiment) else sentiment,
+					"origin_date": str(row["origin"]),
+					"created_at": meta["created_at"],
+				}
+		self.misses += 1
+		return None
+
+	def refresh(self, symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+		"""Recompute the universe (or ``symbols``) and publish a new snapshot."""
+		symbols = self.symbols if symbols is None else [s.upper() for s in symbols]
+		with self._refresh_lock:
+			t0 = time.perf_counter()
+			series_by_symbol = self.fetch(symbols, self.start_date, self.end_date)
+			if self.lookback:
+				series_by_symbol = {s: series.tail(self.lookback) for s, series in series_by_symbol.items()}
+			usable = {s: series for s, series in series_by_symbol.items() if len(series)}
+			models = self.pipeline.model_names
+
+			rows = np.zeros(len(usable), dtype=snapshot_dtype(len(models), self.horizon))
+			persisted = []
+			keys = list(usable)
+			for i in range(0, len(keys), PREDICTION_BATCH_CHUNK):
+				chunk = {s: usable[s] for s in keys[i:i + PREDICTION_BATCH_CHUNK]}
+				for j, (symbol, forecasts) in enumerate(self.pipeline.run_batch(chunk, steps=self.horizon).items(), start=i):
+					series = usable[symbol]
+					actual = series.close[-SNAPSHOT_ACTUAL_BARS:]
+					rows["symbol"][j] = symbol
+					rows["origin"][j] = series.dates[-1]
+					rows["sentiment"][j] = series.sentiment[-1] if series.sentiment is not None else np.nan
+					rows["actual_len"][j] = len(actual)
+					rows["actual"][j, :len(actual)] = actual
+					rows["forecast"][j] = [forecasts[name] for name in models]
+					persisted.append((symbol, forecasts, series.dates[-1].item()))
+
+			self._publish(rows, {
+				"models": models,
+				"horizon": self.horizon,
+				"lookback": self.lookback,
+				"start": self.start_date,
+				"end": self.end_date,
+				"created_at": self.clock(),
+			})
+			if persisted:
+				self.writer.enqueue_many(persisted)
+			self.refreshes += 1
+			self.last_refresh = {
+				"symbols": len(rows),
+				"missing": sorted(set(symbols) - set(usable)),
+				"seconds": round(time.perf_counter() - t0, 3),
+			}
+		logger.info("Forecast snapshot refreshed: %d symbols in %.1fs", len(rows), self.last_refresh["seconds"])
+		return self.last_refresh
+
+	def _publish(self, rows: np.ndarray, meta: Dict[str, Any]):
+		# A new file per snapshot, then the sidecar is swapped to name it, so
+		# a reader never pairs a sidecar with another snapshot's rows
+		os.makedirs(self.root, exist_ok=True)
+		name = f"forecasts-{time.time_ns()}.npy"
+		np.save(os.path.join(self.root, name + ".tmp.npy"), rows)
+		os.replace(os.path.join(self.root, name + ".tmp.npy"), os.path.join(self.root, name))
+		meta_path = self._meta_path()
+		with open(meta_path + ".tmp", "w") as f:
+			json.dump({**meta, "file": name}, f)
+		os.replace(meta_path + ".tmp", meta_path)
+		# Open memory maps keep unlinked files readable
+		for old in os.listdir(self.root):
+			if old.startswith("forecasts-") and old.endswith(".npy") and old != name:
+				try:
+					os.remove(os.path.join(self.root, old))
+				except OSError:
+					pass
+
+	def start(self):
+		if self._thread is not None or not self.symbols:
+			return
+		self._thread = threading.Thread(target=self._run, name="forecast-snapshot", daemon=True)
+		self._thread.start()
+
+	def stop(self):
+		self._stopped.set()
+
+	def _run(self):
+		current = self._reload()
+		# Without a fresh snapshot (first start, missed runs) build one right away
+		due = current is None or self.clock() - current[0]["created_at"] > self.max_age
+		while not self._stopped.is_set():
+			if due:
+				try:
+					self.refresh()
+				except Exception as e:
+					logger.exception("Forecast snapshot refresh failed: %s", e)
+			wait = (next_run(datetime.now(timezone.utc)) - datetime.now(timezone.utc)).total_seconds()
+			due = not self._stopped.wait(max(wait, 0.0))
+
+	def stats(self) -> Dict[str, Any]:
+		current = self._reload()
+		meta = current[0] if current is not None else {}
+		return {
+			"universe": len(self.symbols),
+			"symbols": len(current[2]) if current is not None else 0,
+			"horizon": meta.get("horizon"),
+			"created_at": meta.get("created_at"),
+			"next_run": next_run(datetime.now(timezone.utc)).isoformat() if self.symbols else None,
+			"hits": self.hits,
+			"misses": self.misses,
+			"refreshes": self.refreshes,
+			"last_refresh": self.last_refresh,
+		}
+
+
+# Shared snapshot used by the prediction routes and the after-close schedule
+forecast_snapshot = ForecastSnapshot()
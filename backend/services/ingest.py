@@ -0,0 +1,164 @@
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import numpy as np
+
+from services.price_store import BAR_DTYPE, OHLCV_FIELDS, PriceStore, price_store
+from services.symbols import valid_symbol
+
+# Rows parsed per chunk; memory use is bounded by one chunk plus the bars of
+# the largest single symbol, however big the file is
+INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "200000"))
+
+Progress = Callable[[int, int], None]
+
+
+def _normalize_columns(columns) -> Dict[Any, str]:
+	"""Map file columns onto Date/Symbol/OHLCV names, case-insensitively."""
+	keys = {str(column).strip().lower().replace(" ", "").replace("_", ""): column for column in columns}
+	aliases = {"Date": ("date", "datetime", "timestamp"), "Symbol": ("symbol", "ticker"), "Close": ("close", "adjclose")}
+	mapping: Dict[Any, str] = {}
+	for name in ("Date", "Symbol") + OHLCV_FIELDS:
+		for key in aliases.get(name, (name.lower(),)):
+			if key in keys:
+				mapping[keys[key]] = name
+				break
+	return mapping
+
+
+def _csv_chunks(path: str, chunk_rows: int, progress: Optional[Progress]) -> Iterator["Any"]:
+	import pandas as pd
+
+	total = os.path.getsize(path)
+	with open(path, "rb") as f:
+		for chunk in pd.read_csv(f, chunksize=chunk_rows):
+			yield chunk
+			if progress:
+				progress(f.tell(), total)
+
+
+def _parquet_chunks(path: str, chunk_rows: int, progress: Optional[Progress]) -> Iterator["Any"]:
+	try:
+		import pyarrow.parquet as pq
+	except ImportError as e:
+		raise RuntimeError("Parquet uploads need pyarrow installed") from e
+
+	parquet = pq.ParquetFile(path)
+	total, done = parquet.metadata.num_rows, 0
+	for batch in parquet.iter_batches(batch_size=chunk_rows):
+		chunk = batch.to_pandas()
+		done += len(chunk)
+		yield chunk
+		if progress:
+			progress(done, total)
+
+
+def _chunk_to_bars(chunk, default_symbol: str):
+	"""Validate one chunk; returns (symbols, bars) for the valid rows and the invalid count."""
+	import pandas as pd
+
+	chunk = chunk.rename(columns=_normalize_columns(chunk.columns))
+	if "Date" not in chunk.columns or "Close" not in chunk.columns:
+		raise ValueError("Dataset needs Date and Close columns")
+	n = len(chunk)
+	dates = pd.to_datetime(chunk["Date"], errors="coerce", format="ISO8601")
+	retry = dates.isna() & chunk["Date"].notna()
+	if retry.any():
+		# Slow per-value parsing only for rows that aren't ISO dates
+		dates[retry] = pd.to_datetime(chunk["Date"][retry].astype(str), errors="coerce", format="mixed")
+	if getattr(dates.dt, "tz", None) is not None:
+		dates = dates.dt.tz_localize(None)
+	bars = np.empty(n, dtype=BAR_DTYPE)
+	bars["Date"] = np.asarray(dates.values, dtype="datetime64[D]")
+	for field in OHLCV_FIELDS:
+		if field in chunk.columns:
+			bars[field] = pd.to_numeric(chunk[field], errors="coerce").to_numpy(dtype="f8", na_value=np.nan)
+		else:
+			bars[field] = np.nan
+	if "Symbol" in chunk.columns:
+		symbols = chunk["Symbol"].astype(str).str.strip().str.upper().to_numpy()
+	else:
+		symbols = np.full(n, default_symbol.upper(), dtype=object)
+
+	close = bars["Close"]
+	valid = ~np.isnat(bars["Date"]) & np.isfinite(close) & (close > 0)
+	# Optional fields may be missing, but present ones must be consistent
+	high, low, volume = bars["High"], bars["Low"], bars["Volume"]
+	valid &= ~(np.isfinite(high) & np.isfinite(low) & (high < low))
+	valid &= ~(np.isfinite(volume) & (volume < 0))
+	# Validate each distinct symbol once rather than every row
+	names, inverse = np.unique(symbols, return_inverse=True)
+	valid &= np.array([valid_symbol(name) for name in names], dtype=bool)[inverse]
+	return symbols[valid], bars[valid], int(n - valid.sum())
+
+
+def ingest_file(
+	path: str,
+	default_symbol: str = "AAPL",
+	store: Optional[PriceStore] = None,
+	chunk_rows: int = INGEST_CHUNK_ROWS,
+	progress: Optional[Progress] = None,
+) -> Dict[str, Any]:
+	"""Stream a CSV or Parquet price history into the per-symbol price store.
+
+	The file is parsed ``chunk_rows`` rows at a time. Valid rows are spilled
+	to one raw bar file per symbol, so only one chunk is in memory while
+	reading. Each symbol is then sorted, deduplicated by date (the last row
+	in the file wins) and merged into ``store``, where uploaded bars replace
+	cached ones. A Symbol (or Ticker) column splits the file; without one
+	every row belongs to ``default_symbol``.
+
+	Returns counts, per-symbol date ranges and rows/s throughput.
+	"""
+	store = store or price_store
+	reader = _parquet_chunks if path.lower().endswith((".parquet", ".pq")) else _csv_chunks
+	t0 = time.perf_counter()
+	rows = invalid = 0
+	spilled: Dict[str, int] = {}
+	with tempfile.TemporaryDirectory(prefix="ingest-") as spill_dir:
+		for chunk in reader(path, chunk_rows, progress):
+			rows += len(chunk)
+			symbols, bars, bad = _chunk_to_bars(chunk, default_symbol)
+			invalid += bad
+			if not len(bars):
+				continue
+			order = np.argsort(symbols, kind="stable")
+			symbols, bars = symbols[order], bars[order]
+			names, starts = np.unique(symbols, return_index=True)
+			for name, lo, hi in zip(names, starts, list(starts[1:]) + [len(symbols)]):
+				with open(os.path.join(spill_dir, f"{name}.bin"), "ab") as f:
+					bars[lo:hi].tofile(f)
+				spilled[name] = spilled.get(name, 0) + int(hi - lo)
+		parsed = time.perf_counter() - t0
+
+		duplicates = 0
+		report: Dict[str, Dict[str, Any]] = {}
+		for name in sorted(spilled):
+			bars = np.fromfile(os.path.join(spill_dir, f"{name}.bin"), dtype=BAR_DTYPE)
+			# Reversed so np.unique's first occurrence is the file's last row
+			_, idx = np.unique(bars["Date"][::-1], return_index=True)
+			bars = bars[::-1][idx]
+			duplicates += spilled[name] - len(bars)
+			stored = store.put_bars(name, bars)
+			report[name] = {
+				"rows": int(len(bars)),
+				"start": str(bars["Date"][0]),
+				"end": str(bars["Date"][-1]),
+				"stored_bars": stored,
+			}
+
+	seconds = time.perf_counter() - t0
+	valid = rows - invalid
+	return {
+		"rows": rows,
+		"valid_rows": valid,
+		"invalid_rows": invalid,
+		"duplicate_rows": duplicates,
+		"symbols": report,
+		"bytes": os.path.getsize(path),
+		"parse_seconds": round(parsed, 3),
+		"seconds": round(seconds, 3),
+		"rows_per_second": round(rows / seconds, 1) if seconds > 0 else float(rows),
+	}
@@ -0,0 +1,216 @@
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Log level for the app's loggers and the fraction of DEBUG/INFO records
+# kept from the per-prediction loggers; other records, and warnings and
+# errors everywhere, are always logged
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+# Loggers that write a record per prediction
+SAMPLED_LOGGERS = (
+	"routes.stock",
+	"services.model_predict",
+	"services.prediction_pipeline",
+	"services.prediction_service",
+)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Stages of /stock/predict, in the order they run
+PREDICT_STAGES = ("fetch", "arima", "lstm", "hybrid", "persist")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class SampledLogFilter(logging.Filter):
+	"""Keep a random ``rate`` fraction of records below WARNING."""
+
+	def __init__(self, rate: float = LOG_SAMPLE_RATE):
+		super().__init__()
+		self.rate = rate
+
+	def filter(self, record: logging.LogRecord) -> bool:
+		return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def configure_logging(level: str = LOG_LEVEL, sample_rate: float = LOG_SAMPLE_RATE,
+					  sampled: Sequence[str] = SAMPLED_LOGGERS):
+	"""Levelled logging for the app, with per-prediction records sampled."""
+	logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+	for name in sampled:
+		logger = logging.getLogger(name)
+		if not any(isinstance(f, SampledLogFilter) for f in logger.filters):
+			logger.addFilter(SampledLogFilter(sample_rate))
+
+
+class Histogram:
+	"""Cumulative-bucket histogram with count/sum/max, thread-safe."""
+
+	def __init__(self, buckets: Sequence[float]):
+		self.buckets = tuple(buckets)
+		self.counts = [0] * (len(self.buckets) + 1)
+		self.count = 0
+		self.sum = 0.0
+		self.max = 0.0
+		self._lock = threading.Lock()
+
+	def observe(self, value: float):
+		with self._lock:
+			self.counts[bisect_left(self.buckets, value)] += 1
+			self.count += 1
+			self.sum += value
+			self.max = max(self.max, value)
+
+	def snapshot(self) -> Dict[str, Any]:
+		with self._lock:
+			cumulative, running = {}, 0
+			for bound, count in zip(self.buckets, self.counts):
+				running += count
+				cumulative[str(bound)] = running
+			cumulative["+Inf"] = self.count
+			return {
+				"count": self.count,
+				"sum": self.sum,
+				"mean": self.sum / self.count if self.count else 0.0,
+				"max": self.max,
+				"buckets": cumulative,
+			}
+
+
+def _label_text(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+	pairs = list(labels) + ([extra] if extra else [])
+	if not pairs:
+		return ""
+	escaped = (value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+	return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class _Family:
+	def __init__(self, name: str, help_text: str, kind: str):
+		self.name = name
+		self.help = help_text
+		self.kind = kind
+		self._children: Dict[Labels, Any] = {}
+		self._lock = threading.Lock()
+
+	def _child(self, labels: Dict[str, str], factory: Callable[[], Any]):
+		key = tuple(sorted((name, str(value)) for name, value in labels.items()))
+		with self._lock:
+			child = self._children.get(key)
+			if child is None:
+				child = self._children[key] = factory()
+			return child
+
+	def header(self) -> List[str]:
+		return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class CounterFamily(_Family):
+	def __init__(self, name: str, help_text: str):
+		super().__init__(name, help_text, "counter")
+
+	def inc(self, amount: float = 1.0, **labels: str):
+		cell = self._child(labels, lambda: [0.0])
+		with self._lock:
+			cell[0] += amount
+
+	def value(self, **labels: str) -> float:
+		return self._child(labels, lambda: [0.0])[0]
+
+	def render(self) -> List[str]:
+		lines = self.header()
+		with self._lock:
+			items = sorted(self._children.items())
+		for labels, cell in items:
+			lines.append(f"{self.name}{_label_text(labels)} {cell[0]:g}")
+		return lines
+
+
+class HistogramFamily(_Family):
+	def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+		super().__init__(name, help_text, "histogram")
+		self.buckets = tuple(buckets)
+
+	def labels(self, **labels: str) -> Histogram:
+		return self._child(labels, lambda: Histogram(self.buckets))
+
+	def observe(self, value: float, **labels: str):
+		self.labels(**labels).observe(value)
+
+	def render(self) -> List[str]:
+		with self._lock:
+			items = sorted(self._children.items())
+		return histogram_lines(self.name, self.help, [(dict(labels), histogram) for labels, histogram in items])
+
+
+class MetricsRegistry:
+	"""Counters and histograms rendered in the Prometheus text format."""
+
+	def __init__(self):
+		self._families: Dict[str, _Family] = {}
+		self._collectors: List[Callable[[], List[str]]] = []
+		self._lock = threading.Lock()
+
+	def _register(self, family: _Family) -> _Family:
+		with self._lock:
+			return self._families.setdefault(family.name, family)
+
+	def counter(self, name: str, help_text: str) -> CounterFamily:
+		return self._register(CounterFamily(name, help_text))
+
+	def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> HistogramFamily:
+		return self._register(HistogramFamily(name, help_text, buckets))
+
+	def add_collector(self, collector: Callable[[], List[str]]):
+		"""Register a callable returning extra exposition lines at scrape time."""
+		self._collectors.append(collector)
+
+	def render(self) -> str:
+		lines: List[str] = []
+		for family in list(self._families.values()):
+			lines.extend(family.render())
+		for collector in self._collectors:
+			try:
+				lines.extend(collector())
+			except Exception as e:
+				logging.getLogger(__name__).warning("Metrics collector failed: %s", e)
+		return "\n".join(lines) + "\n"
+
+
+def histogram_lines(name: str, help_text: str, children: Sequence[Tuple[Dict[str, str], Histogram]]) -> List[str]:
+	"""Exposition lines for Histograms a service already keeps, one per label set."""
+	lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+	for labels, histogram in children:
+		labels = tuple(sorted(labels.items()))
+		snapshot = histogram.snapshot()
+		for bound, count in snapshot["buckets"].items():
+			lines.append(f"{name}_bucket{_label_text(labels, ('le', bound))} {count}")
+		lines.append(f"{name}_sum{_label_text(labels)} {snapshot['sum']:g}")
+		lines.append(f"{name}_count{_label_text(labels)} {snapshot['count']}")
+	return lines
+
+
+# Shared registry scraped at /metrics
+metrics = MetricsRegistry()
+http_requests = metrics.counter("http_requests_total", "HTTP requests by route, method and status code.")
+http_latency = metrics.histogram("http_request_duration_seconds", "HTTP request latency by route.")
+predict_stage_latency = metrics.histogram("predict_stage_duration_seconds", "Time spent per /stock/predict stage.")
+predict_requests = metrics.counter("predict_requests_total", "Prediction requests by outcome (computed, cached, snapshot, error).")
+# Every stage shows up in scrapes from the start, even before traffic
+for _stage in PREDICT_STAGES:
+	predict_stage_latency.labels(stage=_stage)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+	"""Record the duration of one prediction stage."""
+	t0 = time.perf_counter()
+	try:
+		yield
+	finally:
+		predict_stage_latency.observe(time.perf_counter() - t0, stage=stage)
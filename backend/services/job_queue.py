@@ -0,0 +1,348 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, update
+
+from database import SessionLocal
+from models.job import Job
+
+logger = logging.getLogger(__name__)
+
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Uploads are stored content-addressed as <sha256><ext>
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(base_dir, "uploaded_data"))
+# Worker processes that run queued jobs; 0 disables them (e.g. in tests)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# Running jobs whose worker hasn't sent a heartbeat for this long are requeued
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "5"))
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "60"))
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+# A new upload of a dataset that is already queued, running or trained on
+# returns the existing job instead of training again
+DEDUPE_STATUSES = ("queued", "running", "succeeded")
+CHUNK_BYTES = 1 << 20
+
+
+class JobCancelled(Exception):
+	pass
+
+
+def _utcnow() -> datetime:
+	return datetime.now(timezone.utc)
+
+
+def save_upload(fileobj: BinaryIO, filename: str, upload_dir: Optional[str] = None) -> Tuple[str, str]:
+	"""Stream an upload to disk while hashing it; returns (path, sha256)."""
+	upload_dir = upload_dir or UPLOAD_DIR
+	os.makedirs(upload_dir, exist_ok=True)
+	digest = hashlib.sha256()
+	tmp_path = os.path.join(upload_dir, f".upload-{uuid.uuid4().hex}.tmp")
+	with open(tmp_path, "wb") as out:
+		while True:
+			chunk = fileobj.read(CHUNK_BYTES)
+			if not chunk:
+				break
+			digest.update(chunk)
+			out.write(chunk)
+	sha = digest.hexdigest()
+	ext = os.path.splitext(filename or "")[1].lower() or ".csv"
+	path = os.path.join(upload_dir, sha + ext)
+	os.replace(tmp_path, path)
+	return path, sha
+
+
+def job_to_dict(job: Job) -> Dict[str, Any]:
+	return {
+		"id": job.id,
+		"kind": job.kind,
+		"status": job.status,
+		"progress": job.progress,
+		"message": job.message,
+		"dataset_hash": job.dataset_hash,
+		"params": json.loads(job.params or "{}"),
+		"result": json.loads(job.result) if job.result else None,
+		"error": job.error,
+		"cancel_requested": job.cancel_requested,
+		"created_at": job.created_at,
+		"started_at": job.started_at,
+		"finished_at": job.finished_at,
+	}
+
+
+class JobContext:
+	"""What a handler sees of its job: inputs, progress reporting and cancellation."""
+
+	def __init__(self, queue: "JobQueue", job: Job):
+		self.queue = queue
+		self.id = job.id
+		self.dataset_path = job.dataset_path
+		self.params: Dict[str, Any] = json.loads(job.params or "{}")
+
+	def report(self, progress: float, message: Optional[str] = None):
+		self.queue._update(self.id, progress=min(max(progress, 0.0), 1.0), message=message, heartbeat_at=_utcnow())
+
+	def cancel_requested(self) -> bool:
+		return self.queue._cancel_requested(self.id)
+
+	def check_cancelled(self):
+		if self.cancel_requested():
+			raise JobCancelled(self.id)
+
+
+def _default_handlers() -> Dict[str, Callable[[JobContext], Any]]:
+	from services.training import retrain_job
+	return {"retrain": retrain_job}
+
+
+class JobQueue:
+	"""Durable job queue stored in the app database.
+
+	``enqueue`` only inserts a row and returns. Worker processes claim the
+	oldest queued job with a conditional UPDATE, so several workers (or app
+	processes) can share one table without running a job twice. Workers
+	send heartbeats while a job runs; jobs of a worker that died are
+	requeued. Queued jobs cancel immediately, running jobs at their next
+	cancellation check.
+	"""
+
+	def __init__(
+		self,
+		session_factory: Callable[[], Any] = SessionLocal,
+		handlers: Optional[Dict[str, Callable[[JobContext], Any]]] = None,
+		workers: int = JOB_WORKERS,
+		poll_interval: float = JOB_POLL_INTERVAL,
+	):
+		self.session_factory = session_factory
+		self._handlers = handlers
+		self.workers = workers
+		self.poll_interval = poll_interval
+		self._enqueue_lock = threading.Lock()
+		self._processes: List[multiprocessing.process.BaseProcess] = []
+		self._stop = None
+
+	@property
+	def handlers(self) -> Dict[str, Callable[[JobContext], Any]]:
+		if self._handlers is None:
+			self._handlers = _default_handlers()
+		return self._handlers
+
+	def enqueue(self, kind: str, dataset_path: Optional[str] = None, dataset_hash: Optional[str] = None,
+				params: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], bool]:
+		"""Queue a job; returns (job, created).
+
+		A job for the same dataset hash and params that is queued, running or
+		succeeded is returned instead of queueing a duplicate.
+		"""
+		params_json = json.dumps(params or {}, sort_keys=True)
+		db = self.session_factory()
+		try:
+			with self._enqueue_lock:
+				if dataset_hash:
+					existing = (
+						db.query(Job)
+						.filter(Job.kind == kind, Job.dataset_hash == dataset_hash, Job.params == params_json,
+								Job.status.in_(DEDUPE_STATUSES))
+						.order_by(Job.created_at.desc())
+						.first()
+					)
+					if existing is not None:
+						return job_to_dict(existing), False
+				job = Job(
+					id=uuid.uuid4().hex,
+					kind=kind,
+					status="queued",
+					dataset_path=dataset_path,
+					dataset_hash=dataset_hash,
+					params=params_json,
+					progress=0.0,
+					cancel_requested=False,
+					created_at=_utcnow(),
+				)
+				db.add(job)
+				db.commit()
+				return job_to_dict(job), True
+		finally:
+			db.close()
+
+	def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+		db = self.session_factory()
+		try:
+			job = db.get(Job, job_id)
+			return job_to_dict(job) if job else None
+		finally:
+			db.close()
+
+	def list(self, limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+		db = self.session_factory()
+		try:
+			query = db.query(Job)
+			if status:
+				query = query.filter(Job.status == status)
+			return [job_to_dict(job) for job in query.order_by(Job.created_at.desc()).limit(limit)]
+		finally:
+			db.close()
+
+	def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+		db = self.session_factory()
+		try:
+			db.execute(
+				update(Job)
+				.where(Job.id == job_id, Job.status == "queued")
+				.values(status="cancelled", cancel_requested=True, finished_at=_utcnow())
+			)
+			db.execute(update(Job).where(Job.id == job_id, Job.status == "running").values(cancel_requested=True))
+			db.commit()
+			job = db.get(Job, job_id)
+			return job_to_dict(job) if job else None
+		finally:
+			db.close()
+
+	def _update(self, job_id: str, **values):
+		db = self.session_factory()
+		try:
+			db.execute(update(Job).where(Job.id == job_id).values(**values))
+			db.commit()
+		finally:
+			db.close()
+
+	def _cancel_requested(self, job_id: str) -> bool:
+		db = self.session_factory()
+		try:
+			job = db.get(Job, job_id)
+			return bool(job and job.cancel_requested)
+		finally:
+			db.close()
+
+	def requeue_stale(self) -> int:
+		"""Put running jobs without a recent heartbeat back in the queue."""
+		cutoff = _utcnow() - timedelta(seconds=JOB_STALE_AFTER)
+		db = self.session_factory()
+		try:
+			result = db.execute(
+				update(Job)
+				.where(Job.status == "running", Job.heartbeat_at < cutoff)
+				.values(status="queued", worker_pid=None, message="Requeued after worker was lost")
+			)
+			db.commit()
+			return result.rowcount
+		finally:
+			db.close()
+
+	def claim(self) -> Optional[Job]:
+		"""Atomically take the oldest queued job, or None if the queue is empty."""
+		db = self.session_factory()
+		try:
+			while True:
+				job = db.query(Job).filter(Job.status == "queued").order_by(Job.created_at).first()
+				if job is None:
+					return None
+				now = _utcnow()
+				claimed = db.execute(
+					update(Job)
+					.where(Job.id == job.id, Job.status == "queued")
+					.values(status="running", worker_pid=os.getpid(), started_at=now, heartbeat_at=now)
+				).rowcount
+				db.commit()
+				if claimed:
+					db.refresh(job)
+					db.expunge(job)
+					return job
+				# Another worker got it first; try the next one
+		finally:
+			db.close()
+
+	def run_next(self) -> Optional[str]:
+		"""Claim and run one job in this process; returns its id, or None if idle."""
+		job = self.claim()
+		if job is None:
+			return None
+		context = JobContext(self, job)
+		beating = threading.Event()
+
+		def heartbeat():
+			while not beating.wait(JOB_HEARTBEAT_INTERVAL):
+				self._update(job.id, heartbeat_at=_utcnow())
+
+		threading.Thread(target=heartbeat, name=f"job-heartbeat-{job.id[:8]}", daemon=True).start()
+		try:
+			handler = self.handlers.get(job.kind)
+			if handler is None:
+				raise ValueError(f"Unknown job kind: {job.kind}")
+			result = handler(context)
+		except Exception as e:
+			cancelled = isinstance(e, JobCancelled) or context.cancel_requested()
+			self._update(
+				job.id,
+				status="cancelled" if cancelled else "failed",
+				error=None if cancelled else f"{type(e).__name__}: {e}",
+				finished_at=_utcnow(),
+			)
+		else:
+			self._update(job.id, status="succeeded", progress=1.0, result=json.dumps(result, default=str),
+						 finished_at=_utcnow())
+		finally:
+			beating.set()
+		return job.id
+
+	def work(self, stop: Optional[Any] = None):
+		"""Worker loop: run jobs until ``stop`` is set."""
+		while stop is None or not stop.is_set():
+			try:
+				self.requeue_stale()
+				if self.run_next() is None:
+					time.sleep(self.poll_interval)
+			except Exception as e:
+				logger.exception("Job worker error: %s", e)
+				time.sleep(self.poll_interval)
+
+	def start_workers(self):
+		if self._processes or self.workers <= 0:
+			return
+		# Spawned workers import a fresh interpreter instead of forking the
+		# server with its threads and any loaded TensorFlow state
+		context = multiprocessing.get_context("spawn")
+		self._stop = context.Event()
+		for i in range(self.workers):
+			process = context.Process(target=_worker_main, args=(self._stop, self.poll_interval),
+									  name=f"job-worker-{i}", daemon=True)
+			process.start()
+			self._processes.append(process)
+
+	def stop_workers(self, timeout: float = 5.0):
+		if self._stop is not None:
+			self._stop.set()
+		for process in self._processes:
+			process.join(timeout)
+			if process.is_alive():
+				# Mid-job: its heartbeat stops and the job is requeued later
+				process.terminate()
+		self._processes = []
+
+	def stats(self) -> Dict[str, Any]:
+		db = self.session_factory()
+		try:
+			counts = {status: 0 for status in ACTIVE_STATUSES + FINISHED_STATUSES}
+			for status, count in db.query(Job.status, func.count(Job.id)).group_by(Job.status):
+				counts[status] = count
+		finally:
+			db.close()
+		return {"workers": len([p for p in self._processes if p.is_alive()]), "counts": counts}
+
+
+def _worker_main(stop, poll_interval: float):
+	JobQueue(poll_interval=poll_interval).work(stop)
+
+
+# Shared queue used by the API routes
+job_queue = JobQueue()
@@ -0,0 +1,154 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.instrumentation import Histogram
+
+# Concurrent requests' LSTM windows are queued and run as one forward pass,
+# flushed when MAX_BATCH windows are waiting or the oldest has waited MAX_WAIT
+LSTM_MICROBATCH = os.getenv("LSTM_MICROBATCH", "1") not in ("0", "false", "False")
+LSTM_MAX_BATCH = int(os.getenv("LSTM_MAX_BATCH", "256"))
+LSTM_MAX_WAIT = float(os.getenv("LSTM_MAX_WAIT_MS", "2")) / 1000.0
+
+BATCH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+WAIT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+class _Request:
+	__slots__ = ("model", "x", "future", "enqueued_at")
+
+	def __init__(self, model: Any, x: np.ndarray):
+		self.model = model
+		self.x = x
+		self.future: Future = Future()
+		self.enqueued_at = time.monotonic()
+
+
+class LSTMBatcher:
+	"""Micro-batching scheduler in front of Keras ``predict_on_batch``.
+
+	Callers submit their (n, timesteps, features) windows and block on a
+	future. A single worker thread drains the queue, concatenates the windows
+	of every request waiting for the same model (up to ``max_batch`` rows or
+	``max_wait`` seconds after the oldest arrived), runs one forward pass and
+	hands each request its slice of the output. When every unresolved request
+	is already in the batch it is flushed without waiting, so a lone request
+	doesn't pay ``max_wait``.
+	"""
+
+	def __init__(self, max_batch: int = LSTM_MAX_BATCH, max_wait: float = LSTM_MAX_WAIT):
+		self.max_batch = max_batch
+		self.max_wait = max_wait
+		self._queue: "queue.Queue[_Request]" = queue.Queue()
+		self._thread: Optional[threading.Thread] = None
+		self._start_lock = threading.Lock()
+		self._pending_rows = 0
+		self._unresolved = 0
+		self._pending_lock = threading.Lock()
+		self.flushes = 0
+		self.requests = 0
+		self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+		self.requests_per_batch = Histogram(BATCH_SIZE_BUCKETS)
+		self.wait_times = Histogram(WAIT_BUCKETS)
+
+	def _ensure_started(self):
+		if self._thread is not None:
+			return
+		with self._start_lock:
+			if self._thread is None:
+				self._thread = threading.Thread(target=self._run, name="lstm-batcher", daemon=True)
+				self._thread.start()
+
+	def submit(self, model: Any, x: np.ndarray) -> Future:
+		self._ensure_started()
+		request = _Request(model, x)
+		with self._pending_lock:
+			self._pending_rows += len(x)
+			self._unresolved += 1
+			self.requests += 1
+		request.future.add_done_callback(self._resolved)
+		self._queue.put(request)
+		return request.future
+
+	def _resolved(self, _future: Future):
+		with self._pending_lock:
+			self._unresolved -= 1
+
+	def predict(self, model: Any, x: np.ndarray) -> np.ndarray:
+		"""Blocking equivalent of ``model.predict_on_batch(x)`` via the batcher."""
+		return self.submit(model, x).result()
+
+	def _collect(self) -> List[_Request]:
+		first = self._queue.get()
+		batch, rows = [first], len(first.x)
+		deadline = first.enqueued_at + self.max_wait
+		while rows < self.max_batch and self._unresolved > len(batch):
+			timeout = deadline - time.monotonic()
+			try:
+				request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+			except queue.Empty:
+				break
+			batch.append(request)
+			rows += len(request.x)
+		return batch
+
+	def _run(self):
+		while True:
+			batch = self._collect()
+			now = time.monotonic()
+			for request in batch:
+				self.wait_times.observe(now - request.enqueued_at)
+			with self._pending_lock:
+				self._pending_rows -= sum(len(request.x) for request in batch)
+
+			groups: Dict[int, List[_Request]] = {}
+			for request in batch:
+				groups.setdefault(id(request.model), []).append(request)
+			for requests in groups.values():
+				self._flush(requests)
+
+	def _flush(self, requests: List[_Request]):
+		self.flushes += 1
+		x = np.concatenate([request.x for request in requests]) if len(requests) > 1 else requests[0].x
+		self.batch_sizes.observe(len(x))
+		self.requests_per_batch.observe(len(requests))
+		try:
+			out = np.asarray(requests[0].model.predict_on_batch(x))
+		except Exception as e:
+			for request in requests:
+				request.future.set_exception(e)
+			return
+		offset = 0
+		for request in requests:
+			request.future.set_result(out[offset:offset + len(request.x)])
+			offset += len(request.x)
+
+	def stats(self) -> Dict[str, Any]:
+		return {
+			"enabled": LSTM_MICROBATCH,
+			"max_batch": self.max_batch,
+			"max_wait_ms": self.max_wait * 1000,
+			"queue_depth": self._queue.qsize(),
+			"pending_windows": self._pending_rows,
+			"requests": self.requests,
+			"flushes": self.flushes,
+			"batch_size": self.batch_sizes.snapshot(),
+			"requests_per_batch": self.requests_per_batch.snapshot(),
+			"wait_seconds": self.wait_times.snapshot(),
+		}
+
+
+# Shared scheduler used by the LSTM predictor
+lstm_batcher = LSTMBatcher()
+
+
+def run_lstm(model: Any, x: np.ndarray) -> np.ndarray:
+	"""Run a forward pass, through the micro-batcher unless it is disabled."""
+	if LSTM_MICROBATCH:
+		return lstm_batcher.predict(model, x)
+	return np.asarray(model.predict_on_batch(x))
@@ -1,211 +1,311 @@
+import logging
 import os
-import pickle
 import numpy as np
-try:
-    import tensorflow as tf
-except Exception as e:
-    print(f"TensorFlow import failed: {e}")
-    tf = None  # type: ignore
-from typing import List, Any
-
-# Get absolute paths for model files - models are in the backend/models directory
-base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-arima_path = os.path.join(base_dir, 'models', 'arima_model.pkl')
-lstm_path = os.path.join(base_dir, 'models', 'lstm_model.h5')
-
-print(f"Looking for ARIMA model at: {arima_path}")
-print(f"Looking for LSTM model at: {lstm_path}")
-print(f"ARIMA exists: {os.path.exists(arima_path)}")
-print(f"LSTM exists: {os.path.exists(lstm_path)}")
-
-# Initialize model variables
-arima_model = None
-lstm_model = None
-
-# Load ARIMA Model
-try:
-    if os.path.exists(arima_path):
-        with open(arima_path, "rb") as f:
-            arima_model = pickle.load(f)
-        print("ARIMA model loaded successfully")
-    else:
-        print("ARIMA model file not found")
-except Exception as e:
-    print(f"Error loading ARIMA model: {e}")
-    arima_model = None
-
-# Load LSTM Model
-try:
-    if os.path.exists(lstm_path) and tf is not None:
-        lstm_model = tf.keras.models.load_model(lstm_path, compile=False)
-        print("LSTM model loaded successfully")
-    elif not os.path.exists(lstm_path):
-        print("LSTM model file not found")
-    else:
-        print("TensorFlow not available; skipping LSTM model load")
-except Exception as e:
-    print(f"Error loading LSTM model: {e}")
-    lstm_model = None
-
-
-def _extract_close_series(data: List[Any]) -> List[float]:
-	"""Extract numeric Close prices from yfinance records list."""
-	close_values: List[float] = []
-	for row in data:
-		if isinstance(row, dict):
-			value = row.get("Close")
-			if isinstance(value, (int, float)):
-				close_values.append(float(value))
-	return close_values
-
-
-def predict_stock_price_arima(data: List[Any]):
-	# ARIMA here is pre-fit; we forecast next 5 steps. Fallback to naive if needed.
-	if arima_model is None:
-		print("ARIMA model not loaded, using fallback prediction")
-		close_values = _extract_close_series(data)
-		last = close_values[-1] if close_values else 0.0
-		return [last] * 5
-	
-	try:
-		arima_forecast = arima_model.forecast(steps=5).tolist()
-		# Ensure plain Python floats for JSON serialization
-		return [float(x) for x in arima_forecast]
-	except Exception as e:
-		print(f"ARIMA prediction error: {e}")
-		close_values = _extract_close_series(data)
-		last = close_values[-1] if close_values else 0.0
-		return [last] * 5
+from typing import Any, Dict, List, Optional, Tuple, Union
+from services.arima_numpy import stack_recent
+from services.lstm_batcher import run_lstm
+from services.model_registry import model_registry
+from services.price_series import PriceSeries
+from services.sentiment_store import SENTIMENT_HALF_LIFE
+
+logger = logging.getLogger(__name__)
 
 
-def predict_stock_price_lstm(data: List[Any]):
-	"""Predict next values using the loaded LSTM model.
-	The model expects input shape (None, 10, 1) and outputs (None, 1).
-	We'll generate 5 predictions by sliding the window.
+def _extract_close_series(data: Union[PriceSeries, List[Any]]) -> np.ndarray:
+	"""Return Close prices as a float64 array.
+
+	A PriceSeries already holds them; legacy lists of record dicts are still
+	accepted and converted once.
 	"""
-	if lstm_model is None:
-		print("LSTM model not loaded, using fallback prediction")
+	if isinstance(data, PriceSeries):
+		return data.close
+	return np.array(
+		[float(row["Close"]) for row in data
+		 if isinstance(row, dict) and isinstance(row.get("Close"), (int, float))],
+		dtype=np.float64,
+	)
+
+
+def _last_close(close_values: np.ndarray) -> float:
+	return float(close_values[-1]) if len(close_values) else 0.0
+
+
+def _symbol_of(key: str, data: Union[PriceSeries, List[Any]]) -> str:
+	"""Symbol used to look up per-symbol models for a series."""
+	if isinstance(data, PriceSeries) and data.symbol:
+		return data.symbol
+	return key
+
+
+def predict_stock_price_arima_batch(series_by_symbol: Dict[str, PriceSeries], steps: int = 5) -> Dict[str, List[float]]:
+	"""Forecast the next ``steps`` closes for many symbols with the NumPy ARIMA.
+
+	Each series is filtered with its model's coefficients, so forecasts are
+	conditioned on the request's recent closes. Symbols sharing a model are
+	forecast together in one vectorized call.
+	"""
+	results: Dict[str, List[float]] = {}
+	groups: Dict[int, Tuple[Any, List[Tuple[str, np.ndarray]]]] = {}
+	for key, data in series_by_symbol.items():
 		close_values = _extract_close_series(data)
-		last = close_values[-1] if close_values else 0.0
-		return [last] * 5
-	
-	close_values = _extract_close_series(data)
-	if not close_values:
-		print("LSTM: No close values found in data")
-		return [0.0] * 5
+		arima_model = model_registry.get(_symbol_of(key, data), "arima")
+		if arima_model is None:
+			logger.warning("ARIMA model not loaded for %s, using fallback prediction", key)
+			results[key] = [_last_close(close_values)] * steps
+			continue
+		groups.setdefault(id(arima_model), (arima_model, []))[1].append((key, close_values))
+
+	for arima_model, members in groups.values():
+		try:
+			with_data = [(key, values) for key, values in members if len(values)]
+			if with_data:
+				forecasts = arima_model.forecast_batch(stack_recent([values for _, values in with_data]), steps)
+				for (key, _), row in zip(with_data, forecasts):
+					# Ensure plain Python floats for JSON serialization
+					results[key] = [float(x) for x in row]
+			if len(with_data) < len(members):
+				# No recent closes: forecast from the series the model was fit on
+				fitted = [float(x) for x in arima_model.forecast(steps)]
+				for key, values in members:
+					if not len(values):
+						results[key] = fitted
+		except Exception as e:
+			logger.exception("ARIMA prediction error: %s", e)
+			for key, values in members:
+				results[key] = [_last_close(values)] * steps
+
+	return {key: results[key] for key in series_by_symbol}
+
 
-	print(f"LSTM: Found {len(close_values)} close values")
-	print(f"LSTM: Close values range: {min(close_values):.2f} to {max(close_values):.2f}")
+def predict_stock_price_arima(data: PriceSeries, steps: int = 5):
+	# ARIMA parameters are pre-fit; the state is updated with the request's
+	# closes and we forecast the next ``steps`` steps. Fallback to naive if needed.
+	return predict_stock_price_arima_batch({"": data}, steps)[""]
 
+
+def _lstm_input_dims(lstm_model: Any, close_count: int):
+	"""Return (timesteps, features) expected by an LSTM model."""
+	input_shape = lstm_model.input_shape
+	if isinstance(input_shape, list):
+		input_shape = input_shape[0]  # Handle multiple inputs
+	# Extract dimensions: (batch, timesteps, features)
+	if len(input_shape) == 3:
+		_, timesteps, features = input_shape
+		return timesteps, features
+	# Fallback to reasonable defaults
+	return min(close_count, 60), 1
+
+
+def _lstm_output_width(lstm_model: Any) -> int:
+	"""Values predicted per forward pass (1 for the next-bar models we train)."""
+	output_shape = getattr(lstm_model, "output_shape", None)
+	if isinstance(output_shape, list):
+		output_shape = output_shape[0]
 	try:
-		# Get model input shape
-		input_shape = lstm_model.input_shape
-		print(f"LSTM: Model input shape: {input_shape}")
-		
-		if isinstance(input_shape, list):
-			input_shape = input_shape[0]  # Handle multiple inputs
-			print(f"LSTM: Using first input shape: {input_shape}")
-		
-		# Extract dimensions: (batch, timesteps, features)
-		if len(input_shape) == 3:
-			_, timesteps, features = input_shape
-			print(f"LSTM: Extracted - timesteps: {timesteps}, features: {features}")
-		else:
-			# Fallback to reasonable defaults
-			timesteps = min(len(close_values), 60)
-			features = 1
-			print(f"LSTM: Using fallback - timesteps: {timesteps}, features: {features}")
-		
-		# Normalize the data to 0-1 range for better LSTM performance
-		close_array = np.array(close_values, dtype=np.float32)
-		min_val = np.min(close_array)
-		max_val = np.max(close_array)
-		
-		if max_val > min_val:
-			normalized_data = (close_array - min_val) / (max_val - min_val)
-			print(f"LSTM: Normalized data range: {np.min(normalized_data):.4f} to {np.max(normalized_data):.4f}")
-		else:
-			normalized_data = close_array
-			print("LSTM: No normalization applied (constant values)")
-		
-		# Generate 5 predictions by sliding the window
-		predictions = []
-		for i in range(5):
-			# Take the last 'timesteps' values for each prediction
-			if len(normalized_data) >= timesteps:
-				sequence = normalized_data[-(timesteps + i):-i] if i > 0 else normalized_data[-timesteps:]
-			else:
-				# Pad with the first value if not enough data
-				sequence = np.pad(normalized_data, (timesteps - len(normalized_data), 0), 
+		return int(output_shape[-1] or 1)
+	except (TypeError, IndexError):
+		return 1
+
+
+def _build_lstm_window(close_values: np.ndarray, timesteps: int):
+	"""Scale a series to 0-1 and return its latest ``timesteps`` window.
+
+	Short histories are left-padded with their first value. Returns
+	(window, min_val, max_val).
+	"""
+	close_array = np.asarray(close_values, dtype=np.float32)
+	min_val = float(close_array.min())
+	max_val = float(close_array.max())
+
+	# Normalize the data to 0-1 range for better LSTM performance
+	if max_val > min_val:
+		normalized_data = (close_array - min_val) / (max_val - min_val)
+	else:
+		normalized_data = close_array
+
+	if len(normalized_data) < timesteps:
+		normalized_data = np.pad(normalized_data, (timesteps - len(normalized_data), 0),
 								mode='constant', constant_values=normalized_data[0])
-			
-			# Ensure we have exactly 'timesteps' values
-			if len(sequence) > timesteps:
-				sequence = sequence[-timesteps:]
-			elif len(sequence) < timesteps:
-				sequence = np.pad(sequence, (timesteps - len(sequence), 0), 
-								mode='constant', constant_values=sequence[0])
-			
-			# Reshape to (1, timesteps, features)
-			x = sequence.reshape(1, timesteps, features)
-			print(f"LSTM: Input tensor {i+1} shape: {x.shape}, dtype: {x.dtype}")
-			
-			# Ensure data type is float32
-			x = x.astype(np.float32)
-			
-			# Make prediction
-			print(f"LSTM: Making prediction {i+1}...")
-			prediction = lstm_model.predict(x, verbose=0)
-			print(f"LSTM: Raw prediction {i+1} shape: {prediction.shape}")
-			print(f"LSTM: Raw prediction {i+1} value: {prediction.flatten()}")
-			
-			# Denormalize the prediction back to original scale
-			if max_val > min_val:
-				denormalized_pred = prediction.flatten()[0] * (max_val - min_val) + min_val
-			else:
-				denormalized_pred = prediction.flatten()[0]
-			# Ensure plain Python float
-			predictions.append(float(denormalized_pred))
-		
-		print(f"LSTM: All predictions: {predictions}")
-		return predictions
-		
-	except Exception as e:
-		print(f"LSTM prediction error: {e}")
-		import traceback
-		traceback.print_exc()
-		# Fallback: simple naive persistence forecast
-		last = close_values[-1]
-		print(f"LSTM: Using fallback prediction: {[last] * 5}")
-		return [last] * 5
+	return normalized_data[-timesteps:], min_val, max_val
 
 
-def predict_stock_price_hybrid(data: List[Any]):
+def forecast_lstm(lstm_model: Any, windows: np.ndarray, steps: int, features: int = 1,
+				  chunk_rows: Optional[int] = None) -> np.ndarray:
+	"""Forecast ``steps`` scaled values after each (scaled) input window.
+
+	Models with at least ``steps`` outputs forecast directly in one forward
+	pass. Next-bar models forecast recursively: each step appends the
+	previous prediction to every window, so a horizon costs ``steps``
+	passes over the whole batch rather than one per window. Step k never
+	depends on the horizon, so shorter horizons are prefixes of longer ones.
+	Returns an (n, steps) array.
+	"""
+	windows = np.asarray(windows, dtype=np.float32)
+	n, timesteps = windows.shape[0], windows.shape[1]
+	chunk_rows = chunk_rows or max(n, 1)
+
+	def _predict(x: np.ndarray) -> np.ndarray:
+		x = x.reshape(len(x), timesteps, features)
+		return np.concatenate([
+			np.asarray(run_lstm(lstm_model, x[i:i + chunk_rows])).reshape(min(chunk_rows, len(x) - i), -1)
+			for i in range(0, len(x), chunk_rows)
+		])
+
+	if _lstm_output_width(lstm_model) >= steps:
+		return _predict(windows)[:, :steps]
+	out = np.empty((n, steps), dtype=np.float32)
+	for step in range(steps):
+		out[:, step] = _predict(windows)[:, 0]
+		windows = np.concatenate([windows[:, 1:], out[:, step, None]], axis=1)
+	return out
+
+
+def predict_stock_price_lstm_batch(series_by_symbol: Dict[str, PriceSeries], steps: int = 5) -> Dict[str, List[float]]:
+	"""Predict the next ``steps`` values for many symbols in batched forward passes.
+
+	The latest window of every symbol served by the same model is stacked
+	into one (symbols, timesteps, features) tensor and forecast with
+	``forecast_lstm``, so Keras is dispatched once per step and distinct
+	model instead of once per symbol; the micro-batcher further merges
+	tensors from concurrent requests. Symbols that cannot be predicted fall
+	back to a naive persistence forecast.
+	"""
+	results: Dict[str, List[float]] = {}
+	# id(model) -> (model, [(key, close values)])
+	groups: Dict[int, Tuple[Any, List[Tuple[str, np.ndarray]]]] = {}
+	for key, data in series_by_symbol.items():
+		close_values = _extract_close_series(data)
+		if not len(close_values):
+			logger.warning("LSTM: no close values found in data for %s", key)
+			results[key] = [0.0] * steps
+			continue
+		lstm_model = model_registry.get(_symbol_of(key, data), "lstm")
+		if lstm_model is None:
+			logger.warning("LSTM model not loaded for %s, using fallback prediction", key)
+			results[key] = [_last_close(close_values)] * steps
+			continue
+		groups.setdefault(id(lstm_model), (lstm_model, []))[1].append((key, close_values))
+
+	for lstm_model, members in groups.values():
+		try:
+			longest = max(len(values) for _, values in members)
+			timesteps, features = _lstm_input_dims(lstm_model, longest)
+
+			batch = []
+			scales = []
+			for key, close_values in members:
+				window, min_val, max_val = _build_lstm_window(close_values, timesteps)
+				batch.append(window)
+				scales.append((key, min_val, max_val))
+
+			x = np.stack(batch)
+			logger.debug("LSTM: batched inference on %d symbols, %d steps, window %d", len(scales), steps, timesteps)
+			raw = forecast_lstm(lstm_model, x, steps, features)
+
+			for (key, min_val, max_val), row in zip(scales, raw):
+				# Denormalize the predictions back to original scale
+				if max_val > min_val:
+					row = row * (max_val - min_val) + min_val
+				# Ensure plain Python floats
+				results[key] = [float(v) for v in row]
+
+		except Exception as e:
+			logger.exception("LSTM prediction error: %s", e)
+			# Fallback: simple naive persistence forecast
+			for key, close_values in members:
+				results[key] = [_last_close(close_values)] * steps
+
+	return {key: results[key] for key in series_by_symbol}
+
+
+def predict_stock_price_lstm(data: PriceSeries, steps: int = 5):
+	"""Predict next values using the symbol's LSTM model (or the generic one).
+	The model expects input shape (None, 10, 1) and outputs (None, 1), so
+	the ``steps`` values are forecast recursively from the latest window.
+	"""
+	predictions = predict_stock_price_lstm_batch({"": data}, steps)[""]
+	logger.debug("LSTM predictions: %s", predictions)
+	return predictions
+
+
+# Default ensemble weights for the hybrid model
+HYBRID_WEIGHTS: Dict[str, float] = {"arima": 0.6, "lstm": 0.4}
+
+
+def combine_forecasts(forecasts: List[List[float]], weights: List[float]) -> List[float]:
+	"""Weighted average of several forecasts, step by step.
+
+	The horizon follows the first forecast; shorter forecasts are extended
+	with their last value. Results are rounded to 2 decimals.
+	"""
+	combined = []
+	for i in range(len(forecasts[0])):
+		value = 0.0
+		for forecast, weight in zip(forecasts, weights):
+			value += weight * float(forecast[i] if i < len(forecast) else forecast[-1])
+		combined.append(round(float(value), 2))
+	return combined
+
+
+# Ensembles that take the news sentiment feature as an exogenous input, and
+# the fewest bars with news needed to estimate its effect on a symbol
+SENTIMENT_ENSEMBLES = [s.strip() for s in os.getenv("SENTIMENT_ENSEMBLES", "hybrid").split(",") if s.strip()]
+SENTIMENT_MIN_BARS = int(os.getenv("SENTIMENT_MIN_BARS", "20"))
+
+
+def sentiment_effect(data: PriceSeries, steps: int, half_life: float = SENTIMENT_HALF_LIFE) -> np.ndarray:
+	"""Multiplicative effect of news sentiment on each of the next ``steps`` bars.
+
+	The slope of next-bar log returns on the sentiment feature is fitted by
+	least squares over the series' own history; the latest score then fades
+	with the feature's half-life over the horizon. All ones when the series
+	has too little news to fit it.
+	"""
+	effect = np.ones(steps)
+	if data.sentiment is None or len(data) < 3:
+		return effect
+	with np.errstate(divide="ignore", invalid="ignore"):
+		returns = np.diff(np.log(data.close))
+	score = data.sentiment[:-1]
+	usable = np.isfinite(returns) & np.isfinite(score)
+	returns, score = returns[usable], score[usable]
+	if np.count_nonzero(score) < SENTIMENT_MIN_BARS:
+		return effect
+	centered = score - score.mean()
+	variance = float(centered @ centered)
+	if variance <= 0.0:
+		return effect
+	slope = float(centered @ (returns - returns.mean())) / variance
+	fading = np.cumsum(0.5 ** (np.arange(steps) / half_life))
+	return np.exp(slope * float(data.sentiment[-1]) * fading)
+
+
+def predict_stock_price_hybrid(data: PriceSeries, arima_pred: Optional[List[float]] = None, lstm_pred: Optional[List[float]] = None,
+							   steps: int = 5):
 	"""Hybrid model combining ARIMA and LSTM predictions with weighted averaging.
 	ARIMA weight: 0.6 (more stable for trend)
 	LSTM weight: 0.4 (better for complex patterns)
+
+	Pass already computed ``arima_pred`` / ``lstm_pred`` to avoid running the
+	base models a second time.
 	"""
 	try:
-		arima_pred = predict_stock_price_arima(data)
-		lstm_pred = predict_stock_price_lstm(data)
+		if arima_pred is None:
+			arima_pred = predict_stock_price_arima(data, steps)
+		if lstm_pred is None:
+			lstm_pred = predict_stock_price_lstm(data, steps)
 		
-		print(f"Hybrid: ARIMA predictions: {arima_pred}")
-		print(f"Hybrid: LSTM predictions: {lstm_pred}")
+		logger.debug("Hybrid inputs - ARIMA: %s, LSTM: %s", arima_pred, lstm_pred)
 		
-		# Weighted combination
-		hybrid_predictions = []
-		for i in range(len(arima_pred)):
-			arima_val = arima_pred[i] if i < len(arima_pred) else arima_pred[-1]
-			lstm_val = lstm_pred[i] if i < len(lstm_pred) else lstm_pred[-1]
-			
-			# Weighted average: 60% ARIMA, 40% LSTM
-			hybrid_val = (0.6 * float(arima_val)) + (0.4 * float(lstm_val))
-			hybrid_predictions.append(round(float(hybrid_val), 2))
+		# Weighted average: 60% ARIMA, 40% LSTM
+		hybrid_predictions = combine_forecasts(
+			[arima_pred, lstm_pred], [HYBRID_WEIGHTS["arima"], HYBRID_WEIGHTS["lstm"]]
+		)
 		
-		print(f"Hybrid: Combined predictions: {hybrid_predictions}")
+		logger.debug("Hybrid predictions: %s", hybrid_predictions)
 		return hybrid_predictions
 		
 	except Exception as e:
-		print(f"Hybrid prediction error: {e}")
+		logger.exception("Hybrid prediction error: %s", e)
 		# Fallback to ARIMA if hybrid fails
-		return predict_stock_price_arima(data)
+		return arima_pred if arima_pred is not None else predict_stock_price_arima(data, steps)
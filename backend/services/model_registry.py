@@ -0,0 +1,217 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.symbols import symbol_path, valid_symbol
+
+logger = logging.getLogger(__name__)
+
+# Per-symbol artifacts live at models/<SYMBOL>/<model type>/<version>.<ext>.
+# The single-file models (models/arima_model.npz, models/lstm_model.h5) are
+# the generic fallback for symbols without one.
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(base_dir, "models"))
+# Memory budget for loaded models, estimated from artifact size on disk
+MODEL_CACHE_BYTES = int(os.getenv("MODEL_CACHE_BYTES", str(512 * 1024 * 1024)))
+
+GENERIC_SYMBOL = "*"
+GENERIC_VERSION = "generic"
+
+MODEL_EXTENSIONS: Dict[str, str] = {
+	"arima": ".npz",
+	"lstm": ".h5",
+}
+
+ModelKey = Tuple[str, str, str]
+
+
+def _load_arima(path: str) -> Any:
+	from services.arima_numpy import ArimaState
+	return ArimaState.load(path)
+
+
+def _load_keras(path: str) -> Any:
+	import tensorflow as tf
+	return tf.keras.models.load_model(path, compile=False)
+
+
+DEFAULT_LOADERS: Dict[str, Callable[[str], Any]] = {
+	"arima": _load_arima,
+	"lstm": _load_keras,
+}
+
+
+def new_version() -> str:
+	"""Version tag for a freshly trained artifact; sorts chronologically."""
+	return time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+
+
+def artifact_path(symbol: str, model_type: str, version: str, root: Optional[str] = None) -> str:
+	"""Where the artifact for (symbol, model type, version) is stored."""
+	root = root or MODEL_DIR
+	return symbol_path(root, symbol.upper(), model_type, version + MODEL_EXTENSIONS[model_type])
+
+
+class ModelRegistry:
+	"""Lazily loads per-symbol models and keeps the hot ones in an LRU cache.
+
+	Models are keyed by (symbol, model type, version) and loaded on first
+	use. When the estimated size of the loaded models exceeds ``max_bytes``
+	the least recently used ones are evicted. Symbols without their own
+	artifact get the generic model.
+	"""
+
+	def __init__(
+		self,
+		root: Optional[str] = None,
+		max_bytes: Optional[int] = None,
+		loaders: Optional[Dict[str, Callable[[str], Any]]] = None,
+	):
+		self.root = root or MODEL_DIR
+		self.max_bytes = MODEL_CACHE_BYTES if max_bytes is None else max_bytes
+		self.loaders = dict(DEFAULT_LOADERS if loaders is None else loaders)
+		self._cache: "OrderedDict[ModelKey, Tuple[Any, int]]" = OrderedDict()
+		self._lock = threading.Lock()
+		self._load_locks: Dict[ModelKey, threading.Lock] = {}
+		self.bytes_in_use = 0
+		self.hits = 0
+		self.misses = 0
+		self.loads = 0
+		self.load_failures = 0
+		self.evictions = 0
+		self.evicted_bytes = 0
+		self.fallbacks = 0
+
+	def _generic_path(self, model_type: str) -> str:
+		return os.path.join(self.root, f"{model_type}_model{MODEL_EXTENSIONS[model_type]}")
+
+	def versions(self, symbol: str, model_type: str):
+		"""Sorted versions available for a symbol (oldest first)."""
+		ext = MODEL_EXTENSIONS[model_type]
+		directory = symbol_path(self.root, symbol.upper(), model_type)
+		try:
+			names = os.listdir(directory)
+		except FileNotFoundError:
+			return []
+		return sorted(name[:-len(ext)] for name in names if name.endswith(ext))
+
+	def resolve(self, symbol: str, model_type: str, version: str = "latest") -> Optional[Tuple[ModelKey, str]]:
+		"""Map a request to the (key, path) of the artifact that will serve it."""
+		if model_type not in MODEL_EXTENSIONS:
+			raise ValueError(f"Unknown model type '{model_type}'")
+		symbol = symbol.upper()
+		# A symbol that can't name files has no artifact of its own
+		if valid_symbol(symbol):
+			if version == "latest":
+				available = self.versions(symbol, model_type)
+				if available:
+					resolved = available[-1]
+					return (symbol, model_type, resolved), artifact_path(symbol, model_type, resolved, self.root)
+			else:
+				path = artifact_path(symbol, model_type, version, self.root)
+				if os.path.exists(path):
+					return (symbol, model_type, version), path
+		path = self._generic_path(model_type)
+		if os.path.exists(path):
+			return (GENERIC_SYMBOL, model_type, GENERIC_VERSION), path
+		return None
+
+	def prune(self, symbol: str, model_type: str, keep: int) -> List[str]:
+		"""Delete all but the newest ``keep`` versions of a symbol's artifact."""
+		removed = []
+		stale = self.versions(symbol, model_type)[:-keep] if keep > 0 else []
+		for version in stale:
+			path = artifact_path(symbol, model_type, version, self.root)
+			try:
+				os.remove(path)
+				removed.append(path)
+			except OSError as e:
+				logger.warning("Could not remove old model %s: %s", path, e)
+		with self._lock:
+			for key in [key for key in self._cache if key[:2] == (symbol.upper(), model_type)]:
+				if artifact_path(*key, root=self.root) in removed:
+					_, size = self._cache.pop(key)
+					self.bytes_in_use -= size
+		return removed
+
+	def get(self, symbol: str, model_type: str, version: str = "latest") -> Optional[Any]:
+		"""Return the model for a symbol, loading it on first use.
+
+		Returns None when neither a symbol-specific nor a generic artifact
+		exists or loading fails; callers fall back to naive forecasts.
+		"""
+		resolved = self.resolve(symbol, model_type, version)
+		if resolved is None:
+			return None
+		key, path = resolved
+		if key[0] == GENERIC_SYMBOL and symbol.upper() != GENERIC_SYMBOL:
+			self.fallbacks += 1
+
+		with self._lock:
+			entry = self._cache.get(key)
+			if entry is not None:
+				self._cache.move_to_end(key)
+				self.hits += 1
+				return entry[0]
+			self.misses += 1
+			load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+		# Load outside the cache lock; concurrent requests for the same key wait
+		with load_lock:
+			with self._lock:
+				entry = self._cache.get(key)
+				if entry is not None:
+					self._cache.move_to_end(key)
+					return entry[0]
+			try:
+				model = self.loaders[model_type](path)
+				size = os.path.getsize(path)
+			except Exception as e:
+				logger.exception("Error loading %s model for %s from %s: %s", model_type, key[0], path, e)
+				self.load_failures += 1
+				return None
+			with self._lock:
+				self.loads += 1
+				self._cache[key] = (model, size)
+				self.bytes_in_use += size
+				self._evict_locked(keep=key)
+			return model
+
+	def _evict_locked(self, keep: ModelKey):
+		while self.bytes_in_use > self.max_bytes and len(self._cache) > 1:
+			key = next(iter(self._cache))
+			if key == keep:
+				self._cache.move_to_end(key)
+				continue
+			_, size = self._cache.pop(key)
+			self.bytes_in_use -= size
+			self.evictions += 1
+			self.evicted_bytes += size
+
+	def clear(self):
+		with self._lock:
+			self._cache.clear()
+			self.bytes_in_use = 0
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			return {
+				"models_loaded": len(self._cache),
+				"bytes_in_use": self.bytes_in_use,
+				"max_bytes": self.max_bytes,
+				"hits": self.hits,
+				"misses": self.misses,
+				"loads": self.loads,
+				"load_failures": self.load_failures,
+				"evictions": self.evictions,
+				"evicted_bytes": self.evicted_bytes,
+				"generic_fallbacks": self.fallbacks,
+				"cached": ["/".join(key) for key in self._cache],
+			}
+
+
+# Shared registry used by the predictors
+model_registry = ModelRegistry()
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.model_registry import GENERIC_SYMBOL, MODEL_DIR, ModelRegistry, artifact_path, model_registry, new_version
+from services.price_store import PriceStore, price_store
+from services.symbols import symbol_path
+
+logger = logging.getLogger(__name__)
+
+# New bars in the price store update each symbol's models in the background:
+# if enabled, the LSTM is fine-tuned for a few epochs on just the new
+# windows. ARIMA needs no update (its forecasts condition on the request's
+# closes); it and the LSTM get full refits every MODEL_REFIT_DAYS.
+MODEL_UPDATES = os.getenv("MODEL_UPDATES", "1") not in ("0", "false", "False")
+LSTM_FINETUNE = os.getenv("LSTM_FINETUNE", "0") not in ("0", "false", "False")
+LSTM_FINETUNE_EPOCHS = int(os.getenv("LSTM_FINETUNE_EPOCHS", "2"))
+LSTM_FINETUNE_LR = float(os.getenv("LSTM_FINETUNE_LR", "1e-4"))
+MODEL_REFIT_DAYS = float(os.getenv("MODEL_REFIT_DAYS", "7"))
+# Seconds between checks for symbols whose full refit is due
+MODEL_REFIT_CHECK_INTERVAL = float(os.getenv("MODEL_REFIT_CHECK_INTERVAL", "3600"))
+# LSTM fine-tunes write new artifact versions; older ones are pruned
+MODEL_KEEP_VERSIONS = int(os.getenv("MODEL_KEEP_VERSIONS", "5"))
+
+FIT_STATE_FILE = "fit_state.json"
+
+
+def _fit_state_path(symbol: str, root: Optional[str] = None) -> str:
+	return symbol_path(root or MODEL_DIR, symbol.upper(), FIT_STATE_FILE)
+
+
+def read_fit_state(symbol: str, root: Optional[str] = None) -> Dict[str, Any]:
+	"""Per model type: the last full fit, the last bar absorbed and the update count."""
+	try:
+		with open(_fit_state_path(symbol, root)) as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {}
+
+
+def record_fit(symbol: str, model_type: str, version: str, through: Any, root: Optional[str] = None,
+			   full: bool = True) -> Dict[str, Any]:
+	"""Record that ``version`` of a model has seen bars up to ``through``.
+
+	``full`` marks a refit on the whole history, which restarts the refit
+	cadence; incremental updates keep the previous ``fitted_at``.
+	"""
+	path = _fit_state_path(symbol, root)
+	state = read_fit_state(symbol, root)
+	previous = state.get(model_type, {})
+	state[model_type] = {
+		"version": version,
+		"through": str(np.datetime64(through, "D")),
+		"fitted_at": time.time() if full else previous.get("fitted_at", time.time()),
+		"updates": 0 if full else previous.get("updates", 0) + 1,
+	}
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path + ".tmp", "w") as f:
+		json.dump(state, f)
+	os.replace(path + ".tmp", path)
+	return state[model_type]
+
+
+def _finetune_lstm(path: str, closes: np.ndarray, new_count: int, epochs: int, learning_rate: float):
+	"""Fine-tune a saved LSTM on the windows ending at the ``new_count`` newest closes."""
+	import tensorflow as tf
+	from services.training import LSTM_BATCH_SIZE, LSTM_TIME_STEPS
+	from services.windowing import WindowDataset
+
+	# A private copy: the registry's instance keeps serving until the new version lands
+	model = tf.keras.models.load_model(path, compile=False)
+	timesteps = model.input_shape[1] or LSTM_TIME_STEPS
+	# Same raw-price windows as the full training run, but only the new targets
+	dataset = WindowDataset([closes[-(timesteps + new_count):]], time_steps=timesteps)
+	model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate), loss="mse")
+	model.fit(dataset.to_tf_dataset(batch_size=LSTM_BATCH_SIZE), epochs=epochs, verbose=0)
+	return model
+
+
+class ModelUpdater:
+	"""Keeps per-symbol models current as new bars arrive.
+
+	Subscribes to the price store; with fine-tuning enabled, symbols that
+	received new bars are queued and their LSTM is fine-tuned on a
+	background thread, off the request path. Only models with a fit-state
+	record (trained per symbol by this codebase) are updated; the shared
+	generic models are left alone. Symbols whose last full fit is older
+	than ``refit_days`` get a full refit through the training orchestrator.
+	"""
+
+	def __init__(
+		self,
+		registry: Optional[ModelRegistry] = None,
+		store: Optional[PriceStore] = None,
+		finetune: bool = LSTM_FINETUNE,
+		refit_days: float = MODEL_REFIT_DAYS,
+		keep_versions: int = MODEL_KEEP_VERSIONS,
+	):
+		self.registry = registry or model_registry
+		self.store = store or price_store
+		self.finetune = finetune
+		self.refit_days = refit_days
+		self.keep_versions = keep_versions
+		self._queue: "queue.Queue[str]" = queue.Queue()
+		self._queued: set = set()
+		self._queued_lock = threading.Lock()
+		self._thread: Optional[threading.Thread] = None
+		self._stopped = threading.Event()
+		self._refits_requested: Dict[str, float] = {}
+		self.lstm_updates = 0
+		self.failures = 0
+		self.refits = 0
+		self.update_seconds = 0.0
+
+	def notify(self, symbol: str, new_bars: np.ndarray):
+		"""Price store listener: queue ``symbol`` once until its update runs."""
+		if not self.finetune:
+			return
+		with self._queued_lock:
+			if symbol in self._queued:
+				return
+			self._queued.add(symbol)
+		self._queue.put(symbol)
+
+	def start(self):
+		if self._thread is not None:
+			return
+		self.store.listeners.append(self.notify)
+		self._thread = threading.Thread(target=self._run, name="model-updater", daemon=True)
+		self._thread.start()
+
+	def stop(self):
+		self._stopped.set()
+		if self.notify in self.store.listeners:
+			self.store.listeners.remove(self.notify)
+
+	def _run(self):
+		next_refit_check = time.monotonic()
+		while not self._stopped.is_set():
+			if time.monotonic() >= next_refit_check:
+				self.schedule_refits()
+				next_refit_check = time.monotonic() + MODEL_REFIT_CHECK_INTERVAL
+			try:
+				symbol = self._queue.get(timeout=min(5.0, MODEL_REFIT_CHECK_INTERVAL))
+			except queue.Empty:
+				continue
+			with self._queued_lock:
+				self._queued.discard(symbol)
+			try:
+				self.update_symbol(symbol)
+			except Exception as e:
+				self.failures += 1
+				logger.exception("Model update for %s failed: %s", symbol, e)
+
+	def _own_artifact(self, symbol: str, model_type: str) -> Optional[str]:
+		resolved = self.registry.resolve(symbol, model_type)
+		if resolved is None or resolved[0][0] == GENERIC_SYMBOL:
+			return None
+		return resolved[1]
+
+	def update_symbol(self, symbol: str) -> Dict[str, Any]:
+		"""Fine-tune the symbol's LSTM on bars newer than its last update; returns what changed.
+
+		ARIMA has nothing to update: its forecasts condition on the request's
+		own closes, so only a refit changes them.
+		"""
+		symbol = symbol.upper()
+		info = read_fit_state(symbol, self.registry.root).get("lstm")
+		current = self._own_artifact(symbol, "lstm")
+		if not self.finetune or not info or current is None:
+			return {}
+		new = self.store.cached_bars(symbol, after=info["through"])
+		new = new[np.isfinite(new["Close"])]
+		if not len(new):
+			return {}
+		t0 = time.perf_counter()
+		version = new_version()
+		path = artifact_path(symbol, "lstm", version, self.registry.root)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		closes = self.store.cached_bars(symbol)["Close"]
+		closes = closes[np.isfinite(closes)]
+		model = _finetune_lstm(current, closes, len(new), LSTM_FINETUNE_EPOCHS, LSTM_FINETUNE_LR)
+		model.save(path)
+		record_fit(symbol, "lstm", version, new["Date"][-1], self.registry.root, full=False)
+		self.registry.prune(symbol, "lstm", self.keep_versions)
+		self.lstm_updates += 1
+		self.update_seconds += time.perf_counter() - t0
+		return {"lstm": {"version": version, "new_bars": int(len(new)), "through": str(new["Date"][-1])}}
+
+	def refits_due(self, now: Optional[float] = None) -> List[str]:
+		"""Symbols whose last full fit of any model is older than ``refit_days``."""
+		now = time.time() if now is None else now
+		try:
+			symbols = [name for name in os.listdir(self.registry.root)
+					   if os.path.isfile(os.path.join(self.registry.root, name, FIT_STATE_FILE))]
+		except FileNotFoundError:
+			return []
+		due = []
+		for symbol in sorted(symbols):
+			fit_state = read_fit_state(symbol, self.registry.root)
+			fitted = [info.get("fitted_at", 0) for info in fit_state.values()]
+			if fitted and now - min(fitted) > self.refit_days * 86400:
+				due.append(symbol)
+		return due
+
+	def schedule_refits(self) -> List[str]:
+		"""Start full refits for symbols that are due (at most once per cadence)."""
+		from services.training import training_orchestrator, TRAIN_START
+
+		due = [s for s in self.refits_due()
+			   if time.time() - self._refits_requested.get(s, 0) > self.refit_days * 86400]
+		if due:
+			today = str(np.datetime64("today", "D") + np.timedelta64(1, "D"))
+			training_orchestrator.start(due, start=TRAIN_START, end=today)
+			for symbol in due:
+				self._refits_requested[symbol] = time.time()
+			self.refits += len(due)
+		return due
+
+	def stats(self) -> Dict[str, Any]:
+		return {
+			"enabled": MODEL_UPDATES,
+			"lstm_finetune": self.finetune,
+			"queued": self._queue.qsize(),
+			"lstm_updates": self.lstm_updates,
+			"failures": self.failures,
+			"refits_started": self.refits,
+			"update_seconds": round(self.update_seconds, 4),
+		}
+
+
+# Shared updater, started with the app
+model_updater = ModelUpdater()
@@ -0,0 +1,298 @@
+import base64
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, delete, func, inspect, or_, text
+
+from database import ReadSessionLocal, SessionLocal
+from models.prediction import Prediction, PredictionRollup
+from services.price_store import PriceStore, price_store
+
+logger = logging.getLogger(__name__)
+
+# Raw prediction rows older than this are compacted into daily rollups
+PREDICTION_RETENTION_DAYS = float(os.getenv("PREDICTION_RETENTION_DAYS", "90"))
+# Seconds between background compaction runs; 0 disables them
+PREDICTION_COMPACT_INTERVAL = float(os.getenv("PREDICTION_COMPACT_INTERVAL", "3600"))
+PREDICTION_PAGE_MAX = 500
+
+
+def ensure_schema(engine):
+	"""Bring an existing predictions table up to date.
+
+	``create_all`` only creates missing tables, so databases created before
+	the history indexes and the origin_date column get them added here.
+	"""
+	columns = {column["name"] for column in inspect(engine).get_columns(Prediction.__tablename__)}
+	with engine.begin() as conn:
+		if "origin_date" not in columns:
+			conn.execute(text(f"ALTER TABLE {Prediction.__tablename__} ADD COLUMN origin_date DATE"))
+		for index in Prediction.__table__.indexes:
+			index.create(conn, checkfirst=True)
+		if engine.dialect.name == "sqlite":
+			# Rows stamped by the server default lack the microseconds SQLAlchemy
+			# writes; SQLite compares the text, so cursors need one format
+			conn.execute(text(f"UPDATE {Prediction.__tablename__} SET created_at = created_at || '.000000' "
+							  f"WHERE length(created_at) = 19"))
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+	raw = json.dumps([created_at.isoformat(), row_id]).encode()
+	return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+	try:
+		raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+		created_at, row_id = json.loads(raw)
+		return datetime.fromisoformat(created_at), int(row_id)
+	except (ValueError, TypeError) as e:
+		raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _row_to_dict(row: Prediction) -> Dict[str, Any]:
+	return {
+		"id": row.id,
+		"symbol": row.symbol,
+		"model": row.model,
+		"step": row.step,
+		"value": row.value,
+		"origin_date": row.origin_date,
+		"created_at": row.created_at,
+	}
+
+
+class PredictionHistory:
+	"""Queries and retention over the ``predictions`` table.
+
+	Pages are newest first and use keyset pagination on (created_at, id),
+	so every page is an index range scan however deep it is. Rows older
+	than ``retention_days`` are compacted into per-day ``prediction_rollups``
+	by ``compact``, which also runs periodically in the background.
+	"""
+
+	def __init__(
+		self,
+		session_factory: Callable[[], Any] = SessionLocal,
+		read_session_factory: Optional[Callable[[], Any]] = None,
+		store: Optional[PriceStore] = None,
+		retention_days: float = PREDICTION_RETENTION_DAYS,
+		compact_interval: float = PREDICTION_COMPACT_INTERVAL,
+	):
+		self.session_factory = session_factory
+		# Queries use read-only sessions (a replica, if configured); tests pass
+		# one factory for both
+		self.read_session_factory = read_session_factory or (
+			ReadSessionLocal if session_factory is SessionLocal else session_factory)
+		self.store = store or price_store
+		self.retention_days = retention_days
+		self.compact_interval = compact_interval
+		self._compact_lock = threading.Lock()
+		self._thread: Optional[threading.Thread] = None
+		self._stopped = threading.Event()
+		self.compactions = 0
+		self.compacted_rows = 0
+
+	def page(self, symbol: Optional[str] = None, model: Optional[str] = None, limit: int = 50,
+			 cursor: Optional[str] = None) -> Dict[str, Any]:
+		"""One page of predictions, newest first; pass ``next_cursor`` back for the next."""
+		limit = min(max(limit, 1), PREDICTION_PAGE_MAX)
+		db = self.read_session_factory()
+		try:
+			query = db.query(Prediction)
+			if symbol:
+				query = query.filter(Prediction.symbol == symbol.upper())
+			if model:
+				query = query.filter(Prediction.model == model)
+			if cursor:
+				created_at, row_id = decode_cursor(cursor)
+				query = query.filter(or_(
+					Prediction.created_at < created_at,
+					and_(Prediction.created_at == created_at, Prediction.id < row_id),
+				))
+			rows = query.order_by(Prediction.created_at.desc(), Prediction.id.desc()).limit(limit + 1).all()
+		finally:
+			db.close()
+		more = len(rows) > limit
+		rows = rows[:limit]
+		return {
+			"items": [_row_to_dict(row) for row in rows],
+			"next_cursor": encode_cursor(rows[-1].created_at, rows[-1].id) if more else None,
+		}
+
+	def latest(self, symbol: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+		"""The most recent forecast of every model, per symbol."""
+		db = self.read_session_factory()
+		try:
+			newest = db.query(
+				Prediction.symbol, Prediction.model, func.max(Prediction.created_at).label("created_at")
+			)
+			if symbol:
+				newest = newest.filter(Prediction.symbol == symbol.upper())
+			newest = newest.group_by(Prediction.symbol, Prediction.model).subquery()
+			rows = (
+				db.query(Prediction)
+				.join(newest, and_(
+					Prediction.symbol == newest.c.symbol,
+					Prediction.model == newest.c.model,
+					Prediction.created_at == newest.c.created_at,
+				))
+				.order_by(Prediction.symbol, Prediction.model, Prediction.step)
+				.all()
+			)
+		finally:
+			db.close()
+		result: Dict[str, Dict[str, Any]] = {}
+		for row in rows:
+			entry = result.setdefault(row.symbol, {}).setdefault(
+				row.model, {"created_at": row.created_at, "origin_date": row.origin_date, "forecast": []}
+			)
+			entry["forecast"].append(row.value)
+		return result
+
+	def errors(self, symbol: str, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, Any]:
+		"""Per model and step: error of stored forecasts against realized closes.
+
+		Step k of a forecast made from ``origin_date`` is compared with the
+		k-th bar after it in the price store (never downloaded here).
+		Forecasts without an origin use the day they were made; compacted
+		rollups count with their mean value and row count. Forecasts whose
+		target bar isn't stored yet are counted as pending.
+		"""
+		symbol = symbol.upper()
+		db = self.read_session_factory()
+		try:
+			raw = db.query(Prediction.model, Prediction.step, Prediction.value, Prediction.origin_date,
+						   Prediction.created_at).filter(Prediction.symbol == symbol)
+			rolled = db.query(PredictionRollup.model, PredictionRollup.step, PredictionRollup.mean_value,
+							  PredictionRollup.origin_date, PredictionRollup.day,
+							  PredictionRollup.count).filter(PredictionRollup.symbol == symbol)
+			if start:
+				raw = raw.filter(Prediction.created_at >= datetime.combine(start, datetime.min.time()))
+				rolled = rolled.filter(PredictionRollup.day >= start)
+			if end:
+				raw = raw.filter(Prediction.created_at < datetime.combine(end, datetime.min.time()))
+				rolled = rolled.filter(PredictionRollup.day < end)
+			rows = [(m, s, v, origin or created.date(), 1) for m, s, v, origin, created in raw]
+			rows += [(m, s, v, origin or day, n) for m, s, v, origin, day, n in rolled]
+		finally:
+			db.close()
+
+		bars = self.store.cached_bars(symbol)
+		closes = bars["Close"]
+		by_key: Dict[Tuple[str, int], Dict[str, Any]] = {}
+		if rows:
+			models = np.array([row[0] for row in rows])
+			steps = np.array([row[1] for row in rows])
+			values = np.array([row[2] for row in rows], dtype=np.float64)
+			origins = np.array([row[3] for row in rows], dtype="datetime64[D]")
+			weights = np.array([row[4] for row in rows], dtype=np.float64)
+			target = np.searchsorted(bars["Date"], origins, side="right") + steps - 1
+			realized = target < len(bars)
+			actual = np.full(len(rows), np.nan)
+			actual[realized] = closes[target[realized]]
+			for key in sorted(set(zip(models, steps.tolist()))):
+				mask = (models == key[0]) & (steps == key[1])
+				done = mask & realized & np.isfinite(actual)
+				w = weights[done]
+				err = values[done] - actual[done]
+				n = float(w.sum())
+				by_key[key] = {
+					"model": str(key[0]),
+					"step": key[1],
+					"count": int(n),
+					"pending": int(weights[mask & ~realized].sum()),
+					"mae": float((w * np.abs(err)).sum() / n) if n else None,
+					"rmse": float(np.sqrt((w * err ** 2).sum() / n)) if n else None,
+					"bias": float((w * err).sum() / n) if n else None,
+					"mape": float((w * np.abs(err) / actual[done]).sum() / n) if n else None,
+				}
+		return {"symbol": symbol, "errors": list(by_key.values())}
+
+	def compact(self, now: Optional[datetime] = None, max_days: int = 31) -> Dict[str, Any]:
+		"""Fold raw rows older than the retention window into daily rollups.
+
+		Each day is summarized and deleted in its own transaction, oldest
+		first, at most ``max_days`` per call.
+		"""
+		now = now or datetime.now(timezone.utc)
+		cutoff = (now - timedelta(days=self.retention_days)).replace(tzinfo=None)
+		compacted = days = 0
+		with self._compact_lock:
+			while days < max_days:
+				db = self.session_factory()
+				try:
+					oldest = db.query(func.min(Prediction.created_at)).filter(Prediction.created_at < cutoff).scalar()
+					if oldest is None:
+						break
+					day = oldest.date()
+					lo = datetime.combine(day, datetime.min.time())
+					hi = min(lo + timedelta(days=1), cutoff)
+					in_day = and_(Prediction.created_at >= lo, Prediction.created_at < hi)
+					groups = (
+						db.query(
+							Prediction.symbol, Prediction.model, Prediction.step,
+							func.count(Prediction.id), func.avg(Prediction.value),
+							func.min(Prediction.value), func.max(Prediction.value),
+							func.max(Prediction.origin_date),
+						)
+						.filter(in_day)
+						.group_by(Prediction.symbol, Prediction.model, Prediction.step)
+						.all()
+					)
+					for symbol, model, step, count, mean, low, high, origin in groups:
+						rollup = db.query(PredictionRollup).filter_by(symbol=symbol, model=model, step=step, day=day).first()
+						if rollup is None:
+							db.add(PredictionRollup(symbol=symbol, model=model, step=step, day=day, origin_date=origin,
+													count=count, mean_value=mean, min_value=low, max_value=high))
+						else:
+							total = rollup.count + count
+							rollup.mean_value = (rollup.mean_value * rollup.count + mean * count) / total
+							rollup.min_value = min(rollup.min_value, low)
+							rollup.max_value = max(rollup.max_value, high)
+							rollup.origin_date = max(filter(None, [rollup.origin_date, origin]), default=None)
+							rollup.count = total
+					deleted = db.execute(delete(Prediction).where(in_day)).rowcount
+					db.commit()
+				except Exception:
+					db.rollback()
+					raise
+				finally:
+					db.close()
+				compacted += deleted
+				days += 1
+		self.compactions += 1
+		self.compacted_rows += compacted
+		return {"compacted_rows": compacted, "days": days, "cutoff": cutoff}
+
+	def start(self):
+		if self._thread is not None or self.compact_interval <= 0:
+			return
+		self._thread = threading.Thread(target=self._run, name="prediction-retention", daemon=True)
+		self._thread.start()
+
+	def stop(self):
+		self._stopped.set()
+
+	def _run(self):
+		while not self._stopped.wait(self.compact_interval):
+			try:
+				self.compact()
+			except Exception as e:
+				logger.exception("Prediction compaction failed: %s", e)
+
+	def stats(self) -> Dict[str, Any]:
+		return {
+			"retention_days": self.retention_days,
+			"compactions": self.compactions,
+			"compacted_rows": self.compacted_rows,
+		}
+
+
+# Shared history used by the DB routes and the retention job
+prediction_history = PredictionHistory()
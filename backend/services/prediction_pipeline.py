@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from services.instrumentation import timed_stage
+from services.price_series import PriceSeries
+from services.model_predict import (
+	HYBRID_WEIGHTS,
+	SENTIMENT_ENSEMBLES,
+	combine_forecasts,
+	predict_stock_price_arima,
+	predict_stock_price_arima_batch,
+	predict_stock_price_lstm,
+	predict_stock_price_lstm_batch,
+	sentiment_effect,
+)
+
+logger = logging.getLogger(__name__)
+
+# Base models: each runs directly on the price data. The PriceSeries also
+# carries the symbol's daily news sentiment (``data.sentiment``, aligned with
+# the bars), which the SENTIMENT_ENSEMBLES take as an exogenous input.
+BASE_MODELS: Dict[str, Callable[[PriceSeries], List[float]]] = {
+	"arima": predict_stock_price_arima,
+	"lstm": predict_stock_price_lstm,
+}
+
+# Vectorized variants of the base models: {key: series} and a horizon in,
+# {key: forecast} out. ``run`` and ``run_batch`` call these so the horizon
+# reaches the models; other base models are cut or extended to it.
+BatchModel = Callable[[Dict[str, PriceSeries], int], Dict[str, List[float]]]
+BATCH_MODELS: Dict[str, BatchModel] = {
+	"arima": predict_stock_price_arima_batch,
+	"lstm": predict_stock_price_lstm_batch,
+}
+
+# Ensembles: name -> {component model: weight}. Components may be base models
+# or other ensembles. Extra ensembles can be declared with the
+# PREDICTION_ENSEMBLES env var, e.g. '{"trend": {"arima": 0.8, "lstm": 0.2}}'.
+DEFAULT_ENSEMBLES: Dict[str, Dict[str, float]] = {
+	"hybrid": dict(HYBRID_WEIGHTS),
+}
+
+
+def _fit_horizon(forecast: List[float], steps: int) -> List[float]:
+	"""Cut a fixed-horizon model's forecast to ``steps``, extending with its last value."""
+	forecast = list(forecast)
+	if len(forecast) >= steps or not forecast:
+		return forecast[:steps]
+	return forecast + [forecast[-1]] * (steps - len(forecast))
+
+
+def load_ensembles() -> Dict[str, Dict[str, float]]:
+	ensembles = {name: dict(weights) for name, weights in DEFAULT_ENSEMBLES.items()}
+	raw = os.getenv("PREDICTION_ENSEMBLES")
+	if raw:
+		try:
+			for name, weights in json.loads(raw).items():
+				ensembles[name] = {str(k): float(v) for k, v in weights.items()}
+		except Exception as e:
+			logger.warning("Ignoring invalid PREDICTION_ENSEMBLES: %s", e)
+	return ensembles
+
+
+class PredictionPipeline:
+	"""Compute every configured model for one request, each exactly once.
+
+	Base model forecasts are memoized for the duration of a ``run`` call and
+	shared by all ensembles that depend on them, so adding an ensemble never
+	re-runs its components.
+	"""
+
+	def __init__(
+		self,
+		base_models: Optional[Dict[str, Callable[[PriceSeries], List[float]]]] = None,
+		ensembles: Optional[Dict[str, Dict[str, float]]] = None,
+		batch_models: Optional[Dict[str, BatchModel]] = None,
+		sentiment_ensembles: Sequence[str] = SENTIMENT_ENSEMBLES,
+	):
+		self.base_models = dict(BASE_MODELS if base_models is None else base_models)
+		# Default batch variants only stand in for the default base models
+		self.batch_models = dict(batch_models) if batch_models is not None else {
+			name: fn for name, fn in BATCH_MODELS.items() if self.base_models.get(name) is BASE_MODELS.get(name)
+		}
+		self.ensembles = load_ensembles() if ensembles is None else dict(ensembles)
+		self.sentiment_ensembles = set(sentiment_ensembles)
+		for name in self.ensembles:
+			if name in self.base_models:
+				raise ValueError(f"Ensemble '{name}' shadows a base model")
+		for name in self.model_names:
+			self._check_dependencies(name, [])
+
+	@property
+	def model_names(self) -> List[str]:
+		return list(self.base_models) + list(self.ensembles)
+
+	def _check_dependencies(self, name: str, stack: List[str]):
+		if name in stack:
+			raise ValueError(f"Cyclic ensemble definition: {' -> '.join(stack + [name])}")
+		if name in self.base_models:
+			return
+		if name not in self.ensembles:
+			raise ValueError(f"Unknown model '{name}'")
+		for component in self.ensembles[name]:
+			self._check_dependencies(component, stack + [name])
+
+	def _base_forecast(self, name: str, data: PriceSeries, steps: int) -> List[float]:
+		if name in self.batch_models:
+			return self.batch_models[name]({"": data}, steps)[""]
+		return _fit_horizon(self.base_models[name](data), steps)
+
+	def _resolve(self, name: str, data: PriceSeries, memo: Dict[str, List[float]], steps: int = 5) -> List[float]:
+		if name in memo:
+			return memo[name]
+		if name in self.base_models:
+			# Each model's own time is recorded as a stage of the request
+			with timed_stage(name):
+				forecast = self._base_forecast(name, data, steps)
+		else:
+			weights = self.ensembles[name]
+			components = [self._resolve(component, data, memo, steps) for component in weights]
+			with timed_stage(name):
+				try:
+					forecast = combine_forecasts(components, list(weights.values()))
+				except Exception as e:
+					logger.warning("Ensemble '%s' combination error: %s", name, e)
+					# Fallback to the first component if combination fails
+					forecast = components[0]
+				if name in self.sentiment_ensembles and data.sentiment is not None:
+					effect = sentiment_effect(data, len(forecast))
+					forecast = [round(float(value), 2) for value in np.asarray(forecast) * effect]
+		memo[name] = forecast
+		return forecast
+
+	def run(self, data: PriceSeries, models: Optional[List[str]] = None, steps: int = 5) -> Dict[str, List[float]]:
+		"""Return {model name: ``steps``-bar forecast} for ``models`` (default: all models)."""
+		memo: Dict[str, List[float]] = {}
+		names = self.model_names if models is None else models
+		for name in names:
+			if name not in self.base_models and name not in self.ensembles:
+				raise ValueError(f"Unknown model '{name}'")
+		return {name: self._resolve(name, data, memo, steps) for name in names}
+
+	def run_batch(self, series_by_key: Dict[str, PriceSeries], models: Optional[List[str]] = None,
+				  steps: int = 5) -> Dict[str, Dict[str, List[float]]]:
+		"""Return {key: {model name: forecast}} for many series at once.
+
+		Base models with a batch variant run once over all series; the
+		others run per series. Ensembles are then combined per series from
+		the shared base forecasts.
+		"""
+		names = self.model_names if models is None else models
+		for name in names:
+			if name not in self.base_models and name not in self.ensembles:
+				raise ValueError(f"Unknown model '{name}'")
+		needed: List[str] = []
+		self._base_dependencies(names, needed)
+		memos: Dict[str, Dict[str, List[float]]] = {key: {} for key in series_by_key}
+		for name in needed:
+			with timed_stage(name):
+				if name in self.batch_models:
+					forecasts = self.batch_models[name](series_by_key, steps)
+				else:
+					forecasts = {key: _fit_horizon(self.base_models[name](data), steps)
+								 for key, data in series_by_key.items()}
+			for key, forecast in forecasts.items():
+				memos[key][name] = forecast
+		return {
+			key: {name: self._resolve(name, data, memos[key], steps) for name in names}
+			for key, data in series_by_key.items()
+		}
+
+	def _base_dependencies(self, names: List[str], out: List[str]):
+		for name in names:
+			if name in self.base_models:
+				if name not in out:
+					out.append(name)
+			else:
+				self._base_dependencies(list(self.ensembles[name]), out)
+
+
+# Shared pipeline used by the API routes
+default_pipeline = PredictionPipeline()
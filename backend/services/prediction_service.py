@@ -0,0 +1,222 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from services.data_fetch import get_stock_data, get_stock_data_many
+from services.instrumentation import timed_stage
+from services.prediction_pipeline import PredictionPipeline, default_pipeline
+
+# Threads running model inference; bounds CPU work independently of the
+# request threadpool so slow predictions can't starve other endpoints
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Seconds a computed prediction is reused for the same (symbol, data version,
+# lookback); shorter horizons are served from a longer cached one
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "60"))
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+# Price range predictions use unless a request names one
+DEFAULT_START = "2024-01-01"
+DEFAULT_END = "2025-01-01"
+# Symbols per vectorized model pass in batch requests; results stream back
+# after each chunk
+PREDICTION_BATCH_CHUNK = int(os.getenv("PREDICTION_BATCH_CHUNK", "64"))
+
+
+class TTLCache:
+	"""Small LRU cache whose entries expire ``ttl`` seconds after insertion."""
+
+	def __init__(self, ttl: float, max_entries: int, clock: Callable[[], float] = time.monotonic):
+		self.ttl = ttl
+		self.max_entries = max_entries
+		self.clock = clock
+		self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+	def get(self, key: Hashable) -> Optional[Any]:
+		entry = self._entries.get(key)
+		if entry is None:
+			return None
+		expires, value = entry
+		if self.clock() >= expires:
+			del self._entries[key]
+			return None
+		self._entries.move_to_end(key)
+		return value
+
+	def put(self, key: Hashable, value: Any):
+		if self.ttl <= 0:
+			return
+		self._entries[key] = (self.clock() + self.ttl, value)
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.max_entries:
+			self._entries.popitem(last=False)
+
+	def clear(self):
+		self._entries.clear()
+
+
+class SingleFlight:
+	"""Coalesce concurrent calls with the same key into one computation.
+
+	The first caller runs the coroutine; callers arriving while it is in
+	flight await the same result (or exception).
+	"""
+
+	def __init__(self):
+		self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+		self.coalesced = 0
+
+	async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+		"""Return (result, leader) where ``leader`` is True for the caller that computed it."""
+		future = self._inflight.get(key)
+		if future is not None:
+			self.coalesced += 1
+			return await asyncio.shield(future), False
+		future = asyncio.get_running_loop().create_future()
+		self._inflight[key] = future
+		try:
+			result = await fn()
+			future.set_result(result)
+			return result, True
+		except BaseException as e:
+			future.set_exception(e)
+			# Mark retrieved so an exception nobody else awaited isn't logged
+			future.exception()
+			raise
+		finally:
+			del self._inflight[key]
+
+
+class PredictionService:
+	"""Async front door for predictions.
+
+	Price data is fetched off the event loop, inference runs on a dedicated
+	bounded executor, identical in-flight requests share one computation and
+	results are cached briefly per (symbol, data version, lookback).
+	"""
+
+	def __init__(
+		self,
+		pipeline: Optional[PredictionPipeline] = None,
+		workers: Optional[int] = None,
+		cache_ttl: Optional[float] = None,
+	):
+		self.pipeline = pipeline or default_pipeline
+		self.workers = workers or INFERENCE_WORKERS
+		self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+		self.cache = TTLCache(PREDICTION_CACHE_TTL if cache_ttl is None else cache_ttl, PREDICTION_CACHE_SIZE)
+		self.fetches = SingleFlight()
+		self.inference = SingleFlight()
+		self.cache_hits = 0
+		self.prefix_hits = 0
+		self.batch_passes = 0
+
+	async def fetch(self, symbol: str, start: str, end: str):
+		symbol = symbol.upper()
+
+		def _timed_fetch():
+			with timed_stage("fetch"):
+				return get_stock_data(symbol, start, end)
+
+		async def _fetch():
+			return await asyncio.to_thread(_timed_fetch)
+
+		series, _ = await self.fetches.do((symbol, start, end), _fetch)
+		return series
+
+	def _cached(self, key: Hashable, steps: int) -> Optional[Dict[str, Any]]:
+		"""Forecasts for ``steps`` bars, cut from a cached equal or longer horizon."""
+		entry = self.cache.get(key)
+		if entry is None or entry[0] < steps:
+			return None
+		self.cache_hits += 1
+		if entry[0] > steps:
+			self.prefix_hits += 1
+		return {name: forecast[:steps] for name, forecast in entry[1].items()}
+
+	def _store(self, key: Hashable, steps: int, forecasts: Dict[str, Any]):
+		# Keep the longest horizon computed; every shorter one is its prefix
+		entry = self.cache.get(key)
+		if entry is None or entry[0] <= steps:
+			self.cache.put(key, (steps, forecasts))
+
+	async def predict(self, symbol: str, start: str, end: str, steps: int = 5,
+					  lookback: Optional[int] = None) -> Tuple[Any, Dict[str, Any], bool]:
+		"""Return (price series, ``steps``-bar forecasts by model, computed).
+
+		Models see the last ``lookback`` bars of [start, end) (all by
+		default). ``computed`` is True only for the request that actually
+		ran the models, so callers can persist each computation once.
+		"""
+		series = await self.fetch(symbol, start, end)
+		if lookback:
+			series = series.tail(lookback)
+		key = (symbol.upper(), series.version, lookback)
+		cached = self._cached(key, steps)
+		if cached is not None:
+			return series, cached, False
+
+		async def _compute():
+			loop = asyncio.get_running_loop()
+			forecasts = await loop.run_in_executor(self.executor, lambda: self.pipeline.run(series, steps=steps))
+			self._store(key, steps, forecasts)
+			return forecasts
+
+		forecasts, computed = await self.inference.do((key, steps), _compute)
+		return series, forecasts, computed
+
+	async def predict_many(self, symbols: List[str], start: str, end: str, steps: int = 5,
+						   lookback: Optional[int] = None,
+						   chunk_size: Optional[int] = None) -> AsyncIterator[Tuple[str, Any, Dict[str, Any], bool]]:
+		"""Yield (symbol, price series, forecasts, computed) as each symbol completes.
+
+		Prices for all symbols are fetched together (one bulk download for
+		uncached ranges). Cached forecasts are yielded first; the rest run
+		through the vectorized models ``chunk_size`` symbols at a time.
+		Symbols without price data yield ``None`` forecasts.
+		"""
+		chunk_size = chunk_size or PREDICTION_BATCH_CHUNK
+
+		def _timed_fetch():
+			with timed_stage("fetch"):
+				return get_stock_data_many(symbols, start, end)
+
+		series_by_symbol = await asyncio.to_thread(_timed_fetch)
+		pending: Dict[str, Any] = {}
+		for symbol, series in series_by_symbol.items():
+			if lookback:
+				series = series.tail(lookback)
+			if not len(series):
+				yield symbol, series, None, False
+				continue
+			cached = self._cached((symbol, series.version, lookback), steps)
+			if cached is not None:
+				yield symbol, series, cached, False
+			else:
+				pending[symbol] = series
+
+		loop = asyncio.get_running_loop()
+		keys = list(pending)
+		for i in range(0, len(keys), chunk_size):
+			chunk = {symbol: pending[symbol] for symbol in keys[i:i + chunk_size]}
+			results = await loop.run_in_executor(
+				self.executor, lambda chunk=chunk: self.pipeline.run_batch(chunk, steps=steps))
+			self.batch_passes += 1
+			for symbol, forecasts in results.items():
+				self._store((symbol, chunk[symbol].version, lookback), steps, forecasts)
+				yield symbol, chunk[symbol], forecasts, True
+
+	def stats(self) -> Dict[str, Any]:
+		return {
+			"cache_hits": self.cache_hits,
+			"prefix_hits": self.prefix_hits,
+			"batch_passes": self.batch_passes,
+			"coalesced_fetches": self.fetches.coalesced,
+			"coalesced_predictions": self.inference.coalesced,
+			"inference_workers": self.workers,
+		}
+
+
+# Shared service used by the API routes
+prediction_service = PredictionService()
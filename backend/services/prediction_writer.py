@@ -0,0 +1,202 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from database import SessionLocal
+from models.prediction import Prediction
+from services.instrumentation import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Rows are buffered and bulk-inserted when FLUSH_ROWS are waiting or every
+# FLUSH_INTERVAL seconds. Beyond MAX_PENDING buffered rows new rows are
+# dropped (and counted) rather than blocking the request.
+PREDICTION_FLUSH_ROWS = int(os.getenv("PREDICTION_FLUSH_ROWS", "500"))
+PREDICTION_FLUSH_INTERVAL = float(os.getenv("PREDICTION_FLUSH_INTERVAL", "1.0"))
+PREDICTION_MAX_PENDING = int(os.getenv("PREDICTION_MAX_PENDING", "50000"))
+# After a failed write the next attempt waits FLUSH_INTERVAL, doubling per
+# consecutive failure up to RETRY_MAX seconds; close() tries CLOSE_ATTEMPTS
+# times before dropping what is left
+PREDICTION_RETRY_MAX = float(os.getenv("PREDICTION_RETRY_MAX", "30"))
+PREDICTION_CLOSE_ATTEMPTS = int(os.getenv("PREDICTION_CLOSE_ATTEMPTS", "3"))
+
+FLUSH_SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class PredictionWriter:
+	"""Write-behind persistence for ``Prediction`` rows.
+
+	``enqueue`` only appends to an in-memory buffer; a background thread
+	flushes the buffer with one executemany INSERT per batch. Rows left in
+	the buffer are flushed by ``close()``, which runs on app shutdown and at
+	interpreter exit.
+	"""
+
+	def __init__(
+		self,
+		session_factory: Callable[[], Any] = SessionLocal,
+		flush_rows: int = PREDICTION_FLUSH_ROWS,
+		flush_interval: float = PREDICTION_FLUSH_INTERVAL,
+		max_pending: int = PREDICTION_MAX_PENDING,
+		retry_max: float = PREDICTION_RETRY_MAX,
+		close_attempts: int = PREDICTION_CLOSE_ATTEMPTS,
+	):
+		self.session_factory = session_factory
+		self.flush_rows = flush_rows
+		self.flush_interval = flush_interval
+		self.max_pending = max_pending
+		self.retry_max = retry_max
+		self.close_attempts = close_attempts
+		self._backoff = 0.0
+		self._retry_at = 0.0
+		self._buffer: Deque[Dict[str, Any]] = deque()
+		self._cond = threading.Condition()
+		self._flush_lock = threading.Lock()
+		self._thread: Optional[threading.Thread] = None
+		self._closed = False
+		self.enqueued_rows = 0
+		self.written_rows = 0
+		self.dropped_rows = 0
+		self.flushes = 0
+		self.failed_flushes = 0
+		self.flush_seconds = Histogram(FLUSH_SECONDS_BUCKETS)
+
+	def start(self):
+		"""Start the flush thread now rather than on the first ``enqueue``."""
+		with self._cond:
+			if not self._closed:
+				self._ensure_started()
+
+	def _ensure_started(self):
+		if self._thread is None:
+			self._thread = threading.Thread(target=self._run, name="prediction-writer", daemon=True)
+			self._thread.start()
+
+	def enqueue(self, symbol: str, forecasts: Dict[str, List[float]], origin_date: Optional[date] = None) -> int:
+		"""Buffer one row per (model, step); returns the number of rows accepted.
+
+		``origin_date`` is the last bar the forecasts were made from; step k
+		forecasts the k-th bar after it.
+		"""
+		return self.enqueue_many([(symbol, forecasts, origin_date)])
+
+	def enqueue_many(self, items: List[Tuple[str, Dict[str, List[float]], Optional[date]]]) -> int:
+		"""``enqueue`` for many (symbol, forecasts, origin_date) at once.
+
+		All rows enter the buffer under one lock, so a batch request reaches
+		the database in the next bulk INSERTs rather than symbol by symbol.
+		"""
+		created_at = datetime.now(timezone.utc)
+		rows = [
+			{"symbol": symbol.upper(), "model": model_name, "step": idx, "value": float(value),
+			 "origin_date": origin_date, "created_at": created_at}
+			for symbol, forecasts, origin_date in items
+			for model_name, forecast in forecasts.items()
+			for idx, value in enumerate(forecast, start=1)
+		]
+		with self._cond:
+			if self._closed:
+				self.dropped_rows += len(rows)
+				return 0
+			self._ensure_started()
+			room = self.max_pending - len(self._buffer)
+			accepted = rows[:max(room, 0)]
+			self.dropped_rows += len(rows) - len(accepted)
+			self._buffer.extend(accepted)
+			self.enqueued_rows += len(accepted)
+			if len(self._buffer) >= self.flush_rows:
+				self._cond.notify()
+		return len(accepted)
+
+	def _run(self):
+		while True:
+			with self._cond:
+				# After a failed write, wait out the backoff even with a full buffer
+				while not self._closed and time.monotonic() < self._retry_at:
+					self._cond.wait(self._retry_at - time.monotonic())
+				if len(self._buffer) < self.flush_rows and not self._closed:
+					self._cond.wait(self.flush_interval)
+				if self._closed:
+					return
+			self.flush()
+
+	def flush(self) -> int:
+		"""Write everything buffered so far; returns the number of rows written."""
+		with self._flush_lock:
+			written = 0
+			while True:
+				with self._cond:
+					if not self._buffer:
+						return written
+					count = min(len(self._buffer), self.flush_rows)
+					batch = [self._buffer.popleft() for _ in range(count)]
+				t0 = time.perf_counter()
+				db = self.session_factory()
+				try:
+					db.execute(insert(Prediction), batch)
+					db.commit()
+				except Exception as e:
+					db.rollback()
+					self.failed_flushes += 1
+					with self._cond:
+						# Put the batch back in front, within the buffer bound
+						room = max(self.max_pending - len(self._buffer), 0)
+						self.dropped_rows += max(len(batch) - room, 0)
+						self._buffer.extendleft(reversed(batch[:room]))
+						self._backoff = min(max(2 * self._backoff, self.flush_interval), self.retry_max)
+						self._retry_at = time.monotonic() + self._backoff
+					logger.warning("Failed to persist %d predictions, retrying in %.1fs: %s", len(batch), self._backoff, e)
+					return written
+				finally:
+					db.close()
+				self._backoff = 0.0
+				self.flush_seconds.observe(time.perf_counter() - t0)
+				self.flushes += 1
+				self.written_rows += len(batch)
+				written += len(batch)
+
+	def close(self):
+		"""Stop the background thread and flush remaining rows.
+
+		A failing flush is retried ``close_attempts`` times; rows still
+		unwritten after that are dropped, counted and logged.
+		"""
+		with self._cond:
+			self._closed = True
+			self._cond.notify()
+		if self._thread is not None:
+			self._thread.join(timeout=5)
+		for attempt in range(self.close_attempts):
+			if attempt:
+				time.sleep(min(self.flush_interval * 2 ** (attempt - 1), self.retry_max))
+			self.flush()
+			if not self._buffer:
+				return
+		with self._cond:
+			lost = len(self._buffer)
+			self._buffer.clear()
+			self.dropped_rows += lost
+		logger.error("Dropped %d unsaved predictions after %d failed flushes on close", lost, self.close_attempts)
+
+	def stats(self) -> Dict[str, Any]:
+		return {
+			"pending_rows": len(self._buffer),
+			"enqueued_rows": self.enqueued_rows,
+			"written_rows": self.written_rows,
+			"dropped_rows": self.dropped_rows,
+			"flushes": self.flushes,
+			"failed_flushes": self.failed_flushes,
+			"flush_seconds": self.flush_seconds.snapshot(),
+		}
+
+
+# Shared writer used by the prediction routes
+prediction_writer = PredictionWriter()
+atexit.register(prediction_writer.close)
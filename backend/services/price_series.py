@@ -0,0 +1,66 @@
+from typing import Optional
+
+import numpy as np
+
+
+class PriceSeries:
+	"""Close prices of one symbol as a float64 array with a datetime64 index.
+
+	Replaces the old list of {'Close', 'Date'} record dicts so the route,
+	services and models work on contiguous arrays instead of re-scanning
+	Python rows. ``sentiment`` optionally carries an exogenous daily news
+	sentiment feature aligned with ``dates`` (see services.sentiment_store).
+	"""
+
+	__slots__ = ("symbol", "close", "dates", "sentiment")
+
+	def __init__(self, close, dates=None, symbol: str = "", sentiment=None):
+		self.symbol = symbol
+		self.close = np.ascontiguousarray(close, dtype=np.float64)
+		if dates is None:
+			self.dates = np.full(len(self.close), np.datetime64("NaT"), dtype="datetime64[D]")
+		else:
+			self.dates = np.asarray(dates, dtype="datetime64[D]")
+		if self.dates.shape != self.close.shape:
+			raise ValueError("close and dates must have the same length")
+		self.sentiment = None if sentiment is None else np.asarray(sentiment, dtype=np.float64)
+		if self.sentiment is not None and self.sentiment.shape != self.close.shape:
+			raise ValueError("sentiment and close must have the same length")
+
+	@classmethod
+	def empty(cls, symbol: str = "") -> "PriceSeries":
+		return cls(np.empty(0), np.empty(0, dtype="datetime64[D]"), symbol)
+
+	@classmethod
+	def from_bars(cls, bars: np.ndarray, symbol: str = "") -> "PriceSeries":
+		"""Build from a structured OHLCV bar array, dropping non-finite closes."""
+		close = np.asarray(bars["Close"], dtype=np.float64)
+		mask = np.isfinite(close)
+		return cls(close[mask], bars["Date"][mask], symbol)
+
+	def __len__(self) -> int:
+		return len(self.close)
+
+	def __repr__(self) -> str:
+		return f"PriceSeries(symbol={self.symbol!r}, bars={len(self)})"
+
+	@property
+	def last(self) -> Optional[float]:
+		return float(self.close[-1]) if len(self.close) else None
+
+	@property
+	def version(self) -> str:
+		"""Cheap fingerprint that changes whenever a bar is added or revised."""
+		if not len(self.close):
+			return "empty"
+		version = f"{len(self.close)}:{self.dates[-1]}:{self.close[-1]!r}"
+		if self.sentiment is not None:
+			# Sentiment ensembles read the feature, so new news expires forecasts too
+			version += f":{self.sentiment[-1]!r}"
+		return version
+
+	def tail(self, n: int) -> "PriceSeries":
+		if n <= 0:
+			return PriceSeries.empty(self.symbol)
+		sentiment = None if self.sentiment is None else self.sentiment[-n:]
+		return PriceSeries(self.close[-n:], self.dates[-n:], self.symbol, sentiment)
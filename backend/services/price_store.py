@@ -0,0 +1,369 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.symbols import symbol_path
+
+if TYPE_CHECKING:
+	import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Per-symbol OHLCV bars are stored as one structured .npy file, memory-mapped
+# on read, plus a small JSON sidecar recording which date range has already
+# been downloaded. Dates are sorted, so range lookups are a binary search.
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", os.path.join(base_dir, "data", "prices"))
+# Seconds before the latest (possibly still changing) bar is re-downloaded
+PRICE_STORE_TTL = float(os.getenv("PRICE_STORE_TTL", "900"))
+
+OHLCV_FIELDS = ("Open", "High", "Low", "Close", "Volume")
+BAR_DTYPE = np.dtype([("Date", "datetime64[D]")] + [(field, "f8") for field in OHLCV_FIELDS])
+
+Downloader = Callable[[str, str, str], Optional["pd.DataFrame"]]
+
+
+def frame_to_bars(frame: Optional["pd.DataFrame"], symbol: str) -> np.ndarray:
+	"""Convert a downloaded OHLCV DataFrame into a sorted structured bar array.
+
+	Handles yfinance's (field, ticker) multi-level columns and a Date column
+	or DatetimeIndex. Rows without a numeric Close are dropped.
+	"""
+	if frame is None or frame.empty:
+		return np.empty(0, dtype=BAR_DTYPE)
+	import pandas as pd
+
+	if isinstance(frame.columns, pd.MultiIndex):
+		tickers = frame.columns.get_level_values(-1)
+		wanted = symbol.upper() if symbol.upper() in set(tickers) else tickers[0]
+		frame = frame.xs(wanted, axis=1, level=-1)
+	if "Date" in frame.columns:
+		dates = pd.to_datetime(frame["Date"])
+	else:
+		dates = pd.to_datetime(frame.index)
+
+	bars = np.empty(len(frame), dtype=BAR_DTYPE)
+	bars["Date"] = np.asarray(dates.values, dtype="datetime64[D]")
+	for field in OHLCV_FIELDS:
+		if field in frame.columns:
+			bars[field] = pd.to_numeric(frame[field], errors="coerce").to_numpy(dtype="f8", na_value=np.nan)
+		else:
+			bars[field] = np.nan
+	bars = bars[~np.isnan(bars["Close"])]
+	return np.sort(bars, order="Date")
+
+
+def split_frame(frame: Optional["pd.DataFrame"], symbols: List[str]) -> Dict[str, np.ndarray]:
+	"""Split a multi-ticker download into bars per symbol.
+
+	Symbols missing from the frame (e.g. delisted tickers) get no bars
+	rather than another ticker's columns.
+	"""
+	import pandas as pd
+
+	if frame is None or frame.empty:
+		return {symbol: np.empty(0, dtype=BAR_DTYPE) for symbol in symbols}
+	if not isinstance(frame.columns, pd.MultiIndex):
+		raise ValueError("Multi-ticker download without per-ticker columns")
+	tickers = set(frame.columns.get_level_values(-1))
+	return {
+		symbol: frame_to_bars(frame, symbol) if symbol in tickers else np.empty(0, dtype=BAR_DTYPE)
+		for symbol in symbols
+	}
+
+
+def _last_date(bars: np.ndarray) -> Optional[np.datetime64]:
+	return bars["Date"][-1] if len(bars) else None
+
+
+class YFinanceDownloader:
+	"""Downloads daily bars from Yahoo Finance."""
+
+	def __call__(self, symbol: str, start: str, end: str) -> Optional["pd.DataFrame"]:
+		import yfinance as yf
+		return yf.download(symbol, start=start, end=end, progress=False)
+
+	def download_many(self, symbols: List[str], start: str, end: str) -> Optional["pd.DataFrame"]:
+		"""One request for many tickers; columns are (field, ticker)."""
+		import yfinance as yf
+		return yf.download(list(symbols), start=start, end=end, progress=False, group_by="column", threads=True)
+
+
+class FileDownloader:
+	"""Serves bars from ``<directory>/<SYMBOL>.csv`` files instead of the network.
+
+	Stands in for yfinance in tests and offline development. CSV files need a
+	Date column plus any of Open/High/Low/Close/Volume. Every call is recorded
+	in ``calls`` so tests can assert what was (re)downloaded; multi-ticker
+	downloads are recorded in ``bulk_calls``.
+	"""
+
+	def __init__(self, directory: str):
+		self.directory = directory
+		self.calls: List[Tuple[str, str, str]] = []
+		self.bulk_calls: List[Tuple[Tuple[str, ...], str, str]] = []
+
+	def _read(self, symbol: str, start: str, end: str) -> "pd.DataFrame":
+		import pandas as pd
+		path = symbol_path(self.directory, symbol.upper()) + ".csv"
+		if not os.path.exists(path):
+			return pd.DataFrame()
+		frame = pd.read_csv(path, parse_dates=["Date"]).set_index("Date")
+		return frame[(frame.index >= pd.Timestamp(start)) & (frame.index < pd.Timestamp(end))]
+
+	def __call__(self, symbol: str, start: str, end: str) -> Optional["pd.DataFrame"]:
+		self.calls.append((symbol, start, end))
+		return self._read(symbol, start, end)
+
+	def download_many(self, symbols: List[str], start: str, end: str) -> Optional["pd.DataFrame"]:
+		"""Frames of every symbol side by side, shaped like a yfinance bulk download."""
+		import pandas as pd
+		self.bulk_calls.append((tuple(symbols), start, end))
+		frames = {symbol: frame for symbol in symbols if not (frame := self._read(symbol, start, end)).empty}
+		if not frames:
+			return pd.DataFrame()
+		return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+
+class PriceStore:
+	"""Persistent per-symbol OHLCV cache in front of a downloader.
+
+	Only date ranges that were never downloaded are fetched, and a request
+	reaching today re-downloads the latest bar once it is older than ``ttl``
+	seconds. Ranges are half-open, [start, end), like ``yf.download``.
+	"""
+
+	def __init__(
+		self,
+		root: Optional[str] = None,
+		downloader: Optional[Downloader] = None,
+		ttl: Optional[float] = None,
+		clock: Callable[[], float] = time.time,
+	):
+		self.root = root or PRICE_STORE_DIR
+		self.downloader = downloader or YFinanceDownloader()
+		self.ttl = PRICE_STORE_TTL if ttl is None else ttl
+		self.clock = clock
+		self._locks: Dict[str, threading.Lock] = {}
+		self._locks_guard = threading.Lock()
+		# Called with (symbol, bars) whenever bars newer than the cached
+		# latest bar are stored, e.g. to update models incrementally
+		self.listeners: List[Callable[[str, np.ndarray], None]] = []
+
+	def _notify(self, symbol: str, old: np.ndarray, new: np.ndarray):
+		if not self.listeners or not len(new):
+			return
+		if len(old):
+			new = new[new["Date"] > old["Date"][-1]]
+		if not len(new):
+			return
+		for listener in self.listeners:
+			try:
+				listener(symbol, new)
+			except Exception as e:
+				logger.exception("Price store listener failed for %s: %s", symbol, e)
+
+	def _lock(self, symbol: str) -> threading.Lock:
+		with self._locks_guard:
+			return self._locks.setdefault(symbol, threading.Lock())
+
+	def _paths(self, symbol: str) -> Tuple[str, str]:
+		stem = symbol_path(self.root, symbol)
+		return stem + ".npy", stem + ".json"
+
+	def _read(self, symbol: str) -> Tuple[np.ndarray, Optional[dict]]:
+		bars_path, meta_path = self._paths(symbol)
+		if not (os.path.exists(bars_path) and os.path.exists(meta_path)):
+			return np.empty(0, dtype=BAR_DTYPE), None
+		with open(meta_path) as f:
+			meta = json.load(f)
+		try:
+			bars = np.load(bars_path, mmap_mode="r")
+		except ValueError:
+			# Empty arrays cannot be memory-mapped
+			bars = np.load(bars_path)
+		return bars, meta
+
+	def _write(self, symbol: str, bars: np.ndarray, meta: dict):
+		os.makedirs(self.root, exist_ok=True)
+		bars_path, meta_path = self._paths(symbol)
+		# Write to temp files and rename so readers never see a partial file
+		np.save(bars_path + ".tmp.npy", bars)
+		os.replace(bars_path + ".tmp.npy", bars_path)
+		with open(meta_path + ".tmp", "w") as f:
+			json.dump(meta, f)
+		os.replace(meta_path + ".tmp", meta_path)
+
+	def _download(self, symbol: str, start: np.datetime64, end: np.datetime64,
+				  prefetched: Optional[Dict[Tuple[np.datetime64, np.datetime64], np.ndarray]] = None) -> np.ndarray:
+		if prefetched and (start, end) in prefetched:
+			return prefetched[(start, end)]
+		frame = self.downloader(symbol, str(start), str(end))
+		return frame_to_bars(frame, symbol)
+
+	@staticmethod
+	def _missing(meta: Optional[dict], start_d: np.datetime64, end_d: np.datetime64,
+				 last: Optional[np.datetime64] = None):
+		"""Return (ranges to download, covered start, covered end) for a request.
+
+		``last`` is the newest cached bar; extending the tail downloads it
+		again, since it may have been cached while its day was still trading.
+		"""
+		if meta is None:
+			return [(start_d, end_d)], start_d, end_d
+		missing = []
+		covered_start = np.datetime64(meta["start"], "D")
+		covered_end = np.datetime64(meta["end"], "D")
+		if start_d < covered_start:
+			missing.append((start_d, covered_start))
+		if end_d > covered_end:
+			missing.append((covered_end if last is None else min(last, covered_end), end_d))
+		return missing, min(covered_start, start_d), max(covered_end, end_d)
+
+	@staticmethod
+	def _merge(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+		combined = np.concatenate([new, np.asarray(old)])
+		# np.unique keeps the first occurrence, so freshly downloaded bars win
+		_, idx = np.unique(combined["Date"], return_index=True)
+		return combined[idx]
+
+	def get_bars(self, symbol: str, start: str, end: str,
+				 prefetched: Optional[Dict[Tuple[np.datetime64, np.datetime64], np.ndarray]] = None) -> np.ndarray:
+		"""Return the structured bar array for [start, end), downloading gaps.
+
+		``prefetched`` maps (start, end) ranges to bars already downloaded
+		for this symbol, e.g. by ``get_bars_many``.
+		"""
+		symbol = symbol.upper()
+		start_d = np.datetime64(start, "D")
+		end_d = np.datetime64(end, "D")
+		with self._lock(symbol):
+			bars, meta = self._read(symbol)
+			missing, covered_start, covered_end = self._missing(meta, start_d, end_d, _last_date(bars))
+
+			# The latest bar may still change while the range reaches today
+			today = np.datetime64(date.today(), "D")
+			refresh_tail = (
+				meta is not None
+				and end_d > today
+				and not any(hi >= end_d for _, hi in missing)
+				and self.clock() - meta.get("refreshed_at", 0) > self.ttl
+			)
+
+			fetched = [self._download(symbol, lo, hi, prefetched) for lo, hi in missing]
+			if refresh_tail:
+				tail_start = bars["Date"][-1] if len(bars) else start_d
+				try:
+					fetched.append(self._download(symbol, tail_start, end_d))
+				except Exception as e:
+					logger.warning("Price store: refreshing %s failed, serving cached bars: %s", symbol, e)
+					refresh_tail = False
+
+			cached = bars
+			if fetched:
+				for new in fetched:
+					bars = self._merge(bars, new)
+				refreshed_at = self.clock() if (refresh_tail or meta is None or end_d > today) else meta.get("refreshed_at", 0)
+				self._write(symbol, bars, {
+					"start": str(covered_start),
+					"end": str(covered_end),
+					"refreshed_at": refreshed_at,
+				})
+
+			dates = bars["Date"]
+			lo = np.searchsorted(dates, start_d, side="left")
+			hi = np.searchsorted(dates, end_d, side="left")
+			result = np.array(bars[lo:hi])
+		if fetched:
+			self._notify(symbol, cached, bars)
+		return result
+
+	def get_bars_many(self, symbols: List[str], start: str, end: str) -> Dict[str, np.ndarray]:
+		"""``get_bars`` for many symbols, with shared gaps downloaded in one request.
+
+		Symbols missing the same date range are fetched with a single
+		multi-ticker download when the downloader supports it; anything the
+		bulk download could not provide falls back to per-symbol downloads.
+		"""
+		symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+		start_d = np.datetime64(start, "D")
+		end_d = np.datetime64(end, "D")
+		download_many = getattr(self.downloader, "download_many", None)
+		prefetched: Dict[str, Dict[Tuple[np.datetime64, np.datetime64], np.ndarray]] = {}
+		if download_many is not None:
+			by_range: Dict[Tuple[np.datetime64, np.datetime64], List[str]] = {}
+			for symbol in symbols:
+				bars, meta = self._read(symbol)
+				for span in self._missing(meta, start_d, end_d, _last_date(bars))[0]:
+					by_range.setdefault(span, []).append(symbol)
+			for (lo, hi), group in by_range.items():
+				if len(group) < 2:
+					continue
+				try:
+					bars_by_symbol = split_frame(download_many(group, str(lo), str(hi)), group)
+				except Exception as e:
+					logger.warning("Price store: bulk download of %d symbols failed, downloading each: %s", len(group), e)
+					continue
+				for symbol, bars in bars_by_symbol.items():
+					prefetched.setdefault(symbol, {})[(lo, hi)] = bars
+		return {symbol: self.get_bars(symbol, start, end, prefetched.get(symbol)) for symbol in symbols}
+
+	def cached_bars(self, symbol: str, after: Optional[str] = None) -> np.ndarray:
+		"""Bars already in the store (optionally only those after a date); never downloads."""
+		bars, _ = self._read(symbol.upper())
+		if after is not None:
+			bars = bars[np.searchsorted(bars["Date"], np.datetime64(after, "D"), side="right"):]
+		return np.array(bars)
+
+	def put_bars(self, symbol: str, bars: np.ndarray) -> int:
+		"""Merge externally supplied bars (e.g. an uploaded dataset) into the store.
+
+		Supplied bars win over cached ones on the same date, and their date
+		range counts as covered so it is never downloaded again. A gap between
+		the cached range and the new bars is downloaded to keep the covered
+		range contiguous. Returns the number of bars stored for ``symbol``.
+		"""
+		symbol = symbol.upper()
+		bars = np.sort(np.asarray(bars, dtype=BAR_DTYPE), order="Date")
+		if not len(bars):
+			return 0
+		start_d = bars["Date"][0]
+		end_d = bars["Date"][-1] + np.timedelta64(1, "D")
+		with self._lock(symbol):
+			cached, meta = self._read(symbol)
+			merged = self._merge(cached, bars)
+			if meta is None:
+				covered_start, covered_end = start_d, end_d
+			else:
+				covered_start = np.datetime64(meta["start"], "D")
+				covered_end = np.datetime64(meta["end"], "D")
+				if end_d < covered_start:
+					merged = self._merge(self._download(symbol, end_d, covered_start), merged)
+				elif start_d > covered_end:
+					merged = self._merge(self._download(symbol, covered_end, start_d), merged)
+				covered_start = min(covered_start, start_d)
+				covered_end = max(covered_end, end_d)
+			self._write(symbol, merged, {
+				"start": str(covered_start),
+				"end": str(covered_end),
+				"refreshed_at": self.clock() if meta is None else meta.get("refreshed_at", 0),
+			})
+		self._notify(symbol, cached, merged)
+		return len(merged)
+
+	def get_frame(self, symbol: str, start: str, end: str) -> "pd.DataFrame":
+		"""Return bars for [start, end) as a Date-indexed OHLCV DataFrame."""
+		import pandas as pd
+		bars = self.get_bars(symbol, start, end)
+		index = pd.DatetimeIndex(bars["Date"].astype("datetime64[ns]"), name="Date")
+		return pd.DataFrame({field: bars[field] for field in OHLCV_FIELDS}, index=index)
+
+
+# Shared store used by the API and the training scripts
+price_store = PriceStore()
@@ -1,19 +1,248 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
 import requests
-from textblob import TextBlob
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+NEWS_API_KEY = os.getenv("NEWS_API_KEY", "YOUR_NEWS_API_KEY")
+NEWS_API_URL = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/everything")
+NEWS_TIMEOUT = float(os.getenv("NEWS_TIMEOUT", "10"))
+# Seconds a news API response is reused for the same query
+NEWS_CACHE_TTL = float(os.getenv("NEWS_CACHE_TTL", "300"))
+# Upstream calls allowed per minute; beyond that stale responses are served
+NEWS_RATE_LIMIT = float(os.getenv("NEWS_RATE_LIMIT", "30"))
+# Sentiment scores memoized by content hash
+SENTIMENT_MEMO_SIZE = int(os.getenv("SENTIMENT_MEMO_SIZE", "20000"))
+# Batches with at least this many unseen texts are scored across processes;
+# smaller ones are cheaper to score in-process (~0.25 ms per title)
+SENTIMENT_PARALLEL_MIN = int(os.getenv("SENTIMENT_PARALLEL_MIN", "512"))
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", str(min(4, os.cpu_count() or 1))))
 
-NEWS_API_KEY = "YOUR_NEWS_API_KEY"
 
-def fetch_financial_news():
-    url = f"https://newsapi.org/v2/everything?q=stocks&apiKey={NEWS_API_KEY}"
-    response = requests.get(url)
-    news_data = response.json()
-    return news_data.get("articles", [])
+class NewsUnavailable(Exception):
+	"""The news API failed or is rate limited and nothing is cached."""
+
 
 def analyze_sentiment(text):
-    return TextBlob(text).sentiment.polarity
+	# TextBlob pulls in nltk/scipy; import it on first use to keep startup fast
+	from textblob import TextBlob
+	return TextBlob(text).sentiment.polarity
+
+
+def _score_batch(texts: Sequence[str]) -> List[float]:
+	return [float(analyze_sentiment(text)) for text in texts]
+
+
+def content_key(text: str) -> str:
+	return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class RateLimiter:
+	"""Token bucket allowing ``per_minute`` calls with bursts of the same size."""
+
+	def __init__(self, per_minute: float, clock=time.monotonic):
+		self.rate = per_minute / 60.0
+		self.capacity = max(per_minute, 1.0)
+		self.tokens = self.capacity
+		self.clock = clock
+		self.updated = clock()
+		self._lock = threading.Lock()
+
+	def try_acquire(self) -> bool:
+		with self._lock:
+			now = self.clock()
+			self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+			self.updated = now
+			if self.tokens >= 1:
+				self.tokens -= 1
+				return True
+			return False
+
+
+class SentimentMemo:
+	"""Thread-safe LRU of sentiment scores keyed by the text's hash.
+
+	Unseen texts in a batch are scored together: in-process for small
+	batches, split across a process pool for large ones (TextBlob is pure
+	Python, so threads would not run in parallel).
+	"""
+
+	def __init__(self, max_entries: int = SENTIMENT_MEMO_SIZE, parallel_min: int = SENTIMENT_PARALLEL_MIN,
+				 workers: int = SENTIMENT_WORKERS):
+		self.max_entries = max_entries
+		self.parallel_min = parallel_min
+		self.workers = workers
+		self._entries: "OrderedDict[str, float]" = OrderedDict()
+		self._lock = threading.Lock()
+		self._pool: Optional[ProcessPoolExecutor] = None
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def _executor(self) -> ProcessPoolExecutor:
+		with self._lock:
+			if self._pool is None:
+				self._pool = ProcessPoolExecutor(max_workers=self.workers,
+												 mp_context=multiprocessing.get_context("spawn"))
+			return self._pool
+
+	def score(self, texts: Sequence[str]) -> List[float]:
+		"""Sentiment polarity for each text, computing only unseen ones."""
+		keys = [content_key(text) for text in texts]
+		scores: Dict[str, float] = {}
+		missing: Dict[str, str] = {}
+		with self._lock:
+			for key, text in zip(keys, texts):
+				if key in self._entries:
+					self._entries.move_to_end(key)
+					scores[key] = self._entries[key]
+					self.hits += 1
+				elif key not in missing:
+					missing[key] = text
+			self.misses += len(missing)
+
+		if missing:
+			pending = list(missing.values())
+			if len(pending) >= self.parallel_min and self.workers > 1:
+				size = -(-len(pending) // self.workers)
+				futures: List[Future] = [self._executor().submit(_score_batch, pending[i:i + size])
+										 for i in range(0, len(pending), size)]
+				computed = [score for future in futures for score in future.result()]
+			else:
+				computed = _score_batch(pending)
+			with self._lock:
+				for key, value in zip(missing, computed):
+					scores[key] = value
+					self._entries[key] = value
+				while len(self._entries) > self.max_entries:
+					self._entries.popitem(last=False)
+					self.evictions += 1
+		return [scores[key] for key in keys]
+
+	def stats(self) -> Dict[str, Any]:
+		return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+	def close(self):
+		with self._lock:
+			pool, self._pool = self._pool, None
+		if pool is not None:
+			pool.shutdown(wait=False, cancel_futures=True)
+
+
+class NewsClient:
+	"""Fetches articles from the news API through a pooled, retrying session.
+
+	Responses are cached per query for ``cache_ttl`` seconds, concurrent
+	misses for the same query share one upstream call, and upstream calls
+	are rate limited. When the API fails or the limit is hit, the last
+	response for the query is served even if it has expired.
+	"""
+
+	def __init__(self, base_url: str = NEWS_API_URL, api_key: str = NEWS_API_KEY, cache_ttl: float = NEWS_CACHE_TTL,
+				 rate_limit: float = NEWS_RATE_LIMIT, timeout: float = NEWS_TIMEOUT, clock=time.monotonic):
+		self.base_url = base_url
+		self.api_key = api_key
+		self.cache_ttl = cache_ttl
+		self.timeout = timeout
+		self.clock = clock
+		self.limiter = RateLimiter(rate_limit, clock)
+		self.session = requests.Session()
+		retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+		adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+		self.session.mount("https://", adapter)
+		self.session.mount("http://", adapter)
+		# query -> (fetched_at, articles)
+		self._cache: Dict[Tuple, Tuple[float, List[Dict[str, Any]]]] = {}
+		self._inflight: Dict[Tuple, threading.Event] = {}
+		self._lock = threading.Lock()
+		self.upstream_calls = 0
+		self.cache_hits = 0
+		self.stale_served = 0
+		self.rate_limited = 0
+
+	def _get(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+		self.upstream_calls += 1
+		response = self.session.get(self.base_url, params={**params, "apiKey": self.api_key}, timeout=self.timeout)
+		response.raise_for_status()
+		return response.json().get("articles", [])
+
+	def fetch(self, q: str = "stocks", **params: str) -> List[Dict[str, Any]]:
+		key = (q,) + tuple(sorted(params.items()))
+		while True:
+			with self._lock:
+				cached = self._cache.get(key)
+				if cached is not None and self.clock() - cached[0] < self.cache_ttl:
+					self.cache_hits += 1
+					return cached[1]
+				waiting = self._inflight.get(key)
+				if waiting is None:
+					self._inflight[key] = threading.Event()
+					break
+			# Another thread is fetching this query; use its result
+			waiting.wait(self.timeout * 3)
+
+		try:
+			if not self.limiter.try_acquire():
+				self.rate_limited += 1
+				raise NewsUnavailable("News API rate limit reached")
+			articles = self._get({"q": q, **params})
+			with self._lock:
+				self._cache[key] = (self.clock(), articles)
+			return articles
+		except (requests.RequestException, ValueError, NewsUnavailable) as e:
+			if cached is not None:
+				self.stale_served += 1
+				logger.warning("News API unavailable (%s); serving cached articles", e)
+				return cached[1]
+			raise NewsUnavailable(str(e)) from e
+		finally:
+			with self._lock:
+				self._inflight.pop(key).set()
+
+	def stats(self) -> Dict[str, Any]:
+		return {
+			"upstream_calls": self.upstream_calls,
+			"cache_hits": self.cache_hits,
+			"stale_served": self.stale_served,
+			"rate_limited": self.rate_limited,
+			"cached_queries": len(self._cache),
+		}
+
+
+# Shared instances used by the news routes
+news_client = NewsClient()
+sentiment_memo = SentimentMemo()
+
+
+def fetch_financial_news(q: str = "stocks"):
+	return news_client.fetch(q)
+
+
+def get_news_with_sentiment(q: str = "stocks", symbol: Optional[str] = None):
+	"""Articles for ``q`` with a title sentiment score.
 
-def get_news_with_sentiment():
-    articles = fetch_financial_news()
-    for article in articles:
-        article["sentiment"] = analyze_sentiment(article["title"])
-    return articles
+	With a ``symbol`` the articles are attributed to it and folded into its
+	daily sentiment aggregates (each article is counted once).
+	"""
+	# Copies, so the cached response isn't mutated
+	articles = [dict(article) for article in fetch_financial_news(q)]
+	scores = sentiment_memo.score([article.get("title") or "" for article in articles])
+	for article, score in zip(articles, scores):
+		article["sentiment"] = score
+	if symbol:
+		from services.sentiment_store import sentiment_store
+		try:
+			sentiment_store.add_articles(symbol, articles)
+		except Exception as e:
+			logger.warning("Recording sentiment for %s failed: %s", symbol, e)
+	return articles
@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from services.symbols import symbol_path
+
+# Per-symbol daily sentiment aggregates, stored like the price store: one
+# date-sorted structured .npy file per symbol (memory-mapped on read) plus a
+# JSON sidecar with the ids of recently counted articles. Range queries and
+# as-of lookups are binary searches; nothing is recomputed per request.
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SENTIMENT_STORE_DIR = os.getenv("SENTIMENT_STORE_DIR", os.path.join(base_dir, "data", "sentiment"))
+# Days for an article's weight in the decayed score to halve
+SENTIMENT_HALF_LIFE = float(os.getenv("SENTIMENT_HALF_LIFE", "3"))
+# Article ids are remembered this many days past the newest aggregate, so a
+# re-fetched article isn't counted twice
+SENTIMENT_DEDUPE_DAYS = int(os.getenv("SENTIMENT_DEDUPE_DAYS", "30"))
+
+# sum/count give the daily mean; weighted_sum/weight carry the exponentially
+# decayed totals through each day, so decayed = weighted_sum / weight
+SENTIMENT_DTYPE = np.dtype([
+	("Date", "datetime64[D]"),
+	("sum", "f8"),
+	("count", "i8"),
+	("weighted_sum", "f8"),
+	("weight", "f8"),
+])
+
+
+def article_date(article: Dict[str, Any]) -> np.datetime64:
+	"""Publication day of a news API article (today if it has none)."""
+	published = article.get("publishedAt") or ""
+	try:
+		return np.datetime64(published[:10], "D")
+	except ValueError:
+		return np.datetime64("today", "D")
+
+
+def article_id(article: Dict[str, Any]) -> str:
+	from services.sentiment_analysis import content_key
+	return content_key(article.get("url") or article.get("title") or "")
+
+
+class SentimentStore:
+	"""Persistent per-symbol daily sentiment aggregates.
+
+	``add`` folds newly scored articles into their days and carries the
+	decayed score forward from the earliest touched day; older days are left
+	alone, so appending today's news is O(1) amortized per day. Queries are
+	O(log n) in the number of stored days.
+	"""
+
+	def __init__(self, root: Optional[str] = None, half_life: float = SENTIMENT_HALF_LIFE,
+				 dedupe_days: int = SENTIMENT_DEDUPE_DAYS):
+		self.root = root or SENTIMENT_STORE_DIR
+		self.half_life = half_life
+		self.decay = 0.5 ** (1.0 / half_life)
+		self.dedupe_days = dedupe_days
+		self._locks: Dict[str, threading.Lock] = {}
+		self._locks_guard = threading.Lock()
+
+	def _lock(self, symbol: str) -> threading.Lock:
+		with self._locks_guard:
+			return self._locks.setdefault(symbol, threading.Lock())
+
+	def _paths(self, symbol: str) -> Tuple[str, str]:
+		stem = symbol_path(self.root, symbol)
+		return stem + ".npy", stem + ".json"
+
+	def _read(self, symbol: str) -> np.ndarray:
+		path, _ = self._paths(symbol)
+		if not os.path.exists(path):
+			return np.empty(0, dtype=SENTIMENT_DTYPE)
+		try:
+			return np.load(path, mmap_mode="r")
+		except ValueError:
+			return np.load(path)
+
+	def _read_seen(self, symbol: str) -> Dict[str, str]:
+		try:
+			with open(self._paths(symbol)[1]) as f:
+				return json.load(f)
+		except (OSError, ValueError):
+			return {}
+
+	def _write(self, symbol: str, days: np.ndarray, seen: Dict[str, str]):
+		os.makedirs(self.root, exist_ok=True)
+		path, seen_path = self._paths(symbol)
+		np.save(path + ".tmp.npy", days)
+		os.replace(path + ".tmp.npy", path)
+		with open(seen_path + ".tmp", "w") as f:
+			json.dump(seen, f)
+		os.replace(seen_path + ".tmp", seen_path)
+
+	def _carry(self, days: np.ndarray, start: int):
+		"""Recompute the decayed totals from row ``start`` onwards, in place."""
+		if start > 0:
+			weighted, weight = days["weighted_sum"][start - 1], days["weight"][start - 1]
+			previous = days["Date"][start - 1]
+		else:
+			weighted = weight = 0.0
+			previous = None
+		for i in range(start, len(days)):
+			if previous is not None:
+				factor = self.decay ** int((days["Date"][i] - previous).astype(int))
+				weighted, weight = weighted * factor, weight * factor
+			weighted += days["sum"][i]
+			weight += days["count"][i]
+			days["weighted_sum"][i], days["weight"][i] = weighted, weight
+			previous = days["Date"][i]
+
+	def add(self, symbol: str, scored: Iterable[Tuple[str, Any, float]]) -> int:
+		"""Fold (article id, date, score) triples into the daily aggregates.
+
+		Articles already counted are skipped, as are articles older than
+		``dedupe_days`` before the newest day: their ids are no longer
+		remembered, so counting them would count every re-fetch again.
+		Returns how many were added.
+		"""
+		symbol = symbol.upper()
+		with self._lock(symbol):
+			seen = self._read_seen(symbol)
+			days = np.array(self._read(symbol))
+			scored = [(key, np.datetime64(day, "D"), score) for key, day, score in scored]
+			newest = max([day for _, day, _ in scored] + ([days["Date"][-1]] if len(days) else []), default=None)
+			if newest is None:
+				return 0
+			cutoff = newest - np.timedelta64(self.dedupe_days, "D")
+			new: Dict[np.datetime64, List[float]] = {}
+			for key, day, score in scored:
+				if key in seen or day < cutoff:
+					continue
+				seen[key] = str(day)
+				new.setdefault(day, []).append(float(score))
+			if not new:
+				return 0
+
+			dates = np.array(sorted(new), dtype="datetime64[D]")
+			at = np.searchsorted(days["Date"], dates)
+			exists = np.zeros(len(dates), dtype=bool)
+			if len(days):
+				exists = days["Date"][np.minimum(at, len(days) - 1)] == dates
+			for day, index in zip(dates[exists], at[exists]):
+				days["sum"][index] += sum(new[day])
+				days["count"][index] += len(new[day])
+			fresh = np.zeros(int((~exists).sum()), dtype=SENTIMENT_DTYPE)
+			fresh["Date"] = dates[~exists]
+			fresh["sum"] = [sum(new[day]) for day in dates[~exists]]
+			fresh["count"] = [len(new[day]) for day in dates[~exists]]
+			days = np.insert(days, at[~exists], fresh)
+			self._carry(days, int(np.searchsorted(days["Date"], dates[0])))
+
+			seen = {key: day for key, day in seen.items() if day >= str(cutoff)}
+			self._write(symbol, days, seen)
+			return sum(len(scores) for scores in new.values())
+
+	def add_articles(self, symbol: str, articles: Iterable[Dict[str, Any]]) -> int:
+		"""Record news API articles that already carry a ``sentiment`` score."""
+		return self.add(symbol, ((article_id(a), article_date(a), a["sentiment"])
+								 for a in articles if a.get("sentiment") is not None))
+
+	def range(self, symbol: str, start: str, end: str) -> List[Dict[str, Any]]:
+		"""Daily aggregates for [start, end)."""
+		days = self._read(symbol.upper())
+		lo = np.searchsorted(days["Date"], np.datetime64(start, "D"), side="left")
+		hi = np.searchsorted(days["Date"], np.datetime64(end, "D"), side="left")
+		return [{
+			"date": str(row["Date"]),
+			"mean": float(row["sum"] / row["count"]) if row["count"] else 0.0,
+			"count": int(row["count"]),
+			"decayed": float(row["weighted_sum"] / row["weight"]) if row["weight"] else 0.0,
+		} for row in days[lo:hi]]
+
+	def feature(self, symbol: str, dates: np.ndarray) -> np.ndarray:
+		"""Decayed score as of each date, fading towards 0 on days without news.
+
+		Dates before the first aggregate get 0 (neutral).
+		"""
+		dates = np.asarray(dates, dtype="datetime64[D]")
+		days = self._read(symbol.upper())
+		out = np.zeros(len(dates))
+		if not len(days) or not len(dates):
+			return out
+		index = np.searchsorted(days["Date"], dates, side="right") - 1
+		known = index >= 0
+		rows = days[index[known]]
+		gap = (dates[known] - rows["Date"]).astype(int)
+		with np.errstate(invalid="ignore", divide="ignore"):
+			score = np.where(rows["weight"] > 0, rows["weighted_sum"] / rows["weight"], 0.0)
+		out[known] = score * self.decay ** gap
+		return out
+
+	def stats(self) -> Dict[str, Any]:
+		try:
+			symbols = [name for name in os.listdir(self.root) if name.endswith(".npy")]
+		except FileNotFoundError:
+			symbols = []
+		return {"symbols": len(symbols), "half_life_days": self.half_life}
+
+
+# Shared store fed by the news routes and read by the prediction data fetch
+sentiment_store = SentimentStore()
@@ -0,0 +1,26 @@
+import os
+import re
+
+# Ticker symbols as stored on disk: upper-case letters, digits and . - ^ =
+SYMBOL_RE = re.compile(r"^[A-Z0-9.\-^=]{1,15}$")
+
+
+def valid_symbol(symbol: str) -> bool:
+	"""Whether ``symbol`` is a ticker that can name files (not just dots)."""
+	return isinstance(symbol, str) and bool(SYMBOL_RE.match(symbol)) and bool(symbol.strip("."))
+
+
+def symbol_path(root: str, symbol: str, *parts: str) -> str:
+	"""``root/symbol/parts...``; raises ValueError unless it stays under ``root``.
+
+	Every store that names files after a symbol builds its paths here, so a
+	symbol from a request can never reach outside the store's directory.
+	"""
+	if not valid_symbol(symbol):
+		raise ValueError(f"Invalid symbol: {symbol!r}")
+	path = os.path.join(root, symbol, *parts)
+	real_root = os.path.realpath(root)
+	real_path = os.path.realpath(path)
+	if real_path == real_root or os.path.commonpath([real_root, real_path]) != real_root:
+		raise ValueError(f"Invalid symbol path: {symbol!r}")
+	return path
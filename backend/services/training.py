@@ -0,0 +1,332 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.model_registry import artifact_path, new_version
+from services.model_updates import record_fit
+
+logger = logging.getLogger(__name__)
+
+TRAIN_START = "2020-01-01"
+TRAIN_END = "2024-01-01"
+ARIMA_ORDER = (5, 1, 0)
+LSTM_TIME_STEPS = 10
+LSTM_EPOCHS = 20
+LSTM_BATCH_SIZE = 16
+
+CPU_COUNT = os.cpu_count() or 1
+# ARIMA fits are single-threaded and independent: one process per core
+ARIMA_WORKERS = int(os.getenv("ARIMA_WORKERS", str(CPU_COUNT)))
+# LSTM jobs run LSTM_CONCURRENCY at a time, each limited to LSTM_THREADS
+# TensorFlow threads, so concurrent jobs don't oversubscribe the cores
+LSTM_CONCURRENCY = int(os.getenv("LSTM_CONCURRENCY", "1"))
+LSTM_THREADS = int(os.getenv("LSTM_THREADS", str(max(1, CPU_COUNT // max(1, LSTM_CONCURRENCY)))))
+
+MODEL_TYPES = ("arima", "lstm")
+
+
+def _close_series(symbol: str, start: str, end: str):
+	from services.price_store import price_store
+	return price_store.get_frame(symbol, start, end)["Close"]
+
+
+def fit_arima(symbol: str, start: str = TRAIN_START, end: str = TRAIN_END, version: Optional[str] = None) -> str:
+	"""Fit ARIMA for one symbol and save it as a new versioned artifact."""
+	from statsmodels.tsa.arima.model import ARIMA
+	from services.arima_numpy import ArimaState
+
+	series = _close_series(symbol, start, end)
+	if len(series) <= sum(ARIMA_ORDER):
+		raise ValueError(f"Not enough price history for {symbol}: {len(series)} bars")
+	result = ARIMA(series.values, order=ARIMA_ORDER).fit()
+	model_path = artifact_path(symbol, "arima", version or new_version())
+	os.makedirs(os.path.dirname(model_path), exist_ok=True)
+	# Keep only the coefficients and filter state, not the statsmodels results
+	ArimaState.from_statsmodels(result).save(model_path)
+	# Starts the refit cadence; requests condition on their own closes until then
+	record_fit(symbol, "arima", os.path.basename(model_path)[:-len(".npz")], series.index[-1])
+	return model_path
+
+
+def build_lstm_model(time_steps: int = LSTM_TIME_STEPS):
+	from tensorflow.keras.layers import LSTM, Dense, Input
+	from tensorflow.keras.models import Sequential
+
+	model = Sequential([
+		Input(shape=(time_steps, 1)),
+		LSTM(50, activation="relu", return_sequences=True),
+		LSTM(50, activation="relu"),
+		Dense(1),
+	])
+	model.compile(optimizer="adam", loss="mse")
+	return model
+
+
+def fit_lstm(symbol: str, start: str = TRAIN_START, end: str = TRAIN_END, version: Optional[str] = None,
+			 epochs: int = LSTM_EPOCHS, callbacks: Optional[list] = None) -> str:
+	"""Train the LSTM for one symbol and save it as a new versioned artifact."""
+	from services.windowing import WindowDataset
+
+	series = _close_series(symbol, start, end)
+	dataset = WindowDataset([series.values], time_steps=LSTM_TIME_STEPS)
+	if not len(dataset):
+		raise ValueError(f"Not enough price history for {symbol}: {len(series)} bars")
+	model = build_lstm_model(LSTM_TIME_STEPS)
+	model.fit(dataset.to_tf_dataset(batch_size=LSTM_BATCH_SIZE), epochs=epochs, verbose=0, callbacks=callbacks)
+	if model.stop_training:
+		raise RuntimeError(f"LSTM training for {symbol} was stopped")
+	model_path = artifact_path(symbol, "lstm", version or new_version())
+	os.makedirs(os.path.dirname(model_path), exist_ok=True)
+	model.save(model_path)
+	record_fit(symbol, "lstm", os.path.basename(model_path)[:-len(".h5")], series.index[-1])
+	return model_path
+
+
+def retrain_job(job) -> Dict[str, Any]:
+	"""Job-queue handler: ingest an uploaded dataset and retrain on it.
+
+	The dataset is streamed into the price store, then each model is fit on
+	exactly the uploaded date range of each symbol. Progress is reported
+	while parsing, per fit and per LSTM epoch; cancellation is checked
+	between fits and epochs. An empty ``models`` list only ingests.
+	"""
+	from services.ingest import ingest_file
+
+	params = job.params
+	models = params.get("models", list(MODEL_TYPES))
+	epochs = int(params.get("epochs", LSTM_EPOCHS))
+	ingest_share = 0.2 if models else 1.0
+	job.report(0.0, "Ingesting dataset")
+	report = ingest_file(
+		job.dataset_path, params.get("symbol", "AAPL"),
+		progress=lambda done, total: job.report(ingest_share * done / max(total, 1), "Ingesting dataset"),
+	)
+	if not report["symbols"]:
+		raise ValueError(f"Dataset has no valid rows ({report['invalid_rows']} invalid)")
+
+	version = new_version()
+	fits = [(symbol, model) for symbol in report["symbols"] for model in models]
+	artifacts: Dict[str, Dict[str, str]] = {}
+	for i, (symbol, model) in enumerate(fits):
+		job.check_cancelled()
+		ingested = report["symbols"][symbol]
+		start = ingested["start"]
+		end = str(np.datetime64(ingested["end"], "D") + np.timedelta64(1, "D"))
+		job.report(ingest_share + (1 - ingest_share) * i / len(fits), f"Training {model} for {symbol}")
+		if model == "arima":
+			path = fit_arima(symbol, start, end, version)
+		else:
+			path = fit_lstm(symbol, start, end, version, epochs=epochs,
+							callbacks=[_job_callback(job, ingest_share, i, len(fits), epochs)])
+		artifacts.setdefault(symbol, {})[model] = path
+	job.report(1.0, "Done")
+	return {"version": version, "artifacts": artifacts, "ingest": report}
+
+
+def _job_callback(job, offset: float, index: int, total: int, epochs: int):
+	from tensorflow.keras.callbacks import Callback
+
+	class JobProgress(Callback):
+		def on_epoch_end(self, epoch, logs=None):
+			done = (index + (epoch + 1) / epochs) / total
+			job.report(offset + (1 - offset) * done, f"Epoch {epoch + 1}/{epochs}")
+			if job.cancel_requested():
+				self.model.stop_training = True
+
+	return JobProgress()
+
+
+def _init_lstm_worker(threads: int):
+	"""Pin a training process to ``threads`` CPU threads before TF starts."""
+	for var in ("OMP_NUM_THREADS", "TF_NUM_INTRAOP_THREADS"):
+		os.environ[var] = str(threads)
+	os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+	import tensorflow as tf
+	tf.config.threading.set_intra_op_parallelism_threads(threads)
+	tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _init_arima_worker():
+	# One fit per process: keep BLAS from spawning a thread per core in each
+	os.environ["OMP_NUM_THREADS"] = "1"
+	os.environ["OPENBLAS_NUM_THREADS"] = "1"
+
+
+class TrainingRun:
+	"""Progress of one orchestrated training run over many symbols."""
+
+	def __init__(self, run_id: str, symbols: List[str], models: Sequence[str]):
+		self.run_id = run_id
+		self.symbols = symbols
+		self.models = list(models)
+		self.created_at = time.time()
+		self.finished_at: Optional[float] = None
+		self.planned: List[Tuple[str, str]] = [(symbol, model) for symbol in symbols for model in self.models]
+		self.futures: Dict[Tuple[str, str], Future] = {}
+		self.results: Dict[Tuple[str, str], Dict[str, Any]] = {}
+		self._lock = threading.Lock()
+
+	def _record(self, key: Tuple[str, str], result: Dict[str, Any]):
+		with self._lock:
+			result["finished_at"] = time.time()
+			self.results[key] = result
+			if len(self.results) == len(self.planned):
+				self.finished_at = time.time()
+
+	def _job_done(self, key: Tuple[str, str], future: Future):
+		if future.cancelled():
+			self._record(key, {"status": "cancelled"})
+		elif future.exception() is not None:
+			self._record(key, {"status": "failed", "error": str(future.exception())})
+		else:
+			self._record(key, {"status": "done", "artifact": future.result()})
+
+	def cancel(self) -> int:
+		"""Cancel jobs that haven't started; returns how many were cancelled."""
+		with self._lock:
+			futures = list(self.futures.values())
+		return sum(1 for future in futures if future.cancel())
+
+	@property
+	def done(self) -> bool:
+		return self.finished_at is not None
+
+	def snapshot(self) -> Dict[str, Any]:
+		with self._lock:
+			jobs = []
+			for key in self.planned:
+				job = {"symbol": key[0], "model": key[1]}
+				if key in self.results:
+					job.update(self.results[key])
+				else:
+					future = self.futures.get(key)
+					job["status"] = "running" if future is not None and future.running() else "pending"
+				jobs.append(job)
+			counts: Dict[str, int] = {}
+			for job in jobs:
+				counts[job["status"]] = counts.get(job["status"], 0) + 1
+			finished = len(self.results)
+			return {
+				"run_id": self.run_id,
+				"status": "finished" if self.done else "running",
+				"progress": finished / len(jobs) if jobs else 1.0,
+				"counts": counts,
+				"created_at": self.created_at,
+				"finished_at": self.finished_at,
+				"jobs": jobs,
+			}
+
+
+class TrainingOrchestrator:
+	"""Trains a universe of symbols in parallel.
+
+	ARIMA fits fan out over a process pool; LSTM jobs go to a separate,
+	smaller pool whose processes are limited to a fixed number of TF
+	threads. Each job writes a new versioned per-symbol artifact, which the
+	model registry serves as soon as it exists.
+	"""
+
+	def __init__(self, arima_workers: int = ARIMA_WORKERS, lstm_concurrency: int = LSTM_CONCURRENCY,
+				 lstm_threads: int = LSTM_THREADS):
+		self.arima_workers = arima_workers
+		self.lstm_concurrency = lstm_concurrency
+		self.lstm_threads = lstm_threads
+		self._arima_pool: Optional[ProcessPoolExecutor] = None
+		self._lstm_pool: Optional[ProcessPoolExecutor] = None
+		self._prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="train-prefetch")
+		self._pools_lock = threading.Lock()
+		self.runs: Dict[str, TrainingRun] = {}
+
+	def _pools(self) -> Tuple[ProcessPoolExecutor, ProcessPoolExecutor]:
+		# Spawned (not forked) workers: forking a process that already runs
+		# TensorFlow or web-server threads is unsafe
+		with self._pools_lock:
+			context = multiprocessing.get_context("spawn")
+			if self._arima_pool is None:
+				self._arima_pool = ProcessPoolExecutor(
+					max_workers=self.arima_workers, mp_context=context, initializer=_init_arima_worker
+				)
+			if self._lstm_pool is None:
+				self._lstm_pool = ProcessPoolExecutor(
+					max_workers=self.lstm_concurrency, mp_context=context,
+					initializer=_init_lstm_worker, initargs=(self.lstm_threads,),
+				)
+			return self._arima_pool, self._lstm_pool
+
+	def start(self, symbols: Sequence[str], models: Sequence[str] = MODEL_TYPES,
+			  start: str = TRAIN_START, end: str = TRAIN_END) -> TrainingRun:
+		"""Queue training jobs and return immediately; poll ``status`` for progress."""
+		symbols = list(dict.fromkeys(s.upper() for s in symbols))
+		if not symbols or not models:
+			# A run with no jobs would never finish
+			raise ValueError("At least one symbol and one model type are required")
+		unknown = [m for m in models if m not in MODEL_TYPES]
+		if unknown:
+			raise ValueError(f"Unknown model types: {unknown}")
+		run = TrainingRun(uuid.uuid4().hex[:12], symbols, models)
+		self.runs[run.run_id] = run
+		threading.Thread(target=self._launch, args=(run, start, end), name=f"train-{run.run_id}", daemon=True).start()
+		return run
+
+	def _launch(self, run: TrainingRun, start: str, end: str):
+		try:
+			self._submit(run, start, end)
+		except Exception as e:
+			# Fail every job that was never submitted so the run still finishes
+			logger.exception("Training run %s failed to launch: %s", run.run_id, e)
+			with run._lock:
+				unsubmitted = [key for key in run.planned if key not in run.futures and key not in run.results]
+			for key in unsubmitted:
+				run._record(key, {"status": "failed", "error": f"Launching training failed: {e}"})
+
+	def _submit(self, run: TrainingRun, start: str, end: str):
+		from services.price_store import price_store
+
+		arima_pool, lstm_pool = self._pools()
+		version = new_version()
+
+		def prefetch(symbol: str):
+			# Fill the price store once per symbol up front so worker
+			# processes only read cached bars instead of racing to download
+			price_store.get_bars(symbol, start, end)
+			return symbol
+
+		futures = {symbol: self._prefetch_pool.submit(prefetch, symbol) for symbol in run.symbols}
+		for symbol, prefetched in futures.items():
+			error = prefetched.exception()
+			for model in run.models:
+				key = (symbol, model)
+				if error is not None:
+					run._record(key, {"status": "failed", "error": f"Fetching prices failed: {error}"})
+					continue
+				pool, fn = (arima_pool, fit_arima) if model == "arima" else (lstm_pool, fit_lstm)
+				future = pool.submit(fn, symbol, start, end, version)
+				with run._lock:
+					run.futures[key] = future
+				future.add_done_callback(lambda f, key=key: run._job_done(key, f))
+
+	def wait(self, run: TrainingRun, poll: float = 1.0) -> Dict[str, Any]:
+		while not run.done:
+			time.sleep(poll)
+		return run.snapshot()
+
+	def status(self, run_id: str) -> Optional[Dict[str, Any]]:
+		run = self.runs.get(run_id)
+		return run.snapshot() if run else None
+
+	def shutdown(self):
+		for pool in (self._arima_pool, self._lstm_pool):
+			if pool is not None:
+				pool.shutdown(wait=False, cancel_futures=True)
+		self._prefetch_pool.shutdown(wait=False)
+
+
+# Shared orchestrator used by the API routes
+training_orchestrator = TrainingOrchestrator()
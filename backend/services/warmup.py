@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.model_registry import GENERIC_SYMBOL, model_registry
+from services.price_series import PriceSeries
+
+logger = logging.getLogger(__name__)
+
+# Symbols whose models are loaded during startup warm-up, e.g. "AAPL,MSFT".
+# The generic models are always warmed.
+WARMUP_SYMBOLS = [s.strip().upper() for s in os.getenv("WARMUP_SYMBOLS", "").split(",") if s.strip()]
+
+
+class Readiness:
+	"""Tracks whether heavy imports and model loading have finished.
+
+	The process is *live* as soon as the app is serving; it is *ready* once
+	a warm-up run completed and the first real request won't pay for
+	importing TensorFlow, loading models or tracing the Keras graph.
+	"""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self.status = "starting"
+		self.error: Optional[str] = None
+		self.started_at: Optional[float] = None
+		self.finished_at: Optional[float] = None
+		self.timings: Dict[str, float] = {}
+
+	def begin(self):
+		with self._lock:
+			self.status = "warming"
+			self.error = None
+			self.started_at = time.time()
+			self.finished_at = None
+
+	def finish(self, status: str, timings: Dict[str, float], error: Optional[str] = None):
+		with self._lock:
+			self.status = status
+			self.error = error
+			self.finished_at = time.time()
+			self.timings = {name: round(seconds, 3) for name, seconds in timings.items()}
+
+	@property
+	def ready(self) -> bool:
+		return self.status == "ready"
+
+	def snapshot(self) -> Dict[str, Any]:
+		with self._lock:
+			duration = None
+			if self.started_at is not None and self.finished_at is not None:
+				duration = round(self.finished_at - self.started_at, 3)
+			return {
+				"live": True,
+				"ready": self.status == "ready",
+				"status": self.status,
+				"error": self.error,
+				"warmup_seconds": duration,
+				"timings": dict(self.timings),
+			}
+
+
+readiness = Readiness()
+
+
+def _synthetic_series(symbol: str, length: int = 60) -> PriceSeries:
+	return PriceSeries(np.linspace(100.0, 110.0, length), symbol=symbol)
+
+
+def warm_up(symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+	"""Import TensorFlow, load models and run one warm-up inference."""
+	from services.model_predict import predict_stock_price_arima, predict_stock_price_lstm_batch
+
+	symbols = [GENERIC_SYMBOL] + [s.upper() for s in (WARMUP_SYMBOLS if symbols is None else symbols)]
+	readiness.begin()
+	timings: Dict[str, float] = {}
+	try:
+		t0 = time.perf_counter()
+		try:
+			import tensorflow  # noqa: F401
+		except Exception as e:
+			logger.warning("TensorFlow import failed: %s", e)
+		timings["import_tensorflow"] = time.perf_counter() - t0
+
+		t0 = time.perf_counter()
+		for symbol in symbols:
+			model_registry.get(symbol, "arima")
+			model_registry.get(symbol, "lstm")
+		timings["load_models"] = time.perf_counter() - t0
+
+		# The first Keras call traces the graph; do it here instead of in a request
+		t0 = time.perf_counter()
+		series = {symbol: _synthetic_series(symbol) for symbol in symbols}
+		predict_stock_price_lstm_batch(series)
+		for data in series.values():
+			predict_stock_price_arima(data)
+		timings["warmup_inference"] = time.perf_counter() - t0
+		readiness.finish("ready", timings)
+	except Exception as e:
+		logger.exception("Model warm-up failed: %s", e)
+		readiness.finish("failed", timings, str(e))
+	return readiness.snapshot()
+
+
+def start_background_warmup(symbols: Optional[List[str]] = None) -> threading.Thread:
+	"""Run ``warm_up`` in a daemon thread so startup and /health aren't blocked."""
+	thread = threading.Thread(target=warm_up, args=(symbols,), name="model-warmup", daemon=True)
+	thread.start()
+	return thread
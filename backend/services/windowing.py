@@ -0,0 +1,92 @@
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def prepare_data(series, time_steps: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+	"""Build LSTM inputs/targets from one series without copying it.
+
+	Same shapes as the old loop-based helper: for a (n, 1) series, X is
+	(n - time_steps, time_steps, 1) and y is (n - time_steps, 1). Both are
+	read-only views into ``series``.
+	"""
+	series = np.asarray(series)
+	squeeze = series.ndim == 1
+	if squeeze:
+		series = series[:, None]
+	if len(series) <= time_steps:
+		X = np.empty((0, time_steps) + series.shape[1:], dtype=series.dtype)
+		y = series[:0]
+	else:
+		# (n - time_steps + 1, features, time_steps) -> (.., time_steps, features)
+		X = sliding_window_view(series, time_steps, axis=0).transpose(0, 2, 1)[:-1]
+		y = series[time_steps:]
+	if squeeze:
+		return X[..., 0], y[:, 0]
+	return X, y
+
+
+class WindowDataset:
+	"""Streams (X, y) training batches over many series.
+
+	Windows never span two series (e.g. two symbols), and only one batch is
+	materialized at a time, so memory stays O(total bars + batch_size *
+	time_steps) no matter how many windows the dataset holds.
+	"""
+
+	def __init__(self, series: Sequence, time_steps: int = 10, dtype=np.float32):
+		self.time_steps = time_steps
+		self.dtype = dtype
+		self.series: List[np.ndarray] = []
+		for values in series:
+			values = np.asarray(values, dtype=dtype).reshape(-1)
+			if len(values) > time_steps:
+				self.series.append(values)
+		counts = np.array([len(values) - time_steps for values in self.series], dtype=np.int64)
+		# offsets[i] is the global index of series i's first window
+		self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+	def __len__(self) -> int:
+		return int(self.offsets[-1])
+
+	def num_batches(self, batch_size: int) -> int:
+		return -(-len(self) // batch_size)
+
+	def batch(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+		"""Contiguous X (k, time_steps, 1) and y (k, 1) for windows [start, stop)."""
+		stop = min(stop, len(self))
+		X = np.empty((stop - start, self.time_steps, 1), dtype=self.dtype)
+		y = np.empty((stop - start, 1), dtype=self.dtype)
+		filled = 0
+		index = start
+		while index < stop:
+			s = int(np.searchsorted(self.offsets, index, side="right") - 1)
+			local = index - int(self.offsets[s])
+			take = min(stop, int(self.offsets[s + 1])) - index
+			values = self.series[s]
+			windows = sliding_window_view(values, self.time_steps)
+			X[filled:filled + take, :, 0] = windows[local:local + take]
+			y[filled:filled + take, 0] = values[local + self.time_steps:local + self.time_steps + take]
+			filled += take
+			index += take
+		return X, y
+
+	def iter_batches(self, batch_size: int, shuffle: bool = False, seed: Optional[int] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+		order = np.arange(self.num_batches(batch_size))
+		if shuffle:
+			np.random.default_rng(seed).shuffle(order)
+		for b in order:
+			yield self.batch(int(b) * batch_size, (int(b) + 1) * batch_size)
+
+	def to_tf_dataset(self, batch_size: int = 16, shuffle: bool = True):
+		"""A ``tf.data.Dataset`` of batches for ``model.fit``; batch order is reshuffled every epoch."""
+		import tensorflow as tf
+		signature = (
+			tf.TensorSpec(shape=(None, self.time_steps, 1), dtype=tf.as_dtype(self.dtype)),
+			tf.TensorSpec(shape=(None, 1), dtype=tf.as_dtype(self.dtype)),
+		)
+		dataset = tf.data.Dataset.from_generator(
+			lambda: self.iter_batches(batch_size, shuffle=shuffle), output_signature=signature
+		)
+		return dataset.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,49 @@
+import numpy as np
+
+from services.arima_numpy import ArimaState, stack_recent
+
+
+def test_ar1_on_differences_matches_closed_form():
+	closes = np.array([100.0, 101.0, 103.0, 104.0])
+	state = ArimaState((1, 1, 0), ar=[0.5])
+
+	forecast = state.forecast_batch(closes, steps=3)[0]
+
+	# Differences follow dz = 0.5 * previous dz, starting from the last change (+1)
+	assert np.allclose(forecast, [104.5, 104.75, 104.875])
+
+
+def test_ma_residuals_feed_the_forecast():
+	# MA(1) on the levels: the last shock is the only predictable component
+	state = ArimaState((0, 0, 1), ma=[0.4], mean=10.0)
+	closes = np.array([10.0, 12.0])
+
+	forecast = state.forecast_batch(closes, steps=2)[0]
+
+	# e0 = 0, e1 = 2 - 0.4 * 0 = 2 -> next = 10 + 0.4 * 2, then the mean
+	assert np.allclose(forecast, [10.8, 10.0])
+
+
+def test_condition_save_load_round_trip(tmp_path):
+	rng = np.random.default_rng(0)
+	closes = 100 + np.cumsum(rng.normal(size=200))
+	state = ArimaState((2, 1, 1), ar=[0.3, -0.1], ma=[0.2]).condition(closes)
+	path = str(tmp_path / "arima.npz")
+	state.save(path)
+
+	loaded = ArimaState.load(path)
+
+	assert len(loaded.history) == 3 and len(loaded.resid) == 1
+	assert np.allclose(loaded.forecast(5), state.forecast_batch(closes, 5)[0])
+
+
+def test_batch_rows_are_independent():
+	rng = np.random.default_rng(1)
+	a = 50 + np.cumsum(rng.normal(size=80))
+	b = 200 + np.cumsum(rng.normal(size=30))
+	state = ArimaState((3, 1, 0), ar=[0.2, 0.1, -0.05])
+
+	batch = state.forecast_batch(stack_recent([a, b]), 4)
+
+	assert np.allclose(batch[0], state.forecast_batch(stack_recent([a]), 4)[0])
+	assert np.allclose(batch[1], state.forecast_batch(stack_recent([b]), 4)[0])
@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from services.arima_numpy import ArimaState
+from services.backtest import BacktestEngine, ForecastCache
+from services.model_registry import ModelRegistry, artifact_path
+from services.prediction_pipeline import PredictionPipeline
+from services.price_store import FileDownloader, PriceStore
+from services.sentiment_store import SentimentStore
+
+
+def _engine(tmp_path):
+	dates = pd.bdate_range("2023-01-02", "2024-12-31")
+	close = 100 + np.cumsum(np.random.default_rng(0).normal(size=len(dates)))
+	pd.DataFrame({"Date": dates, "Close": close}).to_csv(tmp_path / "AAPL.csv", index=False)
+	path = artifact_path("AAPL", "arima", "20240101T000000", str(tmp_path / "models"))
+	os.makedirs(os.path.dirname(path))
+	ArimaState((1, 1, 0), ar=[0.3], history=close[:2]).save(path)
+	return BacktestEngine(
+		store=PriceStore(root=str(tmp_path / "store"), downloader=FileDownloader(str(tmp_path))),
+		registry=ModelRegistry(root=str(tmp_path / "models")),
+		pipeline=PredictionPipeline(base_models={"arima": None, "lstm": None}, ensembles={"hybrid": {"arima": 0.6, "lstm": 0.4}}),
+		cache=ForecastCache(str(tmp_path / "cache")),
+		workers=2,
+		lookback=60,
+		sentiment=SentimentStore(root=str(tmp_path / "sentiment")),
+	)
+
+
+def test_walk_forward_metrics_are_cached_per_origin(tmp_path):
+	engine = _engine(tmp_path)
+
+	first = engine.run(["aapl"], "2024-01-01", "2024-07-01")
+	assert set(first["models"]) == {"arima", "lstm", "hybrid", "naive"}
+	assert first["symbols"][0]["versions"]["lstm"] == "naive"
+	# Without an LSTM artifact the live predictor repeats the last close
+	assert first["models"]["lstm"]["rmse"] == first["models"]["naive"]["rmse"]
+	assert first["rmse"] == first["models"]["hybrid"]["relative_rmse"] and first["r2"] is not None
+	origins = first["symbols"][0]["origins"]
+	assert origins > 100 and first["computed_origins"] == 2 * origins
+
+	again = engine.run(["AAPL"], "2024-01-01", "2024-07-01")
+	assert (again["computed_origins"], again["cached_origins"]) == (0, 2 * origins)
+	assert again["models"] == first["models"]
+
+	# Extending the range only forecasts the new origins
+	longer = engine.run(["AAPL"], "2024-01-01", "2024-08-01")
+	assert longer["computed_origins"] == 2 * (longer["symbols"][0]["origins"] - origins)
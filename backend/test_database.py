@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import exc, text
+
+from database import make_engine, pool_stats
+
+
+def test_sqlite_engines_use_wal_and_read_only_sessions(tmp_path):
+	url = f"sqlite:///{tmp_path / 'app.db'}"
+	writer, reader = make_engine(url), make_engine(url, read_only=True)
+	with writer.begin() as conn:
+		assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+		conn.execute(text("CREATE TABLE t (x INTEGER)"))
+		conn.execute(text("INSERT INTO t VALUES (1)"))
+
+	with reader.connect() as conn:
+		assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 1
+		with pytest.raises(exc.OperationalError):
+			conn.execute(text("INSERT INTO t VALUES (2)"))
+
+	stats = pool_stats(writer)
+	assert stats["pool"] == "TimedQueuePool" and stats["checked_out"] == 0
+	assert stats["checkout_seconds"]["count"] >= 1 and stats["connects"] == 1
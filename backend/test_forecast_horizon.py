@@ -0,0 +1,62 @@
+import asyncio
+
+import numpy as np
+
+from services import prediction_service as prediction_service_module
+from services.model_predict import forecast_lstm
+from services.prediction_pipeline import PredictionPipeline
+from services.prediction_service import PredictionService
+from services.price_series import PriceSeries
+
+
+class MeanModel:
+	"""Next-bar "LSTM" predicting the mean of its window."""
+
+	input_shape = (None, 3, 1)
+	output_shape = (None, 1)
+
+	def __init__(self):
+		self.calls = 0
+
+	def predict_on_batch(self, x):
+		self.calls += 1
+		return x.mean(axis=1)
+
+
+def test_lstm_forecasts_recursively_one_pass_per_step():
+	model = MeanModel()
+	windows = np.array([[1.0, 2.0, 3.0], [3.0, 3.0, 6.0]], dtype=np.float32)
+
+	out = forecast_lstm(model, windows, 3)
+
+	# Each prediction is fed back as the newest bar of the next window
+	np.testing.assert_allclose(out[0], [2.0, 7 / 3, 22 / 9], rtol=1e-6)
+	np.testing.assert_allclose(out[1], [4.0, 13 / 3, 43 / 9], rtol=1e-6)
+	assert model.calls == 3
+	np.testing.assert_allclose(forecast_lstm(MeanModel(), windows, 2), out[:, :2])
+
+
+def test_shorter_horizon_served_from_cached_prefix(monkeypatch):
+	series = PriceSeries(np.linspace(100.0, 110.0, 50), np.arange(50).astype("datetime64[D]"), "AAPL")
+	monkeypatch.setattr(prediction_service_module, "get_stock_data", lambda symbol, start, end: series)
+	runs = []
+
+	def ramp(data):
+		runs.append(len(data))
+		return [data.last + i for i in range(1, 6)]
+
+	service = PredictionService(
+		pipeline=PredictionPipeline(base_models={"ramp": ramp}, ensembles={}), workers=1, cache_ttl=60)
+
+	async def scenario():
+		_, long, computed = await service.predict("AAPL", "2024-01-01", "2025-01-01", steps=8)
+		assert computed and long["ramp"] == [111.0, 112.0, 113.0, 114.0, 115.0, 115.0, 115.0, 115.0]
+		_, short, computed = await service.predict("AAPL", "2024-01-01", "2025-01-01", steps=3)
+		assert not computed and short["ramp"] == long["ramp"][:3]
+		# A different lookback is different input, so it is computed
+		_, tail, computed = await service.predict("AAPL", "2024-01-01", "2025-01-01", steps=3, lookback=20)
+		assert computed and tail["ramp"] == short["ramp"]
+
+	asyncio.run(scenario())
+	assert runs == [50, 20]
+	assert service.stats()["prefix_hits"] == 1
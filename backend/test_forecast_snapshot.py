@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from services.forecast_snapshot import ForecastSnapshot, next_run
+from services.prediction_pipeline import PredictionPipeline
+from services.price_series import PriceSeries
+
+
+class RecordingWriter:
+	def __init__(self):
+		self.items = []
+
+	def enqueue_many(self, items):
+		self.items.extend(items)
+		return len(items)
+
+
+def _series(symbol, n, top):
+	dates = np.datetime64("2024-01-01") + np.arange(n)
+	return PriceSeries(np.linspace(100.0, top, n), dates, symbol, sentiment=np.full(n, 0.25))
+
+
+def test_snapshot_serves_prefixes_and_misses_fall_back(tmp_path):
+	data = {"AAPL": _series("AAPL", 60, 130.0), "MSFT": _series("MSFT", 10, 110.0), "NOPE": PriceSeries.empty("NOPE")}
+	now = [1000.0]
+	writer = RecordingWriter()
+
+	def ramp(series):
+		return [series.last + i for i in range(1, 11)]
+
+	snapshot = ForecastSnapshot(
+		root=str(tmp_path), symbols=["aapl", "msft", "nope"], horizon=8, start="2024-01-01", end="2025-01-01",
+		max_age=3600, pipeline=PredictionPipeline(base_models={"ramp": ramp}, ensembles={"half": {"ramp": 0.5}}),
+		fetch=lambda symbols, start, end: {s: data[s] for s in symbols}, writer=writer, clock=lambda: now[0],
+	)
+	assert snapshot.get("AAPL", 5, "2024-01-01", "2025-01-01") is None
+
+	result = snapshot.refresh()
+	assert result["symbols"] == 2 and result["missing"] == ["NOPE"]
+	assert [(symbol, origin) for symbol, _, origin in writer.items] == [
+		("AAPL", data["AAPL"].dates[-1].item()), ("MSFT", data["MSFT"].dates[-1].item())]
+
+	# Another process sees the published file through the sidecar
+	reader = ForecastSnapshot(root=str(tmp_path), symbols=[], clock=lambda: now[0], max_age=3600)
+	hit = reader.get("aapl", 3, "2024-01-01", "2025-01-01")
+	assert hit["forecasts"] == {"ramp": [131.0, 132.0, 133.0], "half": [65.5, 66.0, 66.5]}
+	assert hit["actual_prices"] == data["AAPL"].close[-30:].tolist() and hit["sentiment"] == 0.25
+	assert reader.get("MSFT", 8, "2024-01-01", "2025-01-01")["actual_prices"] == data["MSFT"].close.tolist()
+
+	assert reader.get("AAPL", 9, "2024-01-01", "2025-01-01") is None  # longer than stored
+	assert reader.get("AAPL", 3, "2024-01-01", "2025-01-01", lookback=20) is None
+	assert reader.get("NOPE", 3, "2024-01-01", "2025-01-01") is None
+	now[0] += 3601
+	assert reader.get("AAPL", 3, "2024-01-01", "2025-01-01") is None  # stale
+	assert (reader.hits, reader.misses) == (2, 4)
+
+
+def test_next_run_is_the_next_weekday_after_the_close():
+	# Friday 2024-03-08 17:00 New York -> Monday 16:30 (after the DST change)
+	friday = datetime(2024, 3, 8, 22, 0, tzinfo=timezone.utc)
+	run = next_run(friday, "16:30", "America/New_York")
+	assert (run.date().isoformat(), run.hour, run.minute) == ("2024-03-11", 16, 30)
+	assert run.astimezone(timezone.utc).hour == 20
+	# Before the close the same day's run is next
+	assert next_run(datetime(2024, 3, 11, 14, 0, tzinfo=timezone.utc), "16:30", "America/New_York").day == 11
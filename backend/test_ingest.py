@@ -0,0 +1,32 @@
+import numpy as np
+
+from services.ingest import ingest_file
+from services.price_store import FileDownloader, PriceStore
+
+
+def test_rows_validated_deduplicated_and_split_by_symbol(tmp_path):
+	path = tmp_path / "upload.csv"
+	path.write_text(
+		"date,ticker,high,low,close,volume\n"
+		"2024-01-02,aapl,11,9,10,100\n"
+		"2024-01-03,AAPL,12,10,11,100\n"
+		"2024-01-02,MSFT,21,19,20,100\n"
+		"2024-01-02,AAPL,11,9,10.5,100\n"  # duplicate date: the later row wins
+		"not-a-date,AAPL,1,1,1,1\n"
+		"2024-01-04,AAPL,1,1,-3,1\n"  # non-positive close
+		"2024-01-05,AAPL,1,2,1,1\n"  # high below low
+		"2024-01-08,MSFT,21,19,,100\n"  # missing close
+	)
+	downloader = FileDownloader(str(tmp_path))
+	store = PriceStore(root=str(tmp_path / "store"), downloader=downloader)
+
+	report = ingest_file(str(path), store=store, chunk_rows=3)
+
+	assert (report["rows"], report["valid_rows"], report["invalid_rows"], report["duplicate_rows"]) == (8, 4, 4, 1)
+	assert report["symbols"]["AAPL"] == {"rows": 2, "start": "2024-01-02", "end": "2024-01-03", "stored_bars": 2}
+	aapl = store.get_bars("AAPL", "2024-01-02", "2024-01-04")
+	assert aapl["Close"].tolist() == [10.5, 11.0]
+	assert store.get_bars("MSFT", "2024-01-02", "2024-01-03")["Close"].tolist() == [20.0]
+	# The uploaded range counts as covered, so nothing was downloaded
+	assert downloader.calls == []
+	assert np.all(np.diff(aapl["Date"].astype("int64")) > 0)
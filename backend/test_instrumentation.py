@@ -0,0 +1,32 @@
+import logging
+
+from services.instrumentation import MetricsRegistry, SampledLogFilter, configure_logging
+
+
+def test_prometheus_exposition_and_log_sampling():
+	registry = MetricsRegistry()
+	requests = registry.counter("requests_total", "Requests.")
+	latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+	requests.inc(route="/stock/predict/{symbol}", status="200")
+	requests.inc(route="/stock/predict/{symbol}", status="200")
+	latency.observe(0.05, stage="fetch")
+	latency.observe(0.5, stage="fetch")
+
+	lines = registry.render().splitlines()
+	assert 'requests_total{route="/stock/predict/{symbol}",status="200"} 2' in lines
+	assert 'latency_seconds_bucket{stage="fetch",le="0.1"} 1' in lines
+	assert 'latency_seconds_bucket{stage="fetch",le="+Inf"} 2' in lines
+	assert 'latency_seconds_count{stage="fetch"} 2' in lines
+
+	never = SampledLogFilter(rate=0.0)
+	record = lambda level: logging.LogRecord("x", level, __file__, 1, "msg", None, None)
+	assert not never.filter(record(logging.INFO))
+	assert never.filter(record(logging.WARNING))
+
+
+def test_only_prediction_loggers_are_sampled():
+	configure_logging(sample_rate=0.0, sampled=("test.predictions",))
+	record = lambda name: logging.LogRecord(name, logging.INFO, __file__, 1, "msg", None, None)
+	assert not logging.getLogger("test.predictions").filter(record("test.predictions"))
+	assert logging.getLogger("test.startup").filter(record("test.startup"))
+	assert all(not any(isinstance(f, SampledLogFilter) for f in h.filters) for h in logging.getLogger().handlers)
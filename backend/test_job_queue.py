@@ -0,0 +1,61 @@
+import io
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models.job import Job  # noqa: F401
+from services.job_queue import JobQueue, save_upload
+
+
+def _queue(tmp_path, handlers):
+	engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+	Base.metadata.create_all(bind=engine)
+	return JobQueue(session_factory=sessionmaker(bind=engine), handlers=handlers, workers=0)
+
+
+def test_same_dataset_is_deduplicated_until_it_fails(tmp_path):
+	path, sha = save_upload(io.BytesIO(b"Date,Close\n2024-01-02,1.0\n"), "prices.csv", str(tmp_path / "up"))
+	again, sha_again = save_upload(io.BytesIO(b"Date,Close\n2024-01-02,1.0\n"), "other.csv", str(tmp_path / "up"))
+	assert (path, sha) == (again, sha_again)
+
+	def fail(job):
+		raise ValueError("bad data")
+
+	queue = _queue(tmp_path, {"retrain": fail})
+	first, created = queue.enqueue("retrain", path, sha)
+	second, created_again = queue.enqueue("retrain", path, sha)
+	assert created and not created_again and second["id"] == first["id"]
+
+	assert queue.run_next() == first["id"]
+	assert queue.get(first["id"])["status"] == "failed"
+	assert "bad data" in queue.get(first["id"])["error"]
+	retry, created = queue.enqueue("retrain", path, sha)
+	assert created and retry["id"] != first["id"]
+
+
+def test_progress_result_and_cancellation(tmp_path):
+	def train(job):
+		job.report(0.5, "halfway")
+		job.check_cancelled()
+		return {"symbol": job.params["symbol"]}
+
+	queue = _queue(tmp_path, {"retrain": train})
+	done, _ = queue.enqueue("retrain", params={"symbol": "AAPL"})
+	skipped, _ = queue.enqueue("retrain", params={"symbol": "MSFT"})
+	assert queue.cancel(skipped["id"])["status"] == "cancelled"
+
+	assert queue.run_next() == done["id"]
+	assert queue.run_next() is None
+	job = queue.get(done["id"])
+	assert (job["status"], job["progress"], job["message"], job["result"]) == ("succeeded", 1.0, "halfway", {"symbol": "AAPL"})
+
+	def cancel_midway(job):
+		queue.cancel(job.id)
+		job.check_cancelled()
+		raise AssertionError("not reached")
+
+	queue = _queue(tmp_path, {"retrain": cancel_midway})
+	running, _ = queue.enqueue("retrain")
+	queue.run_next()
+	assert queue.get(running["id"])["status"] == "cancelled"
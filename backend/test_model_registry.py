@@ -0,0 +1,59 @@
+import os
+
+from services.model_registry import ModelRegistry, artifact_path
+
+
+def _write(path, size):
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path, "wb") as f:
+		f.write(b"x" * size)
+
+
+def _registry(root, max_bytes):
+	loads = []
+
+	def loader(path):
+		loads.append(path)
+		return path
+
+	return ModelRegistry(root=str(root), max_bytes=max_bytes, loaders={"arima": loader, "lstm": loader}), loads
+
+
+def test_latest_version_loaded_once(tmp_path):
+	_write(artifact_path("AAPL", "arima", "20240101T000000", str(tmp_path)), 10)
+	newest = artifact_path("AAPL", "arima", "20250101T000000", str(tmp_path))
+	_write(newest, 10)
+	registry, loads = _registry(tmp_path, 1000)
+
+	assert registry.get("aapl", "arima") == newest
+	assert registry.get("AAPL", "arima") == newest
+	assert loads == [newest]
+	assert registry.stats()["hits"] == 1
+
+
+def test_generic_fallback(tmp_path):
+	generic = os.path.join(str(tmp_path), "lstm_model.h5")
+	_write(generic, 10)
+	registry, _ = _registry(tmp_path, 1000)
+
+	assert registry.get("MSFT", "lstm") == generic
+	assert registry.get("MSFT", "arima") is None
+	assert registry.stats()["generic_fallbacks"] == 1
+
+
+def test_lru_eviction_respects_byte_budget(tmp_path):
+	for symbol in ("A", "B", "C"):
+		_write(artifact_path(symbol, "arima", "1", str(tmp_path)), 40)
+	registry, loads = _registry(tmp_path, 100)
+
+	registry.get("A", "arima")
+	registry.get("B", "arima")
+	registry.get("A", "arima")  # B is now least recently used
+	registry.get("C", "arima")
+
+	stats = registry.stats()
+	assert stats["evictions"] == 1
+	assert stats["bytes_in_use"] == 80
+	assert stats["cached"] == ["A/arima/1", "C/arima/1"]
+	registry.get("B", "arima")
+	assert len(loads) == 4
@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from services.arima_numpy import ArimaState
+from services.model_registry import ModelRegistry, artifact_path
+from services.model_updates import ModelUpdater, read_fit_state, record_fit
+from services.price_store import FileDownloader, PriceStore
+
+
+def test_new_bars_leave_arima_to_the_refit(tmp_path):
+	dates = pd.bdate_range("2024-01-01", "2024-06-28")
+	close = 100 + np.cumsum(np.random.default_rng(0).normal(size=len(dates)))
+	pd.DataFrame({"Date": dates, "Close": close}).to_csv(tmp_path / "AAPL.csv", index=False)
+	root = str(tmp_path / "models")
+	path = artifact_path("AAPL", "arima", "20240401T000000", root)
+	os.makedirs(os.path.dirname(path))
+	fitted = dates < pd.Timestamp("2024-04-01")
+	ArimaState((1, 1, 0), ar=[0.2]).condition(close[fitted]).save(path)
+	record_fit("AAPL", "arima", "20240401T000000", dates[fitted][-1], root)
+
+	store = PriceStore(root=str(tmp_path / "store"), downloader=FileDownloader(str(tmp_path)))
+	registry = ModelRegistry(root=root)
+	updater = ModelUpdater(registry=registry, store=store, finetune=False, refit_days=7)
+	store.listeners.append(updater.notify)
+	store.get_bars("AAPL", "2024-01-01", "2024-07-01")
+
+	# Nothing to fine-tune: no queued work, no new version, no fake update
+	assert updater._queue.empty()
+	assert updater.update_symbol("AAPL") == {}
+	assert registry.versions("AAPL", "arima") == ["20240401T000000"]
+	assert read_fit_state("AAPL", root)["arima"]["through"] == "2024-03-29"
+	assert "arima_updates" not in updater.stats()
+	# The refit cadence is what brings ARIMA up to date
+	assert updater.refits_due(now=read_fit_state("AAPL", root)["arima"]["fitted_at"] + 8 * 86400) == ["AAPL"]
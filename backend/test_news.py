@@ -0,0 +1,67 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.sentiment_analysis import NewsClient, NewsUnavailable, SentimentMemo
+
+
+class _StubNewsAPI(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	hits = []
+	status = 200
+
+	def do_GET(self):
+		type(self).hits.append(self.client_address[1])
+		body = json.dumps({"articles": [{"title": "Stocks rally on great earnings"}, {"title": "Markets fall"}]}).encode()
+		self.send_response(type(self).status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+@pytest.fixture
+def news_api():
+	_StubNewsAPI.hits, _StubNewsAPI.status = [], 200
+	server = ThreadingHTTPServer(("127.0.0.1", 0), _StubNewsAPI)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	yield f"http://127.0.0.1:{server.server_address[1]}/v2/everything"
+	server.shutdown()
+	server.server_close()
+
+
+def test_cached_pooled_rate_limited_client(news_api):
+	now = [0.0]
+	client = NewsClient(base_url=news_api, api_key="test", cache_ttl=10, rate_limit=2, clock=lambda: now[0])
+
+	first = client.fetch("stocks")
+	assert client.fetch("stocks") is first
+	assert len(_StubNewsAPI.hits) == 1
+
+	client.fetch("bonds")
+	# Both upstream calls went over one kept-alive connection
+	assert len(_StubNewsAPI.hits) == 2 and len(set(_StubNewsAPI.hits)) == 1
+
+	# Expired, but the rate limit is used up: the stale response is served
+	now[0] = 11.0
+	assert client.fetch("stocks") is first
+	assert client.stats()["stale_served"] == 1 and len(_StubNewsAPI.hits) == 2
+	with pytest.raises(NewsUnavailable):
+		client.fetch("commodities")
+
+
+def test_sentiment_memo_scores_each_text_once():
+	memo = SentimentMemo(max_entries=2, parallel_min=10**6)
+	scores = memo.score(["great gains", "terrible losses", "great gains"])
+	assert scores[0] == scores[2] > 0 > scores[1]
+	assert memo.stats()["misses"] == 2 and memo.stats()["hits"] == 0
+
+	assert memo.score(["terrible losses"]) == [scores[1]]
+	memo.score(["flat day"])
+	# "great gains" was least recently used
+	assert memo.stats() == {"entries": 2, "hits": 1, "misses": 3, "evictions": 1}
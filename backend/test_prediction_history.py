@@ -0,0 +1,72 @@
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models.prediction import Prediction, PredictionRollup
+from services.prediction_history import PredictionHistory, ensure_schema
+from services.price_store import FileDownloader, PriceStore
+
+
+def test_old_table_is_migrated(tmp_path):
+	engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+	with engine.begin() as conn:
+		conn.execute(text("CREATE TABLE predictions (id INTEGER PRIMARY KEY, symbol VARCHAR NOT NULL, model VARCHAR NOT NULL, "
+						  "step INTEGER NOT NULL, value FLOAT NOT NULL, created_at DATETIME NOT NULL)"))
+	ensure_schema(engine)
+	ensure_schema(engine)
+	assert "origin_date" in {c["name"] for c in inspect(engine).get_columns("predictions")}
+	assert "ix_predictions_symbol_model_created" in {i["name"] for i in inspect(engine).get_indexes("predictions")}
+
+
+def test_pages_latest_errors_and_compaction(tmp_path):
+	engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+	Base.metadata.create_all(bind=engine)
+	factory = sessionmaker(bind=engine)
+	dates = pd.bdate_range("2024-01-01", "2024-03-29")
+	pd.DataFrame({"Date": dates, "Close": np.arange(len(dates), dtype=float) + 100}).to_csv(tmp_path / "AAPL.csv", index=False)
+	store = PriceStore(root=str(tmp_path / "prices"), downloader=FileDownloader(str(tmp_path)))
+	store.get_bars("AAPL", "2024-01-01", "2024-04-01")
+
+	now = datetime(2024, 6, 1, tzinfo=timezone.utc)
+	db = factory()
+	for age in range(10):
+		created = now - timedelta(days=100 - age)
+		origin = date(2024, 1, 2) + timedelta(days=age)
+		for model in ("arima", "lstm"):
+			for step in (1, 2):
+				db.add(Prediction(symbol="AAPL", model=model, step=step, value=200.0 + age, origin_date=origin, created_at=created))
+	db.commit()
+	db.close()
+	history = PredictionHistory(session_factory=factory, store=store, retention_days=95)
+
+	seen, cursor = [], None
+	while True:
+		page = history.page("aapl", "arima", limit=3, cursor=cursor)
+		seen += [row["id"] for row in page["items"]]
+		cursor = page["next_cursor"]
+		if cursor is None:
+			break
+	assert len(seen) == len(set(seen)) == 20 and seen == sorted(seen, reverse=True)
+
+	latest = history.latest("AAPL")["AAPL"]
+	assert latest["lstm"]["forecast"] == [209.0, 209.0]
+
+	before = {(e["model"], e["step"]): e for e in history.errors("AAPL")["errors"]}
+	assert before[("arima", 1)]["count"] == 10 and before[("arima", 1)]["pending"] == 0
+	assert before[("lstm", 2)]["bias"] > 0
+
+	result = history.compact(now=now)
+	# Rows made more than 95 days before `now`: the first five days
+	assert result["compacted_rows"] == 20 and result["days"] == 5
+	db = factory()
+	assert db.query(Prediction).count() == 20 and db.query(PredictionRollup).count() == 20
+	db.close()
+	after = {(e["model"], e["step"]): e for e in history.errors("AAPL")["errors"]}
+	assert after.keys() == before.keys()
+	assert all(after[key]["count"] == before[key]["count"] for key in before)
+	assert after[("arima", 1)]["mae"] == before[("arima", 1)]["mae"]
+	assert history.compact(now=now)["compacted_rows"] == 0
@@ -0,0 +1,75 @@
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models.prediction import Prediction
+from services.prediction_writer import PredictionWriter
+
+
+def _session_factory(tmp_path):
+	engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+	Base.metadata.create_all(bind=engine)
+	return sessionmaker(bind=engine)
+
+
+def test_rows_written_in_bulk_on_close(tmp_path):
+	factory = _session_factory(tmp_path)
+	writer = PredictionWriter(session_factory=factory, flush_rows=1000, flush_interval=60)
+
+	writer.enqueue("aapl", {"arima": [1.0, 2.0], "lstm": [3.0, 4.0]})
+	writer.enqueue("msft", {"hybrid": [5.0]})
+	writer.close()
+
+	db = factory()
+	rows = db.query(Prediction).order_by(Prediction.id).all()
+	assert [(r.symbol, r.model, r.step, r.value) for r in rows] == [
+		("AAPL", "arima", 1, 1.0),
+		("AAPL", "arima", 2, 2.0),
+		("AAPL", "lstm", 1, 3.0),
+		("AAPL", "lstm", 2, 4.0),
+		("MSFT", "hybrid", 1, 5.0),
+	]
+	assert writer.stats()["flushes"] == 1
+
+
+def test_backpressure_drops_and_counts_rows(tmp_path):
+	writer = PredictionWriter(session_factory=_session_factory(tmp_path), flush_rows=1000, flush_interval=60, max_pending=3)
+
+	assert writer.enqueue("AAPL", {"arima": [1.0, 2.0, 3.0, 4.0, 5.0]}) == 3
+	stats = writer.stats()
+	assert stats["pending_rows"] == 3
+	assert stats["dropped_rows"] == 2
+	writer.close()
+	assert writer.stats()["written_rows"] == 3
+
+
+class _LockedSession:
+	def execute(self, *args):
+		raise OSError("database is locked")
+
+	def rollback(self):
+		pass
+
+	def close(self):
+		pass
+
+
+def test_failed_writes_back_off_and_are_dropped_on_close():
+	attempts = []
+
+	def factory():
+		attempts.append(time.monotonic())
+		return _LockedSession()
+
+	writer = PredictionWriter(session_factory=factory, flush_rows=1, flush_interval=0.05, retry_max=0.2, close_attempts=2)
+	writer.enqueue("AAPL", {"arima": [1.0, 2.0]})
+	time.sleep(0.5)
+	# 0.05s, 0.1s, 0.2s, 0.2s between attempts rather than a busy loop
+	assert 2 <= len(attempts) <= 6
+	assert writer.stats()["pending_rows"] == 2
+
+	writer.close()
+	stats = writer.stats()
+	assert (stats["pending_rows"], stats["dropped_rows"], stats["written_rows"]) == (0, 2, 0)
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.price_store import FileDownloader, PriceStore
+
+
+def _write_csv(directory, symbol, start, end):
+	dates = pd.bdate_range(start, end)
+	close = np.linspace(100.0, 200.0, len(dates))
+	pd.DataFrame({
+		"Date": dates,
+		"Open": close - 1,
+		"High": close + 1,
+		"Low": close - 2,
+		"Close": close,
+		"Volume": 1000.0,
+	}).to_csv(directory / f"{symbol}.csv", index=False)
+	return dates
+
+
+def test_cached_range_is_served_without_download(tmp_path):
+	_write_csv(tmp_path, "AAPL", "2024-01-01", "2024-12-31")
+	downloader = FileDownloader(str(tmp_path))
+	store = PriceStore(root=str(tmp_path / "store"), downloader=downloader)
+
+	first = store.get_bars("aapl", "2024-01-01", "2025-01-01")
+	second = store.get_bars("AAPL", "2024-01-01", "2025-01-01")
+
+	assert len(downloader.calls) == 1
+	assert len(first) == len(second) > 200
+	assert np.all(np.diff(first["Date"].astype("int64")) > 0)
+
+
+def test_only_missing_head_and_tail_are_downloaded(tmp_path):
+	_write_csv(tmp_path, "MSFT", "2023-01-01", "2024-12-31")
+	downloader = FileDownloader(str(tmp_path))
+	store = PriceStore(root=str(tmp_path / "store"), downloader=downloader)
+
+	store.get_bars("MSFT", "2024-01-01", "2024-06-01")
+	store.get_bars("MSFT", "2023-06-01", "2024-09-01")
+
+	assert downloader.calls == [
+		("MSFT", "2024-01-01", "2024-06-01"),
+		("MSFT", "2023-06-01", "2024-01-01"),
+		# From the last cached bar (Friday 2024-05-31), which may have been partial
+		("MSFT", "2024-05-31", "2024-09-01"),
+	]
+	frame = store.get_frame("MSFT", "2023-06-01", "2024-09-01")
+	assert frame.index.is_unique and frame.index.is_monotonic_increasing
+	assert frame.index[0] >= pd.Timestamp("2023-06-01")
+	assert frame.index[-1] < pd.Timestamp("2024-09-01")
+
+
+def test_latest_bar_refreshed_after_ttl(tmp_path):
+	today = pd.Timestamp.today().normalize()
+	_write_csv(tmp_path, "TSLA", today - pd.Timedelta(days=30), today)
+	now = [1000.0]
+	downloader = FileDownloader(str(tmp_path))
+	store = PriceStore(root=str(tmp_path / "store"), downloader=downloader, ttl=60, clock=lambda: now[0])
+	start = str((today - pd.Timedelta(days=30)).date())
+	end = str((today + pd.Timedelta(days=1)).date())
+
+	store.get_bars("TSLA", start, end)
+	store.get_bars("TSLA", start, end)
+	assert len(downloader.calls) == 1
+
+	now[0] += 61
+	store.get_bars("TSLA", start, end)
+	assert len(downloader.calls) == 2
+	assert downloader.calls[-1][2] == end
+
+
+def test_extending_the_tail_refetches_the_last_cached_bar(tmp_path):
+	today = pd.Timestamp.today().normalize()
+	dates = _write_csv(tmp_path, "AMZN", today - pd.Timedelta(days=30), today)
+	now = [1000.0]
+	downloader = FileDownloader(str(tmp_path))
+	store = PriceStore(root=str(tmp_path / "store"), downloader=downloader, ttl=60, clock=lambda: now[0])
+	start = str((today - pd.Timedelta(days=30)).date())
+	store.get_bars("AMZN", start, str((today + pd.Timedelta(days=1)).date()))
+
+	# The last bar is revised after the close; a later request reaching further
+	# picks it up within the TTL
+	frame = pd.read_csv(tmp_path / "AMZN.csv")
+	frame.loc[frame.index[-1], "Close"] = 50.0
+	frame.to_csv(tmp_path / "AMZN.csv", index=False)
+	bars = store.get_bars("AMZN", start, str((today + pd.Timedelta(days=2)).date()))
+
+	assert downloader.calls[-1][1] == str(dates[-1].date())
+	assert bars["Close"][-1] == 50.0
+
+
+def test_bulk_fetch_downloads_shared_gap_once(tmp_path):
+	for symbol in ("AAPL", "MSFT", "NVDA"):
+		_write_csv(tmp_path, symbol, "2024-01-01", "2024-12-31")
+	downloader = FileDownloader(str(tmp_path))
+	store = PriceStore(root=str(tmp_path / "store"), downloader=downloader)
+	store.get_bars("AAPL", "2024-01-01", "2025-01-01")
+
+	bars = store.get_bars_many(["aapl", "MSFT", "NVDA", "NOPE"], "2024-01-01", "2025-01-01")
+
+	# AAPL is cached; the other three share one missing range
+	assert downloader.bulk_calls == [(("MSFT", "NVDA", "NOPE"), "2024-01-01", "2025-01-01")]
+	assert downloader.calls == [("AAPL", "2024-01-01", "2025-01-01")]
+	assert list(bars) == ["AAPL", "MSFT", "NVDA", "NOPE"]
+	assert len(bars["MSFT"]) == len(bars["AAPL"]) > 200 and len(bars["NOPE"]) == 0
+	np.testing.assert_array_equal(store.cached_bars("NVDA"), bars["NVDA"])
+
+
+def test_symbols_cannot_escape_the_store(tmp_path):
+	store = PriceStore(root=str(tmp_path / "store"), downloader=FileDownloader(str(tmp_path)))
+
+	for symbol in ("../escaped", "..", "A/B"):
+		with pytest.raises(ValueError):
+			store.get_bars(symbol, "2024-01-01", "2024-02-01")
+	assert not (tmp_path / "ESCAPED.npy").exists()
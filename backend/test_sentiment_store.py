@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from services.model_predict import sentiment_effect
+from services.prediction_pipeline import PredictionPipeline
+from services.price_series import PriceSeries
+from services.sentiment_store import SentimentStore
+
+
+def test_incremental_aggregates_match_a_single_batch(tmp_path):
+	scored = [("a", "2024-01-02", 0.5), ("b", "2024-01-02", -0.1), ("c", "2024-01-05", 0.3), ("d", "2024-01-03", -0.4)]
+	batch = SentimentStore(root=str(tmp_path / "batch"), half_life=2)
+	assert batch.add("aapl", scored) == 4
+
+	incremental = SentimentStore(root=str(tmp_path / "inc"), half_life=2)
+	for item in scored:
+		incremental.add("AAPL", [item])
+	# Re-fetched articles are not counted again
+	assert incremental.add("AAPL", scored[:2]) == 0
+	assert incremental.range("AAPL", "2024-01-01", "2024-02-01") == pytest.approx(batch.range("AAPL", "2024-01-01", "2024-02-01"))
+
+	days = batch.range("AAPL", "2024-01-02", "2024-01-05")
+	assert [d["date"] for d in days] == ["2024-01-02", "2024-01-03"]
+	assert days[0]["mean"] == pytest.approx(0.2) and days[0]["count"] == 2
+	# Jan 2 totals (0.4 over 2 articles) decay for a day, then Jan 3 adds -0.4 over 1
+	decay = 0.5 ** 0.5
+	assert days[1]["decayed"] == pytest.approx((0.4 * decay - 0.4) / (2 * decay + 1))
+
+	feature = batch.feature("AAPL", np.array(["2024-01-01", "2024-01-03", "2024-01-07"], dtype="datetime64[D]"))
+	assert feature[0] == 0.0 and feature[1] == pytest.approx(days[1]["decayed"])
+	# Two days without news since Jan 5: the score fades by one half-life
+	last = batch.range("AAPL", "2024-01-05", "2024-01-06")[0]["decayed"]
+	assert feature[2] == pytest.approx(last * 0.5)
+
+
+def test_articles_older_than_the_dedupe_window_are_not_recounted(tmp_path):
+	store = SentimentStore(root=str(tmp_path), dedupe_days=30)
+	batch = [("new", "2024-03-01", 0.5), ("old", "2024-01-01", -0.5)]
+	# The same month-old article comes back with every news fetch
+	for _ in range(3):
+		store.add("AAPL", batch)
+	assert [(d["date"], d["count"]) for d in store.range("AAPL", "2023-12-01", "2024-04-01")] == [("2024-03-01", 1)]
+	# Within the window an old-ish article still counts once
+	assert store.add("AAPL", [("recent", "2024-02-15", 0.1)] * 2) == 1
+
+
+def test_sentiment_moves_the_hybrid_forecast():
+	rng = np.random.default_rng(0)
+	score = rng.uniform(-1, 1, 200)
+	# Good news precedes up days
+	close = 100 * np.exp(np.cumsum(np.r_[0.0, 0.01 * score[:-1] + rng.normal(0, 0.001, 199)]))
+	flat = lambda data: [float(data.close[-1])] * 5
+	pipeline = PredictionPipeline(base_models={"arima": flat, "lstm": flat}, ensembles={"hybrid": {"arima": 0.6, "lstm": 0.4}},
+								  batch_models={}, sentiment_ensembles=["hybrid"])
+
+	score[-1] = 1.0
+	with_news = pipeline.run(PriceSeries(close, symbol="AAPL", sentiment=score), steps=5)
+	without = pipeline.run(PriceSeries(close, symbol="AAPL"), steps=5)
+
+	assert without["hybrid"] == [round(close[-1], 2)] * 5
+	assert np.all(np.diff(with_news["hybrid"]) > 0) and with_news["hybrid"][0] > without["hybrid"][0]
+	assert with_news["arima"] == without["arima"]
+	assert np.all(sentiment_effect(PriceSeries(close, sentiment=np.zeros(200)), 5) == 1.0)
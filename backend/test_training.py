@@ -0,0 +1,27 @@
+import pytest
+
+from services.training import TrainingOrchestrator
+
+
+def test_a_run_without_jobs_is_rejected():
+	orchestrator = TrainingOrchestrator()
+	with pytest.raises(ValueError):
+		orchestrator.start([], ["arima"])
+	with pytest.raises(ValueError):
+		orchestrator.start(["AAPL"], [])
+	assert orchestrator.runs == {}
+
+
+def test_a_launch_failure_fails_every_job(monkeypatch):
+	orchestrator = TrainingOrchestrator()
+
+	def broken_pools():
+		raise OSError("cannot spawn workers")
+
+	monkeypatch.setattr(orchestrator, "_pools", broken_pools)
+	run = orchestrator.start(["AAPL", "MSFT"], ["arima", "lstm"])
+
+	snapshot = orchestrator.wait(run, poll=0.01)
+	assert snapshot["status"] == "finished"
+	assert snapshot["counts"] == {"failed": 4}
+	assert all("cannot spawn workers" in job["error"] for job in snapshot["jobs"])
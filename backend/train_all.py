@@ -1,47 +1,18 @@
-import os
-import pickle
-import numpy as np
-import pandas as pd
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
-import yfinance as yf
-from statsmodels.tsa.arima.model import ARIMA
-
-# Ensure models directory exists
-os.makedirs('models', exist_ok=True)
+from services.price_store import price_store
+from services.training import fit_arima, fit_lstm, training_orchestrator, MODEL_TYPES
+from services.windowing import prepare_data  # noqa: F401
 
 def fetch_stock_data(symbol, start="2020-01-01", end="2024-01-01"):
-    data = yf.download(symbol, start=start, end=end)
+    data = price_store.get_frame(symbol, start, end)
     return data["Close"].values.reshape(-1, 1), data["Close"]
 
-def prepare_data(series, time_steps=10):
-    X, y = [], []
-    for i in range(len(series) - time_steps):
-        X.append(series[i:i+time_steps])
-        y.append(series[i+time_steps])
-    return np.array(X), np.array(y)
-
 def train_arima(symbol):
-    _, stock_data_series = fetch_stock_data(symbol)
-    model = ARIMA(stock_data_series, order=(5,1,0))
-    arima_model = model.fit()
-    with open("models/arima_model.pkl", "wb") as f:
-        pickle.dump(arima_model, f)
-    print(f"ARIMA model for {symbol} saved successfully!")
+    model_path = fit_arima(symbol)
+    print(f"ARIMA model for {symbol} saved successfully at {model_path}!")
 
 def train_lstm(symbol):
-    stock_data, _ = fetch_stock_data(symbol)
-    X, y = prepare_data(stock_data)
-    model = Sequential([
-        LSTM(50, activation="relu", return_sequences=True, input_shape=(X.shape[1], 1)),
-        LSTM(50, activation="relu"),
-        Dense(1)
-    ])
-    model.compile(optimizer="adam", loss="mse")
-    model.fit(X, y, epochs=20, batch_size=16, verbose=1)
-    model.save("models/lstm_model.h5")
-    print(f"LSTM model for {symbol} saved successfully!")
+    model_path = fit_lstm(symbol)
+    print(f"LSTM model for {symbol} saved successfully at {model_path}!")
 
 def train_all(symbol="AAPL"):
     print(f"Training models for {symbol}...")
@@ -49,9 +20,25 @@ def train_all(symbol="AAPL"):
     train_lstm(symbol)
     print("All models trained and saved.")
 
+def train_many(symbols, models=MODEL_TYPES):
+    # ARIMA fits run in a process pool, LSTM jobs with bounded concurrency
+    run = training_orchestrator.start(symbols, models)
+    print(f"Training run {run.run_id}: {len(run.planned)} jobs for {len(run.symbols)} symbols")
+    status = training_orchestrator.wait(run)
+    for job in status["jobs"]:
+        print(f"{job['symbol']:>8} {job['model']:<6} {job['status']:<9} {job.get('artifact') or job.get('error', '')}")
+    training_orchestrator.shutdown()
+    return status
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Train ARIMA and LSTM models for a stock symbol.")
     parser.add_argument('--symbol', type=str, default="AAPL", help='Stock symbol to train models for')
+    parser.add_argument('--symbols', type=str, default="", help='Comma-separated symbols to train in parallel')
+    parser.add_argument('--models', type=str, default=",".join(MODEL_TYPES), help='Comma-separated model types')
     args = parser.parse_args()
-    train_all(args.symbol) 
\ No newline at end of file
+    if args.symbols:
+        train_many([s.strip() for s in args.symbols.split(",") if s.strip()],
+                   [m.strip() for m in args.models.split(",") if m.strip()])
+    else:
+        train_all(args.symbol)
@@ -1,12 +1,14 @@
 import os
-import pickle
 import pandas as pd
-import yfinance as yf
+from services.price_store import price_store
+from services.model_registry import artifact_path, new_version
+from services.model_updates import record_fit
+from services.arima_numpy import ArimaState
 from statsmodels.tsa.arima.model import ARIMA
 
 # Fetch historical stock data
 def fetch_stock_data(symbol, start="2020-01-01", end="2024-01-01"):
-    data = yf.download(symbol, start=start, end=end)
+    data = price_store.get_frame(symbol, start, end)
     return data["Close"]
 
 # Train ARIMA model
@@ -15,12 +17,13 @@ def train_arima(symbol):
     model = ARIMA(stock_data, order=(5,1,0))
     arima_model = model.fit()
     
-    # Ensure the models directory exists
-    model_dir = os.path.join(os.path.dirname(__file__), "models")
-    os.makedirs(model_dir, exist_ok=True)
-    model_path = os.path.join(model_dir, "arima_model.pkl")
-    with open(model_path, "wb") as f:
-        pickle.dump(arima_model, f)
+    # Save as a new version of this symbol's artifact
+    version = new_version()
+    model_path = artifact_path(symbol, "arima", version)
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    # Keep only the coefficients and filter state, not the statsmodels results
+    ArimaState.from_statsmodels(arima_model).save(model_path)
+    record_fit(symbol, "arima", version, stock_data.index[-1])
     print(f"ARIMA model saved successfully at {model_path}!")
 
 if __name__ == "__main__":
@@ -4,30 +4,28 @@ import pandas as pd
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense
-import yfinance as yf
+from services.price_store import price_store
+from services.model_registry import artifact_path, new_version
+from services.model_updates import record_fit
+from services.windowing import WindowDataset, prepare_data  # noqa: F401
 import joblib
 
 # Fetch historical stock data
 def fetch_stock_data(symbol, start="2020-01-01", end="2024-01-01"):
-    data = yf.download(symbol, start=start, end=end)
-    return data["Close"].values.reshape(-1, 1)
-
-# Prepare dataset for LSTM
-def prepare_data(series, time_steps=10):
-    X, y = [], []
-    for i in range(len(series) - time_steps):
-        X.append(series[i:i+time_steps])
-        y.append(series[i+time_steps])
-    return np.array(X), np.array(y)
+    data = price_store.get_frame(symbol, start, end)
+    return data["Close"].values.reshape(-1, 1), data.index[-1]
 
 # Train LSTM model
 def train_lstm(symbol):
-    stock_data = fetch_stock_data(symbol)
-    X, y = prepare_data(stock_data)
+    stock_data, last_date = fetch_stock_data(symbol)
+    time_steps = 10
+    # Windows are built batch by batch from the raw series instead of
+    # materializing every (time_steps, 1) window up front
+    dataset = WindowDataset([stock_data], time_steps=time_steps)
     
     # Define LSTM model
     model = Sequential([
-        LSTM(50, activation="relu", return_sequences=True, input_shape=(X.shape[1], 1)),
+        LSTM(50, activation="relu", return_sequences=True, input_shape=(time_steps, 1)),
         LSTM(50, activation="relu"),
         Dense(1)
     ])
@@ -35,13 +33,14 @@ def train_lstm(symbol):
     model.compile(optimizer="adam", loss="mse")
     
     # Train model
-    model.fit(X, y, epochs=20, batch_size=16, verbose=1)
+    model.fit(dataset.to_tf_dataset(batch_size=16), epochs=20, verbose=1)
     
-    # Ensure the models directory exists
-    model_dir = os.path.join(os.path.dirname(__file__), "models")
-    os.makedirs(model_dir, exist_ok=True)
-    model_path = os.path.join(model_dir, "lstm_model.h5")
+    # Save as a new version of this symbol's artifact
+    version = new_version()
+    model_path = artifact_path(symbol, "lstm", version)
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
     model.save(model_path)
+    record_fit(symbol, "lstm", version, last_date)
     print(f"LSTM model saved successfully at {model_path}!")
 
 if __name__ == "__main__":